@@ -1,20 +1,27 @@
 
-import bpy
-from .sequence_data_loader import *
-from .panel_ui import *
-from .batch_render import *
-
-classes = (
-    SequenceDataWriteConfig,
-    SequenceDataReadConfig,
-    SequenceDataAddObject,
-    SequenceDataRemoveObject,
-    SequenceDataLoadObjects,
-    ObjectDataSequence,
-    SequenceDataLoader,
-    SequenceDataRender,
-    SequenceDataPanel,
-)
+try:
+    import bpy
+except ModuleNotFoundError:
+    # Imported outside of Blender (e.g. by convert_sequence.py), only modules not depending on bpy are usable
+    bpy = None
+
+if bpy is not None:
+    from .sequence_data_loader import *
+    from .panel_ui import *
+    from .batch_render import *
+
+    classes = (
+        SequenceDataWriteConfig,
+        SequenceDataReadConfig,
+        SequenceDataRescan,
+        SequenceDataAddObject,
+        SequenceDataRemoveObject,
+        SequenceDataLoadObjects,
+        ObjectDataSequence,
+        SequenceDataLoader,
+        SequenceDataRender,
+        SequenceDataPanel,
+    )
 
 bl_info = {
     "name": "Sequence Data Loader",
@@ -35,6 +42,10 @@ def register():
 
 
 def unregister():
+    shutdown_prefetcher()
+    shutdown_shared_cache()
+    if bpy.app.timers.is_registered(upgrade_lod):
+        bpy.app.timers.unregister(upgrade_lod)
     for cls in classes:
         bpy.utils.unregister_class(cls)
 
@@ -2,29 +2,135 @@
 import bpy
 import os
 import sys
+import time
 import argparse
+import traceback
+
+from .frame_claim import FrameClaim
+from .frame_order import ORDERS, order_frames, parse_shard
+from .job_spool import JobSpool
+from .image_writer import ImageWriter, USE_OIIO, recompress_png, recompress_exr, exr_to_npy
+from .sequence_data_loader import get_timing
+
+# Background image writer, created on first use
+image_writer = None
+
+
+def get_image_writer(queue_size=2):
+    global image_writer
+    if image_writer is None:
+        image_writer = ImageWriter(queue_size)
+    return image_writer
+
+
+def wait_image_writer():
+    """Block until every rendered image has been written"""
+    if image_writer is not None:
+        image_writer.wait()
 
 
 class SequenceDataRender(bpy.types.PropertyGroup):
+    lease_timeout: bpy.props.IntProperty(name="Lease timeout", default=300, min=1,
+                                         description="Seconds without heartbeat after which a frame claimed by another worker is rendered again.")
+    frame_order: bpy.props.EnumProperty(name="Frame order", default="linear",
+                                        items=[(order, order.capitalize(), "") for order in ORDERS])
+    shard_index: bpy.props.IntProperty(name="Shard index", default=0, min=0)
+    shard_count: bpy.props.IntProperty(name="Shard count", default=1, min=1)
+    spool_dir: bpy.props.StringProperty(name="Spool directory", subtype="DIR_PATH")
+    idle_timeout: bpy.props.IntProperty(name="Idle timeout", default=0, min=0,
+                                        description="Seconds without new job after which the render daemon exits, 0 to wait forever.")
 
-    def render(self, Scene, frame):
+    def render(self, Scene, frame, export_path=None, on_saved=None):
         """
         Load the data and render a single frame
 
         :param frame: frame number to render
+        :param export_path: file to save the render to, defaults to the frame export path
+        :param on_saved: called with True once the image is fully written, False if writing it failed
         """
         Scene.sequence_data.live_update = False
+        timing = get_timing(Scene.sequence_data.timing_log)
+        started = timing.begin(source="render", frame=frame)
 
         print("Render frame:", frame)
         Scene.frame_current = frame
 
-        Scene.sequence_data.load_objects(frame)
+        with timing.stage("load"):
+            # Rendering the next frame is a frame change, meshes still holding the right file are kept
+            Scene.sequence_data.load_objects(frame, keep_unchanged=True)
 
-        export_path = Scene.sequence_data.get_export_path(frame)
+        if export_path is None:
+            export_path = Scene.sequence_data.get_export_path(frame)
         print("Export to {}".format(export_path))
 
-        bpy.ops.render.render()
-        bpy.data.images['Render Result'].save_render(filepath=export_path)
+        with timing.stage("render"):
+            bpy.ops.render.render()
+        with timing.stage("save"):
+            self.save_render(Scene, export_path, on_saved)
+
+        if started:
+            timing.end(time=Scene.sequence_data.last_read_time)
+
+
+    def save_render(self, Scene, export_path, on_saved=None):
+        """
+        Save the render result in the configured image format. With `async_write`, Blender only writes
+        an uncompressed intermediate file and the encoding is done by the background image writer.
+        """
+        sequence_data = Scene.sequence_data
+        image_format = sequence_data.image_format
+        settings = {"file_format": image_format}
+        encode = None
+
+        if image_format == "NPY":
+            settings = {"file_format": "OPEN_EXR", "exr_codec": "NONE", "color_depth": "32"}
+            encode = exr_to_npy
+        elif not sequence_data.async_write:
+            if image_format == "PNG":
+                settings["compression"] = round(sequence_data.png_compression*100/9)
+            else:
+                settings["exr_codec"] = sequence_data.exr_codec
+        elif image_format == "PNG":
+            settings["compression"] = 0
+            encode = lambda source, destination: recompress_png(source, destination, sequence_data.png_compression)
+        elif USE_OIIO:
+            settings["exr_codec"] = "NONE"
+            codec = sequence_data.exr_codec
+            encode = lambda source, destination: recompress_exr(source, destination, codec)
+        else:
+            settings["exr_codec"] = sequence_data.exr_codec
+
+        # Blender saves using the scene image settings, temporarily override them
+        image_settings = Scene.render.image_settings
+        previous_settings = {key: getattr(image_settings, key) for key in settings}
+        save_path = export_path if encode is None else export_path + ".raw"
+        try:
+            for key, value in settings.items():
+                setattr(image_settings, key, value)
+            bpy.data.images['Render Result'].save_render(filepath=save_path)
+        finally:
+            for key, value in previous_settings.items():
+                setattr(image_settings, key, value)
+
+        if encode is None:
+            if on_saved is not None:
+                on_saved(True)
+            return
+
+        def write():
+            success = False
+            try:
+                encode(save_path, export_path)
+                os.remove(save_path)
+                success = True
+            finally:
+                if on_saved is not None:
+                    on_saved(success)
+
+        if sequence_data.async_write:
+            get_image_writer(sequence_data.write_queue_size).submit(write)
+        else:
+            write()
 
 
     def parse_arguments(self, Scene):
@@ -37,6 +143,17 @@ class SequenceDataRender(bpy.types.PropertyGroup):
         parser.add_argument("--config-file", help="File to read the configuration from, if absent setting stored in the .blend file are used. Requires pyyaml lib installed inside blender.")
         parser.add_argument("--render-path", help="Path where renders are to be exported, supresed the config file render/export_path parameter.")
         parser.add_argument("--frames", help="Range of frames to render, should be in format '1-17'. If absent, using the frame range inside the .blend file.")
+        parser.add_argument("--shard", help="Part of the frames rendered by this instance, in format 'i/n' with i from 0 to n-1.")
+        parser.add_argument("--order", choices=ORDERS, help="Order in which frames are rendered: 'linear' renders a contiguous range, 'strided' "
+                                                            "every n-th frame, 'blocked' groups frames showing the same timestep and renders frames "
+                                                            "of other shards once done. Defaults to 'linear'.")
+        parser.add_argument("--lease-timeout", type=int, help="Seconds without heartbeat after which a frame claimed by a crashed instance is rendered again.")
+        parser.add_argument("--spool-dir", help="Directory the render daemon (`serve`) pulls its jobs from.")
+        parser.add_argument("--idle-timeout", type=int, help="Seconds without new job after which the render daemon exits, wait forever if absent.")
+        parser.add_argument("--shared-cache", help="Node-local directory (e.g. /dev/shm/sequence_{job}) where decoded timesteps are shared "
+                                                   "between the instances running on the same node.")
+        parser.add_argument("--timing-log", help="JSON lines file (or folder) where the time spent in each stage of every frame is written, "
+                                                 "{host} and {pid} are replaced by the hostname and PID of the instance.")
 
         # Parse arguments after "--"
         if not "--" in sys.argv:
@@ -52,39 +169,149 @@ class SequenceDataRender(bpy.types.PropertyGroup):
             Scene.sequence_data.export_path = args.render_path
 
         if args.frames:
-            Scene.frame_start = int(args.frames.split("-")[0])
-            Scene.frame_end = int(args.frames.split("-")[1])
+            self.set_frames(Scene, args.frames)
+
+        if args.shard:
+            self.shard_index, self.shard_count = parse_shard(args.shard)
+
+        if args.order:
+            self.frame_order = args.order
+
+        if args.lease_timeout:
+            self.lease_timeout = args.lease_timeout
+
+        if args.spool_dir:
+            self.spool_dir = args.spool_dir
+
+        if args.idle_timeout:
+            self.idle_timeout = args.idle_timeout
+
+        if args.shared_cache:
+            Scene.sequence_data.shared_cache = args.shared_cache
+
+        if args.timing_log:
+            Scene.sequence_data.timing_log = args.timing_log
+
+
+    def set_frames(self, Scene, frames):
+        """Set the frame range from a string in format '1-17'"""
+        Scene.frame_start = int(frames.split("-")[0])
+        Scene.frame_end = int(frames.split("-")[1])
 
 
     def render_frames(self):
         """
         Render frames from scene.frame_start to scene.frame_end. 
-        Render isn't triggered for frames that are already present in the folder
+        Render isn't triggered for frames that are already present in the folder or claimed
+        by another instance (see FrameClaim), frames of crashed instances are rendered again
+        once their lease expires.
         """
         Scene = bpy.context.scene
 
         self.parse_arguments(Scene)
+        self.render_range(Scene)
 
+
+    def render_range(self, Scene):
+        """
+        Render the frames of the scene frame range not rendered or claimed yet
+
+        :returns: list of the frames rendered by this instance
+        """
         # Create export folder
         export_folder = Scene.sequence_data.get_export_path()
         if not os.path.exists(export_folder):
             os.makedirs(export_folder)
 
+        frames = order_frames(range(Scene.frame_start, Scene.frame_end+1), self.frame_order,
+                              self.shard_index, self.shard_count, Scene.sequence_data.get_time)
+
         # Render each frame
-        for frame in range(Scene.frame_start, Scene.frame_end+1):
+        rendered = []
+        for frame in frames:
             export_path = Scene.sequence_data.get_export_path(frame)
-            export_path_tmp = export_path + ".tmp"
 
-            # Check if render has already been done
-            if os.path.exists(export_path) or os.path.exists(export_path_tmp):
+            # Skip frames already rendered or being rendered
+            claim = FrameClaim(export_path, timeout=self.lease_timeout,
+                               heartbeat=max(1, self.lease_timeout//10))
+            if not claim.acquire():
                 continue
 
-            # Create empty temporary file
-            with open(export_path_tmp, 'w') as fp:
-                pass
+            def finish(success, claim=claim):
+                if success:
+                    claim.publish()
+                claim.release()
 
-            self.render(Scene, frame)
             try:
-                os.remove(export_path_tmp)
-            except:
-                pass
+                self.render(Scene, frame, claim.partial_path, finish)
+            except Exception:
+                claim.release()
+                raise
+            rendered.append(frame)
+
+        wait_image_writer()
+        return rendered
+
+
+    def serve(self):
+        """
+        Render daemon: keep the .blend file and the addon loaded and render jobs pulled from
+        `--spool-dir` (see JobSpool) until a STOP file is created or no job came for `--idle-timeout` seconds.
+
+        A job file follows the yaml config file layout, its values override the settings of
+        the .blend file (and `--config-file`) for this job only. It can also contain
+        `frames` ('1-17'), `render_path`, `shard` ('i/n') and `order`.
+        """
+        Scene = bpy.context.scene
+
+        self.parse_arguments(Scene)
+        if not self.spool_dir:
+            raise Exception('--spool-dir is required to run the render daemon')
+
+        spool = JobSpool(bpy.path.abspath(self.spool_dir))
+        base_config = Scene.sequence_data.get_config()
+        base_settings = (Scene.frame_start, Scene.frame_end, self.frame_order, self.shard_index, self.shard_count)
+        print("Waiting for jobs in {}".format(spool.path))
+
+        idle_since = time.time()
+        while not spool.stop_requested():
+            job = spool.next_job()
+            if job is None:
+                if self.idle_timeout and time.time() - idle_since > self.idle_timeout:
+                    break
+                time.sleep(1)
+                continue
+
+            print("Running job {}".format(job.name))
+            try:
+                Scene.sequence_data.apply_config(base_config)
+                Scene.frame_start, Scene.frame_end, self.frame_order, self.shard_index, self.shard_count = base_settings
+                self.apply_job(Scene, job.content)
+                Scene.sequence_data.last_read_time = -1
+
+                start = time.time()
+                rendered = self.render_range(Scene)
+                spool.finish(job, "done", frames=rendered, render_time=time.time() - start)
+            except Exception as error:
+                traceback.print_exc()
+                spool.finish(job, "failed", error=repr(error))
+            idle_since = time.time()
+
+        print("Render daemon stopped")
+
+
+    def apply_job(self, Scene, job):
+        """Apply the settings of a render daemon job"""
+        Scene.sequence_data.apply_config(job)
+
+        if 'frames' in job:
+            self.set_frames(Scene, str(job['frames']))
+
+        if 'render_path' in job:
+            Scene.sequence_data.export_path = job['render_path']
+
+        if 'shard' in job:
+            self.shard_index, self.shard_count = parse_shard(job['shard'])
+
+        if 'order' in job:
+            self.frame_order = job['order']
@@ -0,0 +1,156 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+
+class FrameClaim:
+    """
+    Lease based claim of an output file, used to coordinate several workers writing to
+    the same folder of a shared POSIX filesystem.
+
+    A worker owns the output while the lease file `path + ".lease"` holds its token. The lease
+    is created with an atomic exclusive open and contains the hostname, PID and heartbeat
+    timestamp of the worker, refreshed by a background thread. Leases whose heartbeat is older
+    than `timeout` (or whose process is gone, on the same host) are reclaimed by other workers.
+    The result is first written to `partial_path` then atomically renamed to `path`.
+
+    :param path: final output path
+    :param timeout: seconds without heartbeat after which a lease is considered expired
+    :param heartbeat: seconds between two heartbeats
+    """
+
+    def __init__(self, path, timeout=300, heartbeat=30):
+        self.path = path
+        self.lease_path = path + ".lease"
+        self.timeout = timeout
+        self.heartbeat = heartbeat
+        self.token = uuid.uuid4().hex
+        self.partial_path = "{}.{}.part".format(path, self.token)
+        self.stop_heartbeat = threading.Event()
+        self.heartbeat_thread = None
+
+
+    def lease_content(self):
+        return json.dumps({"token": self.token, "hostname": socket.gethostname(),
+                           "pid": os.getpid(), "heartbeat": time.time()})
+
+
+    def read_lease(self, path=None):
+        """Returns the content of a lease file, None if it doesn't exist or is being written"""
+        try:
+            with open(path or self.lease_path, "r") as lease_file:
+                return json.load(lease_file)
+        except (OSError, ValueError):
+            return None
+
+
+    def is_expired(self, lease):
+        if time.time() - lease.get("heartbeat", 0) > self.timeout:
+            return True
+        # A process that died on this host can be detected without waiting for the timeout
+        if lease.get("hostname") == socket.gethostname():
+            try:
+                os.kill(lease["pid"], 0)
+            except ProcessLookupError:
+                return True
+            except (OSError, KeyError):
+                pass
+        return False
+
+
+    def acquire(self):
+        """
+        Try to claim the output, returns False if it already exists or is claimed by another worker
+        """
+        if os.path.exists(self.path):
+            return False
+
+        if not self.create_lease():
+            lease = self.read_lease()
+            if lease is None or not self.is_expired(lease) or not self.reclaim(lease) \
+                    or not self.create_lease():
+                return False
+
+        # The output may have been published between the first check and the lease creation
+        if os.path.exists(self.path):
+            self.release()
+            return False
+
+        self.stop_heartbeat.clear()
+        self.heartbeat_thread = threading.Thread(target=self.beat, daemon=True)
+        self.heartbeat_thread.start()
+        return True
+
+
+    def create_lease(self):
+        """Atomically create the lease file, fails if it already exists"""
+        try:
+            fd = os.open(self.lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as lease_file:
+            lease_file.write(self.lease_content())
+        return True
+
+
+    def reclaim(self, expired_lease):
+        """
+        Remove an expired lease. It is first renamed to a unique name so that only one worker
+        can take it, and put back if it is no longer expired: refreshed by its owner or replaced by
+        another worker in the meantime.
+        """
+        stale_path = "{}.stale.{}".format(self.lease_path, self.token)
+        try:
+            os.rename(self.lease_path, stale_path)
+        except FileNotFoundError:
+            return False
+
+        lease = self.read_lease(stale_path)
+        if lease is not None and not self.is_expired(lease):
+            try:
+                os.link(stale_path, self.lease_path)
+            except OSError:
+                pass
+            os.remove(stale_path)
+            return False
+
+        os.remove(stale_path)
+        return True
+
+
+    def owns_lease(self):
+        lease = self.read_lease()
+        return lease is not None and lease.get("token") == self.token
+
+
+    def beat(self):
+        """Refresh the heartbeat of the lease until released"""
+        while not self.stop_heartbeat.wait(self.heartbeat):
+            if not self.owns_lease():
+                print("Lost lease on {}".format(self.path))
+                return
+            tmp_path = "{}.{}.tmp".format(self.lease_path, self.token)
+            with open(tmp_path, "w") as lease_file:
+                lease_file.write(self.lease_content())
+            os.replace(tmp_path, self.lease_path)
+
+
+    def publish(self):
+        """Atomically move the finished output from `partial_path` to `path`"""
+        os.replace(self.partial_path, self.path)
+
+
+    def release(self):
+        """Stop the heartbeat, remove the lease if still owned and any unpublished output"""
+        self.stop_heartbeat.set()
+        if self.heartbeat_thread is not None:
+            self.heartbeat_thread.join()
+            self.heartbeat_thread = None
+
+        if self.owns_lease():
+            os.remove(self.lease_path)
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
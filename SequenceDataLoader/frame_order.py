@@ -0,0 +1,77 @@
+ORDERS = ("linear", "strided", "blocked")
+
+
+def frame_blocks(frames, time_of):
+    """
+    Group consecutive frames that map to the same timestep
+
+    :param time_of: function returning the timestep of a frame
+    """
+    blocks = []
+    last_time = None
+    for frame in frames:
+        time = time_of(frame)
+        if blocks and time == last_time:
+            blocks[-1].append(frame)
+        else:
+            blocks.append([frame])
+        last_time = time
+    return blocks
+
+
+def split_blocks(blocks, count):
+    """Split a list of blocks into `count` contiguous groups with about the same number of frames"""
+    total = sum(len(block) for block in blocks)
+    groups = [[] for _ in range(count)]
+    done = 0
+    for block in blocks:
+        # Group the block belongs to, based on the position of its middle frame
+        index = min(count - 1, (2*done + len(block))*count//(2*total)) if total else 0
+        groups[index].append(block)
+        done += len(block)
+    return groups
+
+
+def order_frames(frames, order="linear", shard=0, shard_count=1, time_of=None):
+    """
+    Returns the frames one worker should render, in the order it should render them.
+
+    :param order: 'linear' renders a contiguous range of frames in order, 'strided' renders
+        every `shard_count` frame starting at `shard`, 'blocked' renders contiguous blocks of
+        frames mapping to the same timestep so data is loaded once per block, then steals
+        blocks from the end of the other shards' ranges once its own range is done
+    :param shard: index of this worker, from 0 to shard_count - 1
+    :param shard_count: number of workers sharing the frames
+    :param time_of: function returning the timestep of a frame, used by the 'blocked' order
+    """
+    if order not in ORDERS:
+        raise Exception("Unknown frame order {}, should be one of {}".format(order, ", ".join(ORDERS)))
+    if not 0 <= shard < shard_count:
+        raise Exception("Shard {} out of range for {} shards".format(shard, shard_count))
+
+    frames = list(frames)
+
+    if order == "strided":
+        return frames[shard::shard_count]
+
+    if order == "linear":
+        groups = split_blocks([[frame] for frame in frames], shard_count)
+        return [frame for block in groups[shard] for frame in block]
+
+    groups = split_blocks(frame_blocks(frames, time_of or (lambda frame: frame)), shard_count)
+    ordered = [frame for block in groups[shard] for frame in block]
+    for offset in range(1, shard_count):
+        for block in reversed(groups[(shard + offset) % shard_count]):
+            ordered.extend(block)
+    return ordered
+
+
+def parse_shard(shard):
+    """Parse a 'i/n' shard string into (i, n)"""
+    try:
+        index, count = (int(x) for x in shard.split("/"))
+    except ValueError:
+        raise Exception("Shard should be in format 'i/n', got {}".format(shard))
+    if not 0 <= index < count:
+        raise Exception("Shard index should be between 0 and {}, got {}".format(count - 1, index))
+    return index, count
@@ -0,0 +1,158 @@
+"""
+Compression and conversion of rendered frames saved uncompressed by Blender, on a background thread.
+"""
+import queue
+import struct
+import threading
+import traceback
+import zlib
+
+import numpy as np
+
+USE_OIIO = True
+try:
+    import OpenImageIO as oiio
+except ModuleNotFoundError:
+    USE_OIIO = False
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+EXR_MAGIC = 20000630
+EXR_PIXEL_TYPES = {0: np.dtype("<u4"), 1: np.dtype("<f2"), 2: np.dtype("<f4")}
+
+
+class ImageWriter:
+    """
+    Run image writing jobs on a background thread. At most `queue_size` jobs wait
+    to be written, `submit` blocks when the queue is full so memory stays bounded.
+    """
+
+    def __init__(self, queue_size=2):
+        self.jobs = queue.Queue(maxsize=max(1, queue_size))
+        self.thread = threading.Thread(target=self.run, daemon=True, name="sequence_image_writer")
+        self.thread.start()
+
+
+    def submit(self, job):
+        """Queue a callable writing an image"""
+        self.jobs.put(job)
+
+
+    def wait(self):
+        """Block until every queued image is written"""
+        self.jobs.join()
+
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                job()
+            except Exception:
+                traceback.print_exc()
+            finally:
+                self.jobs.task_done()
+
+
+def recompress_png(source, destination, level=6):
+    """
+    Rewrite a png file with another zlib compression level. The filtered scanlines are
+    kept as is so this only costs a decompression and a compression.
+    """
+    with open(source, "rb") as png_file:
+        data = png_file.read()
+    if not data.startswith(PNG_SIGNATURE):
+        raise Exception("{} is not a png file".format(source))
+
+    chunks = []
+    image_data = []
+    offset = len(PNG_SIGNATURE)
+    while offset < len(data):
+        length, chunk_type = struct.unpack_from(">I4s", data, offset)
+        chunk = data[offset + 8:offset + 8 + length]
+        offset += length + 12
+        if chunk_type == b"IDAT":
+            if not image_data:
+                chunks.append((b"IDAT", None))
+            image_data.append(chunk)
+        else:
+            chunks.append((chunk_type, chunk))
+
+    compressed = zlib.compress(zlib.decompress(b"".join(image_data)), level)
+
+    with open(destination, "wb") as png_file:
+        png_file.write(PNG_SIGNATURE)
+        for chunk_type, chunk in chunks:
+            if chunk is None:
+                chunk = compressed
+            png_file.write(struct.pack(">I", len(chunk)) + chunk_type + chunk)
+            png_file.write(struct.pack(">I", zlib.crc32(chunk_type + chunk)))
+
+
+def read_exr(path):
+    """
+    Read an uncompressed scanline OpenEXR file, as saved by Blender with the 'NONE' codec
+
+    :returns: (height, width, channels) float32 array with channels in R, G, B, A order
+    """
+    with open(path, "rb") as exr_file:
+        data = exr_file.read()
+
+    magic, version = struct.unpack_from("<ii", data, 0)
+    if magic != EXR_MAGIC or version & 0x1a00:
+        raise Exception("{} is not a single part scanline OpenEXR file".format(path))
+
+    offset = 8
+    header = {}
+    while data[offset] != 0:
+        name_end = data.index(b"\0", offset)
+        type_end = data.index(b"\0", name_end + 1)
+        name = data[offset:name_end].decode()
+        size = struct.unpack_from("<i", data, type_end + 1)[0]
+        header[name] = data[type_end + 5:type_end + 5 + size]
+        offset = type_end + 5 + size
+    offset += 1
+
+    if header["compression"][0] != 0:
+        raise Exception("{} is compressed, only uncompressed OpenEXR files can be read".format(path))
+
+    channels = []
+    channel_list = header["channels"]
+    position = 0
+    while channel_list[position] != 0:
+        name_end = channel_list.index(b"\0", position)
+        pixel_type = struct.unpack_from("<i", channel_list, name_end + 1)[0]
+        channels.append((channel_list[position:name_end].decode(), EXR_PIXEL_TYPES[pixel_type]))
+        position = name_end + 17
+
+    xmin, ymin, xmax, ymax = struct.unpack("<iiii", header["dataWindow"])
+    width, height = xmax - xmin + 1, ymax - ymin + 1
+
+    # One scanline per block: y coordinate, data size, then each channel in alphabetical order
+    line_dtype = np.dtype([("y", "<i4"), ("size", "<i4")] + [(name, dtype, (width,)) for name, dtype in channels])
+    block_offsets = np.frombuffer(data, dtype="<u8", count=height, offset=offset)
+    if np.any(np.diff(block_offsets.astype(np.int64)) != line_dtype.itemsize):
+        lines = np.concatenate([np.frombuffer(data, dtype=line_dtype, count=1, offset=int(o)) for o in block_offsets])
+    else:
+        lines = np.frombuffer(data, dtype=line_dtype, count=height, offset=int(block_offsets[0]))
+    lines = lines[np.argsort(lines["y"])]
+
+    names = [name for name in "RGBA" if name in line_dtype.names] or [name for name, _ in channels]
+    return np.stack([lines[name].astype(np.float32) for name in names], axis=-1)
+
+
+def exr_to_npy(source, destination):
+    """Convert an uncompressed OpenEXR file to a raw float32 .npy array"""
+    pixels = read_exr(source)
+    with open(destination, "wb") as npy_file:
+        np.save(npy_file, pixels)
+
+
+def recompress_exr(source, destination, codec="ZIP"):
+    """Rewrite an OpenEXR file with another codec, requires the OpenImageIO python module"""
+    if not USE_OIIO:
+        raise Exception('OpenImageIO library not available, OpenEXR recompression unavailable')
+    image = oiio.ImageBuf(source)
+    image.specmod().attribute("compression", codec.lower())
+    image.set_write_format(image.spec().format)
+    if not image.write(destination, fileformat="openexr"):
+        raise Exception("Could not write {}: {}".format(destination, image.geterror()))
@@ -0,0 +1,111 @@
+import json
+import os
+import socket
+import time
+
+USE_YAML = True
+try:
+    import yaml
+except ModuleNotFoundError:
+    USE_YAML = False
+
+JOB_EXTENSIONS = (".json", ".yaml", ".yml")
+
+
+class Job:
+    """Render job claimed from a JobSpool"""
+
+    def __init__(self, name, path, content):
+        self.name = name
+        self.path = path
+        self.content = content
+        self.started = time.time()
+
+
+class JobSpool:
+    """
+    Queue of render jobs stored as files in a spool directory, shared by any number of workers.
+
+    Pending jobs are .json/.yaml files at the top of the directory. Submitters should write a job
+    under another name (e.g. `job.yaml.tmp`) then rename it, files that can't be read yet are left
+    in the queue for `grace` seconds in case they are still being written. A worker claims a job by
+    atomically renaming it into `running/`, then moves it to `done/` or `failed/`. The state of
+    each job is written to `status/<job>.json`. Creating a file named `STOP` in the spool
+    directory asks the workers to exit once their current job is finished.
+
+    :param path: spool directory
+    :param grace: seconds after its last modification before an unreadable job is marked failed
+    """
+
+    def __init__(self, path, grace=60):
+        self.path = path
+        self.grace = grace
+        for folder in ("running", "done", "failed", "status"):
+            os.makedirs(os.path.join(path, folder), exist_ok=True)
+
+
+    def stop_requested(self):
+        return os.path.exists(os.path.join(self.path, "STOP"))
+
+
+    def next_job(self):
+        """Claim the oldest pending job, returns None if there is none"""
+        pending = []
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(JOB_EXTENSIONS):
+                    pending.append((entry.stat().st_mtime, entry.name))
+
+        for modified, name in sorted(pending):
+            if time.time() - modified < self.grace:
+                try:
+                    read_job(os.path.join(self.path, name))
+                except Exception:
+                    # Claimed by another worker, or probably still being written by the submitter
+                    continue
+
+            running_path = os.path.join(self.path, "running", name)
+            try:
+                os.rename(os.path.join(self.path, name), running_path)
+            except FileNotFoundError:
+                # Claimed by another worker
+                continue
+
+            job = Job(name, running_path, None)
+            try:
+                job.content = read_job(running_path)
+            except Exception as error:
+                self.finish(job, "failed", error="Could not read job: {}".format(error))
+                continue
+            self.set_status(job, "running")
+            return job
+
+        return None
+
+
+    def set_status(self, job, state, **info):
+        """Write the state of a job, with any extra information, to its status file"""
+        status = {"job": job.name, "state": state, "hostname": socket.gethostname(),
+                  "pid": os.getpid(), "started": job.started, "updated": time.time()}
+        status.update(info)
+        status_path = os.path.join(self.path, "status", os.path.splitext(job.name)[0] + ".json")
+        with open(status_path + ".tmp", "w") as status_file:
+            json.dump(status, status_file, indent=1)
+        os.replace(status_path + ".tmp", status_path)
+
+
+    def finish(self, job, state, **info):
+        """Move a job to `done/` or `failed/` depending on `state` and update its status"""
+        os.replace(job.path, os.path.join(self.path, state, job.name))
+        job.path = os.path.join(self.path, state, job.name)
+        self.set_status(job, state, finished=time.time(), **info)
+
+
+def read_job(path):
+    """Read a job file, yaml files require pyyaml"""
+    with open(path, "r") as job_file:
+        if path.endswith(".json"):
+            return json.load(job_file) or {}
+        if not USE_YAML:
+            raise Exception('yaml library not available, yaml jobs unavailable')
+        return yaml.safe_load(job_file) or {}
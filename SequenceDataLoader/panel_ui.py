@@ -1,4 +1,5 @@
 import bpy
+from . import sequence_data_loader
 from .sequence_data_loader import *
 
 USE_YAML = True
@@ -41,8 +42,9 @@ class SequenceDataPanel(bpy.types.Panel):
         # Timing
         layout.label(text="Timing", icon="TIME")
 
-        col = layout.column()
-        col.prop(sequence_data, "timing_interpolate")
+        row = layout.row()
+        row.prop(sequence_data, "timing_interpolate")
+        row.prop(sequence_data, "interpolate_vertices")
 
         row = layout.grid_flow(columns=2, align=True)
         row.prop(sequence_data, "timing_time_start")
@@ -51,6 +53,12 @@ class SequenceDataPanel(bpy.types.Panel):
         row.prop(scene, "frame_start")
         row.prop(scene, "frame_end")
 
+        col = layout.column()
+        col.prop(sequence_data, "missing_steps")
+        row = col.row()
+        row.prop(sequence_data, "use_manifest")
+        row.operator("sequencedata.rescan", icon="FILE_REFRESH")
+
         layout.separator(factor=2)
 
         # Objects
@@ -61,9 +69,29 @@ class SequenceDataPanel(bpy.types.Panel):
             box = layout.box()
             box.prop_search(item, "name", scene, "objects")
             box.prop(item, "path")
+            index = indices.get(bpy.path.abspath(item.path))
+            if index is not None and index.time_range:
+                text = "Time {}-{}, {} steps".format(*index.time_range, len(index.times))
+                gaps = index.gaps()
+                if gaps:
+                    text += ", missing: " + ", ".join("{}-{}".format(*gap) for gap in gaps[:5])
+                    if len(gaps) > 5:
+                        text += "..."
+                box.label(text=text)
+            # Shading settings only apply to meshes with faces
+            is_volume = item.name in bpy.data.objects and bpy.data.objects[item.name].type == "VOLUME"
+            has_shading = not is_volume and not item.point_cloud
             split = box.split()
-            split.prop(item, "shade_smooth")
+            if has_shading:
+                split.prop(item, "shade_smooth")
             split.prop(item, "enable")
+            if not is_volume:
+                split.prop(item, "point_cloud")
+            if has_shading:
+                split = box.split()
+                split.prop(item, "auto_smooth")
+                split.prop(item, "auto_smooth_angle")
+                box.prop(item, "use_file_normals")
             row = box.row()
             row.operator("sequencedata.remove_object", icon="X").object_id = idx
 
@@ -77,10 +105,36 @@ class SequenceDataPanel(bpy.types.Panel):
         row = layout.split(align=True)
         row.prop(sequence_data, "live_update")
         row.prop(scene, "frame_current")
+        col = layout.column()
+        col.prop(sequence_data, "parallel_read")
+        col.prop(sequence_data, "prefetch_steps")
+        col.prop(sequence_data, "cache_size")
+        row = col.row()
+        row.prop(sequence_data, "shared_cache")
+        row.prop(sequence_data, "shared_cache_size")
+        row = col.row()
+        row.prop(sequence_data, "playback_lod")
+        row.prop(sequence_data, "settle_time")
+        col.prop(sequence_data, "timing_log")
+        # Caches are only created and attached when loading, drawing reads their current state
+        cache = sequence_data_loader.cache
+        if cache is not None:
+            col.label(text="Cache: {} hits, {} misses, {:.0f} MB used".format(
+                cache.hits, cache.misses, cache.used_bytes/1024**2))
+        if sequence_data.shared_cache:
+            shared_cache = sequence_data_loader.shared_cache
+            if shared_cache is None:
+                col.label(text="Shared cache: not attached")
+            else:
+                col.label(text="Shared cache: {} hits, {} misses, {:.0f} MB on the node".format(
+                    shared_cache.hits, shared_cache.misses, shared_cache.node_bytes/1024**2))
         row = layout.column()
         row.alert = (sequence_data.last_read_time != sequence_data.get_time(scene.frame_current))
         row.use_property_decorate = False
-        row.label(text="Currently displayed time: {}".format(sequence_data.last_read_time))
+        text = "Currently displayed time: {}".format(sequence_data.last_read_time)
+        if sequence_data.last_read_lod > 0:
+            text += " (LOD {})".format(sequence_data.last_read_lod)
+        row.label(text=text)
 
         row = layout.column()
         row.scale_y = 3.0
@@ -96,4 +150,12 @@ class SequenceDataPanel(bpy.types.Panel):
         col.prop(scene.cycles, "samples")
         col.prop(scene.render, "resolution_percentage")
         col.prop(sequence_data, "export_path")
+        col.prop(sequence_data, "image_format")
+        if sequence_data.image_format == "PNG":
+            col.prop(sequence_data, "png_compression")
+        elif sequence_data.image_format == "OPEN_EXR":
+            col.prop(sequence_data, "exr_codec")
+        row = col.row()
+        row.prop(sequence_data, "async_write")
+        row.prop(sequence_data, "write_queue_size")
 
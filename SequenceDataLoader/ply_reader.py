@@ -0,0 +1,483 @@
+"""
+Reader decoding binary and ASCII .ply files into NumPy arrays, binary files are memory-mapped.
+Can be run on its own: `python ply_reader.py path/to/file.ply`
+"""
+import mmap
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+PLY_TYPES = {
+    "char": "i1", "int8": "i1",
+    "uchar": "u1", "uint8": "u1",
+    "short": "i2", "int16": "i2",
+    "ushort": "u2", "uint16": "u2",
+    "int": "i4", "int32": "i4",
+    "uint": "u4", "uint32": "u4",
+    "float": "f4", "float32": "f4",
+    "double": "f8", "float64": "f8",
+}
+
+PLY_FORMATS = {
+    "ascii": None,
+    "binary_little_endian": "<",
+    "binary_big_endian": ">",
+}
+
+COLOR_PROPERTIES = ("red", "green", "blue", "alpha")
+NORMAL_PROPERTIES = ("nx", "ny", "nz")
+FACE_INDEX_PROPERTIES = ("vertex_indices", "vertex_index")
+# Pairs of vertex properties holding texture coordinates, as read by Blender's .ply importer
+UV_PROPERTIES = (("s", "t"), ("u", "v"), ("texture_u", "texture_v"), ("texture_s", "texture_t"))
+
+
+class PlyProperty:
+    """Single property of a .ply element, `count_type` is only set for list properties"""
+
+    def __init__(self, name, value_type, count_type=None):
+        self.name = name
+        self.value_type = value_type
+        self.count_type = count_type
+
+    @property
+    def is_list(self):
+        return self.count_type is not None
+
+
+class PlyElement:
+    """Element declared in a .ply header (vertex, face...)"""
+
+    def __init__(self, name, count):
+        self.name = name
+        self.count = count
+        self.properties = []
+
+    def scalar_dtype(self, byte_order):
+        """Structured dtype of one record, only valid when the element has no list property"""
+        return np.dtype([(p.name, byte_order + PLY_TYPES[p.value_type]) for p in self.properties])
+
+
+class PlyMesh:
+    """
+    Decoded content of a .ply file.
+
+    :param vertices: (N, 3) float32 vertex positions
+    :param normals: (N, 3) float32 vertex normals or None
+    :param colors: (N, 4) float32 vertex colors in [0, 1] or None
+    :param face_sizes: (F,) int32 number of vertices of each face
+    :param face_indices: (sum(face_sizes),) int32 flattened vertex indices of the faces
+    :param face_colors: (F, 4) float32 face colors in [0, 1] or None
+    :param attributes: dict of other per-vertex properties as float32 arrays, including texture
+        coordinates (see `get_uvs`)
+    :param face_attributes: dict of other per-face properties as float32 arrays
+    """
+
+    def __init__(self):
+        self.vertices = np.zeros((0, 3), dtype=np.float32)
+        self.normals = None
+        self.colors = None
+        self.face_sizes = np.zeros(0, dtype=np.int32)
+        self.face_indices = np.zeros(0, dtype=np.int32)
+        self.face_colors = None
+        self.attributes = {}
+        self.face_attributes = {}
+        # Topology hash computed once or saved alongside the data, avoids hashing the faces again
+        self.stored_topology_hash = None
+
+    @property
+    def vertex_count(self):
+        return len(self.vertices)
+
+    @property
+    def face_count(self):
+        return len(self.face_sizes)
+
+    @property
+    def nbytes(self):
+        """Memory used by the decoded arrays"""
+        arrays = [self.vertices, self.normals, self.colors, self.face_sizes, self.face_indices, self.face_colors]
+        arrays += list(self.attributes.values()) + list(self.face_attributes.values())
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    @property
+    def loop_starts(self):
+        """Index of the first loop of each face, as expected by `MeshPolygon.loop_start`"""
+        loop_starts = np.zeros(len(self.face_sizes), dtype=np.int32)
+        np.cumsum(self.face_sizes[:-1], out=loop_starts[1:])
+        return loop_starts
+
+    def get_uvs(self):
+        """(N, 2) float32 texture coordinates of the vertices, None if the file has none"""
+        for u, v in UV_PROPERTIES:
+            if u in self.attributes and v in self.attributes:
+                return np.column_stack((self.attributes[u], self.attributes[v]))
+        return None
+
+    def topology_hash(self):
+        """
+        Cheap fingerprint of the mesh connectivity, two meshes with the same hash can be updated
+        by only overwriting their vertex attributes. Computed once, the arrays of a decoded mesh aren't modified.
+        """
+        if self.stored_topology_hash is None:
+            checksum = zlib.crc32(np.ascontiguousarray(self.face_sizes))
+            checksum = zlib.crc32(np.ascontiguousarray(self.face_indices), checksum)
+            self.stored_topology_hash = "{}-{}-{}-{:08x}".format(self.vertex_count, self.face_count,
+                                                                 len(self.face_indices), checksum)
+        return self.stored_topology_hash
+
+
+def vertices_only(mesh):
+    """PlyMesh sharing the vertices and vertex attributes of `mesh`, without its faces"""
+    points = PlyMesh()
+    points.vertices = mesh.vertices
+    points.normals = mesh.normals
+    points.colors = mesh.colors
+    points.attributes = mesh.attributes
+    return points
+
+
+def interpolate_mesh(start, end, fraction):
+    """
+    Blend the vertex positions and attributes of two meshes with the same connectivity,
+    `fraction` 0 gives `start` and 1 gives `end`. Arrays missing from `end` are taken from `start`.
+    """
+    mesh = PlyMesh()
+    mesh.face_sizes = start.face_sizes
+    mesh.face_indices = start.face_indices
+    mesh.stored_topology_hash = start.topology_hash()
+    mesh.vertices = lerp(start.vertices, end.vertices, fraction)
+
+    if start.normals is not None and end.normals is not None:
+        mesh.normals = lerp(start.normals, end.normals, fraction)
+        lengths = np.linalg.norm(mesh.normals, axis=1, keepdims=True)
+        np.divide(mesh.normals, lengths, out=mesh.normals, where=lengths > 0)
+
+    for name in ("colors", "face_colors"):
+        start_colors, end_colors = getattr(start, name), getattr(end, name)
+        if start_colors is not None and end_colors is not None:
+            setattr(mesh, name, lerp(start_colors, end_colors, fraction))
+        else:
+            setattr(mesh, name, start_colors)
+
+    for attributes, start_attributes, end_attributes in ((mesh.attributes, start.attributes, end.attributes),
+                                                         (mesh.face_attributes, start.face_attributes, end.face_attributes)):
+        for name, values in start_attributes.items():
+            if name in end_attributes and name != "material_index":
+                attributes[name] = lerp(values, end_attributes[name], fraction)
+            else:
+                attributes[name] = values
+    return mesh
+
+
+def lerp(start, end, fraction):
+    result = np.subtract(end, start, dtype=np.float32)
+    result *= np.float32(fraction)
+    result += start
+    return result
+
+
+def read_header(data):
+    """
+    Parse the header of a .ply file.
+
+    :param data: buffer holding the start of the file
+    :returns: byte order ('<', '>' or None for ascii), list of elements and header size in bytes
+    """
+    end = data.find(b"end_header")
+    if not data[:3] == b"ply" or end == -1:
+        raise Exception("Not a valid .ply file")
+    header_size = data.find(b"\n", end) + 1
+
+    byte_order = None
+    elements = []
+    for line in bytes(data[:header_size]).decode("ascii").splitlines():
+        words = line.split()
+        if not words or words[0] in ("ply", "comment", "obj_info", "end_header"):
+            continue
+        if words[0] == "format":
+            if words[1] not in PLY_FORMATS:
+                raise Exception("Unknown .ply format: {}".format(words[1]))
+            byte_order = PLY_FORMATS[words[1]]
+        elif words[0] == "element":
+            elements.append(PlyElement(words[1], int(words[2])))
+        elif words[0] == "property":
+            if words[1] == "list":
+                elements[-1].properties.append(PlyProperty(words[4], words[3], words[2]))
+            else:
+                elements[-1].properties.append(PlyProperty(words[2], words[1]))
+
+    return byte_order, elements, header_size
+
+
+def read_binary_element(data, offset, element, byte_order):
+    """
+    Decode a binary element starting at `offset`.
+
+    :returns: dict of property name to array (lists are returned as (sizes, flattened values)),
+        and the offset right after the element
+    """
+    if not any(p.is_list for p in element.properties):
+        dtype = element.scalar_dtype(byte_order)
+        records = np.frombuffer(data, dtype=dtype, count=element.count, offset=offset)
+        columns = {name: records[name] for name in dtype.names}
+        return columns, offset + element.count*dtype.itemsize
+
+    if element.count == 0:
+        return {p.name: (np.zeros(0, dtype=np.int32), np.zeros(0)) if p.is_list else np.zeros(0)
+                for p in element.properties}, offset
+
+    # Fast path: every list of the element has the same length as in the first record
+    # (triangle or quad meshes), the element can then be viewed as fixed-size records
+    fields = []
+    position = offset
+    for p in element.properties:
+        if p.is_list:
+            count_type = byte_order + PLY_TYPES[p.count_type]
+            size = int(np.frombuffer(data, dtype=count_type, count=1, offset=position)[0])
+            fields.append((p.name + "_count", count_type))
+            fields.append((p.name, byte_order + PLY_TYPES[p.value_type], (size,)))
+            position += np.dtype(count_type).itemsize + size*np.dtype(PLY_TYPES[p.value_type]).itemsize
+        else:
+            fields.append((p.name, byte_order + PLY_TYPES[p.value_type]))
+            position += np.dtype(PLY_TYPES[p.value_type]).itemsize
+    dtype = np.dtype(fields)
+
+    if offset + element.count*dtype.itemsize <= len(data):
+        records = np.frombuffer(data, dtype=dtype, count=element.count, offset=offset)
+        list_names = [p.name for p in element.properties if p.is_list]
+        if all(np.all(records[name + "_count"] == dtype[name].shape[0]) for name in list_names):
+            columns = {}
+            for p in element.properties:
+                if p.is_list:
+                    values = records[p.name]
+                    sizes = np.full(element.count, values.shape[1], dtype=np.int32)
+                    columns[p.name] = (sizes, values.reshape(-1))
+                else:
+                    columns[p.name] = records[p.name]
+            return columns, offset + element.count*dtype.itemsize
+
+    return read_binary_element_variable(data, offset, element, byte_order)
+
+
+def read_binary_element_variable(data, offset, element, byte_order):
+    """
+    Decode a binary element with lists of varying length (e.g. mixed triangles and quads).
+    A first pass only reads the list counts to find where each property of each record starts,
+    the values are then gathered from the buffer with array indexing.
+    """
+    layout = []
+    for p in element.properties:
+        value_size = np.dtype(PLY_TYPES[p.value_type]).itemsize
+        count_format = struct.Struct(byte_order + struct_code(p.count_type)) if p.is_list else None
+        layout.append((p, count_format, value_size))
+
+    starts = {p.name: [] for p in element.properties}
+    sizes = {p.name: [] for p in element.properties if p.is_list}
+    position = offset
+    if len(layout) == 1 and layout[0][0].is_list and layout[0][1].size == 1 and layout[0][0].count_type in ("uchar", "uint8"):
+        # Faces only holding their vertex indices, the usual case
+        p, _, value_size = layout[0]
+        list_starts, list_sizes = starts[p.name], sizes[p.name]
+        for _ in range(element.count):
+            size = data[position]
+            list_starts.append(position)
+            list_sizes.append(size)
+            position += 1 + size*value_size
+    else:
+        for _ in range(element.count):
+            for p, count_format, value_size in layout:
+                starts[p.name].append(position)
+                if count_format is None:
+                    position += value_size
+                else:
+                    size = count_format.unpack_from(data, position)[0]
+                    sizes[p.name].append(size)
+                    position += count_format.size + size*value_size
+
+    buffer = np.frombuffer(data, dtype=np.uint8, count=position - offset, offset=offset)
+    columns = {}
+    for p, count_format, value_size in layout:
+        dtype = np.dtype(byte_order + PLY_TYPES[p.value_type])
+        record_starts = np.array(starts[p.name], dtype=np.int64) - offset
+        if count_format is None:
+            columns[p.name] = gather_values(buffer, record_starts, dtype)
+            continue
+        list_sizes = np.array(sizes[p.name], dtype=np.int32)
+        # Position of every value: start of the values of its list plus its rank in the list
+        first_values = np.cumsum(list_sizes) - list_sizes
+        ranks = np.arange(int(list_sizes.sum())) - np.repeat(first_values, list_sizes)
+        value_starts = np.repeat(record_starts + count_format.size, list_sizes) + ranks*value_size
+        columns[p.name] = (list_sizes, gather_values(buffer, value_starts, dtype))
+    return columns, position
+
+
+def gather_values(buffer, starts, dtype):
+    """Values of type `dtype` stored at byte offsets `starts` of a uint8 buffer"""
+    indices = starts[:, np.newaxis] + np.arange(dtype.itemsize)
+    return np.ascontiguousarray(buffer[indices]).view(dtype).reshape(-1).astype(dtype.newbyteorder("="))
+
+
+def struct_code(ply_type):
+    """Convert a .ply type into a `struct` format character"""
+    return {"i1": "b", "u1": "B", "i2": "h", "u2": "H", "i4": "i", "u4": "I", "f4": "f", "f8": "d"}[PLY_TYPES[ply_type]]
+
+
+def read_ascii_elements(data, header_size, elements):
+    """Decode every element of an ascii .ply file"""
+    lines = bytes(data[header_size:]).splitlines()
+    lines = [line for line in lines if line.strip()]
+    result = {}
+    start = 0
+    for element in elements:
+        element_lines = lines[start:start + element.count]
+        start += element.count
+        result[element.name] = read_ascii_element(element_lines, element)
+    return result
+
+
+def read_ascii_element(lines, element):
+    """Decode the lines of a single ascii element"""
+    if element.count == 0:
+        return {p.name: (np.zeros(0, dtype=np.int32), np.zeros(0)) if p.is_list else np.zeros(0)
+                for p in element.properties}
+
+    tokens = b" ".join(lines).split()
+    if len(tokens) % element.count == 0:
+        # Every record has the same number of values, decode all of them at once
+        table = np.array(tokens, dtype=np.float64).reshape(element.count, -1)
+        columns = {}
+        column = 0
+        uniform = True
+        for p in element.properties:
+            if p.is_list:
+                size = int(table[0, column])
+                if not np.all(table[:, column] == size):
+                    uniform = False
+                    break
+                values = table[:, column + 1:column + 1 + size].astype(PLY_TYPES[p.value_type])
+                columns[p.name] = (np.full(element.count, size, dtype=np.int32), values.reshape(-1))
+                column += size + 1
+            else:
+                columns[p.name] = table[:, column].astype(PLY_TYPES[p.value_type])
+                column += 1
+        if uniform and column == table.shape[1]:
+            return columns
+
+    values = {p.name: [] for p in element.properties}
+    sizes = {p.name: np.zeros(element.count, dtype=np.int32) for p in element.properties if p.is_list}
+    for i, line in enumerate(lines):
+        words = line.split()
+        column = 0
+        for p in element.properties:
+            if p.is_list:
+                size = int(words[column])
+                values[p.name].extend(words[column + 1:column + 1 + size])
+                sizes[p.name][i] = size
+                column += size + 1
+            else:
+                values[p.name].append(words[column])
+                column += 1
+
+    columns = {}
+    for p in element.properties:
+        array = np.array(values[p.name], dtype=np.float64).astype(PLY_TYPES[p.value_type])
+        columns[p.name] = (sizes[p.name], array) if p.is_list else array
+    return columns
+
+
+def to_unit_color(columns, names):
+    """Stack color columns into an (N, 4) float32 array in [0, 1], alpha defaults to 1"""
+    count = len(columns[names[0]])
+    colors = np.ones((count, 4), dtype=np.float32)
+    for i, name in enumerate(COLOR_PROPERTIES):
+        if name not in columns:
+            continue
+        column = columns[name]
+        if np.issubdtype(column.dtype, np.integer):
+            colors[:, i] = column/np.float32(np.iinfo(column.dtype).max)
+        else:
+            colors[:, i] = column
+    return colors
+
+
+def build_mesh(elements, columns):
+    """Gather decoded element columns into a PlyMesh"""
+    mesh = PlyMesh()
+
+    vertex = columns.get("vertex", {})
+    if vertex:
+        mesh.vertices = np.empty((len(vertex["x"]), 3), dtype=np.float32)
+        for i, name in enumerate("xyz"):
+            mesh.vertices[:, i] = vertex[name]
+
+        if all(name in vertex for name in NORMAL_PROPERTIES):
+            mesh.normals = np.empty_like(mesh.vertices)
+            for i, name in enumerate(NORMAL_PROPERTIES):
+                mesh.normals[:, i] = vertex[name]
+
+        if all(name in vertex for name in COLOR_PROPERTIES[:3]):
+            mesh.colors = to_unit_color(vertex, COLOR_PROPERTIES)
+
+        for name, column in vertex.items():
+            if name not in ("x", "y", "z") and name not in NORMAL_PROPERTIES and name not in COLOR_PROPERTIES:
+                mesh.attributes[name] = column.astype(np.float32)
+
+    face = columns.get("face", {})
+    for name in FACE_INDEX_PROPERTIES:
+        if name in face:
+            sizes, indices = face[name]
+            mesh.face_sizes = sizes.astype(np.int32, copy=False)
+            mesh.face_indices = indices.astype(np.int32)
+            break
+
+    if face and all(name in face for name in COLOR_PROPERTIES[:3]):
+        mesh.face_colors = to_unit_color(face, COLOR_PROPERTIES)
+
+    for name, column in face.items():
+        if name not in FACE_INDEX_PROPERTIES and name not in COLOR_PROPERTIES and not isinstance(column, tuple):
+            mesh.face_attributes[name] = column.astype(np.float32)
+
+    return mesh
+
+
+def read_ply(path):
+    """
+    Read a .ply file into a PlyMesh.
+
+    :param path: path to the .ply file
+    """
+    with open(path, "rb") as fp:
+        data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+    columns = {}
+    try:
+        byte_order, elements, header_size = read_header(data)
+
+        if byte_order is None:
+            columns = read_ascii_elements(data, header_size, elements)
+        else:
+            columns = {}
+            offset = header_size
+            for element in elements:
+                columns[element.name], offset = read_binary_element(data, offset, element, byte_order)
+
+        # Copies every array out of the mapping so the file can be closed
+        mesh = build_mesh(elements, columns)
+    finally:
+        del columns
+        data.close()
+
+    return mesh
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        start = time.perf_counter()
+        mesh = read_ply(path)
+        elapsed = time.perf_counter() - start
+        print("{}: {} vertices, {} faces, colors: {}, attributes: {} ({:.3f} s)".format(
+            path, mesh.vertex_count, mesh.face_count, mesh.colors is not None,
+            list(mesh.attributes), elapsed))
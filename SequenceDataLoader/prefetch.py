@@ -0,0 +1,64 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .timestep_cache import data_file
+
+
+class Prefetcher:
+    """
+    Read and decode files on a thread pool ahead of time, keeping at most `capacity` of them.
+
+    :param reader: function decoding a file, called with its path
+    :param workers: number of threads, defaults to the number of cores (up to 8)
+    :param capacity: maximum number of files being decoded or waiting to be used
+    """
+
+    def __init__(self, reader, workers=None, capacity=8):
+        self.reader = reader
+        self.capacity = capacity
+        self.executor = ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1),
+                                           thread_name_prefix="sequence_prefetch")
+        self.futures = OrderedDict()
+        self.lock = threading.Lock()
+
+
+    def prefetch(self, paths):
+        """
+        Start decoding `paths` in the background, most urgent first.
+        Missing files are ignored, they will raise when actually requested.
+        """
+        with self.lock:
+            for path in paths:
+                if path in self.futures:
+                    self.futures.move_to_end(path)
+                elif os.path.isfile(data_file(path)):
+                    self.futures[path] = self.executor.submit(self.reader, path)
+
+            # Drop the least recently requested files, cancelling them if not started yet
+            while len(self.futures) > self.capacity:
+                _, future = self.futures.popitem(last=False)
+                future.cancel()
+
+
+    def get(self, path):
+        """
+        Return the decoded content of `path`, waiting for it if it is being prefetched
+        or reading it in the calling thread if it was never requested.
+        """
+        with self.lock:
+            future = self.futures.pop(path, None)
+
+        if future is None or future.cancelled():
+            return self.reader(path)
+        return future.result()
+
+
+    def shutdown(self):
+        """Cancel pending reads and stop the worker threads"""
+        with self.lock:
+            for future in self.futures.values():
+                future.cancel()
+            self.futures.clear()
+        self.executor.shutdown(wait=False)
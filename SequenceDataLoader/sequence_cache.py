@@ -0,0 +1,155 @@
+"""
+Compact memory-mapped format (.seqc) for the timesteps of a sequence: a JSON header
+followed by columnar sections aligned on 64 bytes.
+"""
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from .ply_reader import PlyMesh
+
+CACHE_EXTENSION = ".seqc"
+MAGIC = b"SEQC"
+VERSION = 1
+ALIGNMENT = 64
+
+
+def cache_path(path):
+    """Path of the compact cache file of a data file"""
+    return os.path.splitext(path)[0] + CACHE_EXTENSION
+
+
+def quantize(values, bits, lower=None, upper=None):
+    """
+    Quantize float values to unsigned integers of `bits` bits over [lower, upper]
+
+    :returns: quantized values and the (lower, upper) range needed to restore them
+    """
+    if lower is None:
+        lower = float(np.min(values)) if values.size else 0.0
+    if upper is None:
+        upper = float(np.max(values)) if values.size else 0.0
+    levels = 2**bits - 1
+    scale = levels/(upper - lower) if upper > lower else 0.0
+    quantized = np.rint((values - lower)*scale).clip(0, levels)
+    return quantized.astype("<u{}".format(bits//8)), (lower, upper)
+
+
+def dequantize(values, value_range):
+    """Restore float32 values quantized by `quantize`"""
+    lower, upper = value_range
+    levels = np.iinfo(values.dtype).max
+    return (values.astype(np.float32)*np.float32((upper - lower)/levels) + np.float32(lower)).astype(np.float32)
+
+
+def write_cache(path, mesh, scalar_bits=16):
+    """
+    Write a PlyMesh to a compact cache file
+
+    :param scalar_bits: bits used to quantize normals and scalar attributes (8 or 16), 0 keeps float32.
+        Attributes only holding integers are always kept as float32.
+    """
+    sections = [("vertices", np.ascontiguousarray(mesh.vertices, dtype="<f4"), None)]
+
+    face_sizes = np.unique(mesh.face_sizes)
+    if len(face_sizes) > 1:
+        sections.append(("face_sizes", mesh.face_sizes.astype("<u4"), None))
+    sections.append(("face_indices", mesh.face_indices.astype("<u4"), None))
+
+    def add_scalars(name, values, lower=None, upper=None, exact=False):
+        if scalar_bits and not exact:
+            quantized, value_range = quantize(values, scalar_bits, lower, upper)
+            sections.append((name, quantized, value_range))
+        else:
+            sections.append((name, values.astype("<f4"), None))
+
+    if mesh.normals is not None:
+        add_scalars("normals", mesh.normals, -1.0, 1.0)
+    if mesh.colors is not None:
+        sections.append(("colors", quantize(mesh.colors, 8, 0.0, 1.0)[0], (0.0, 1.0)))
+    if mesh.face_colors is not None:
+        sections.append(("face_colors", quantize(mesh.face_colors, 8, 0.0, 1.0)[0], (0.0, 1.0)))
+    # Integer valued properties (material_index, ids...) would be restored as other values
+    for name, values in mesh.attributes.items():
+        add_scalars("attributes/" + name, values, exact=is_integer_valued(values))
+    for name, values in mesh.face_attributes.items():
+        add_scalars("face_attributes/" + name, values, exact=is_integer_valued(values))
+
+    header = {
+        "vertex_count": mesh.vertex_count,
+        "face_count": mesh.face_count,
+        "face_size": int(face_sizes[0]) if len(face_sizes) == 1 else None,
+        "topology_hash": mesh.topology_hash(),
+        "sections": [],
+    }
+    offset = 0
+    for name, array, value_range in sections:
+        header["sections"].append({"name": name, "dtype": array.dtype.str, "shape": list(array.shape),
+                                   "offset": offset, "range": value_range})
+        offset += align(array.nbytes)
+
+    header_bytes = json.dumps(header).encode()
+    data_start = align(len(MAGIC) + 8 + len(header_bytes))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as cache_file:
+        cache_file.write(MAGIC + struct.pack("<II", VERSION, len(header_bytes)) + header_bytes)
+        for (name, array, _), section in zip(sections, header["sections"]):
+            cache_file.seek(data_start + section["offset"])
+            cache_file.write(array.tobytes())
+        cache_file.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def read_cache(path):
+    """
+    Read a compact cache file into a PlyMesh. Positions and indices are views of the mapped file.
+    """
+    with open(path, "rb") as cache_file:
+        data = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if data[:4] != MAGIC:
+        raise Exception("{} is not a sequence cache file".format(path))
+    version, header_size = struct.unpack_from("<II", data, 4)
+    if version != VERSION:
+        raise Exception("Unsupported sequence cache version {} in {}".format(version, path))
+    header = json.loads(data[12:12 + header_size])
+    data_start = align(12 + header_size)
+
+    sections = {}
+    for section in header["sections"]:
+        dtype = np.dtype(section["dtype"])
+        array = np.frombuffer(data, dtype=dtype, count=int(np.prod(section["shape"])),
+                              offset=data_start + section["offset"]).reshape(section["shape"])
+        if section["range"] is not None and dtype.kind == "u":
+            array = dequantize(array, section["range"])
+        sections[section["name"]] = array
+
+    mesh = PlyMesh()
+    mesh.vertices = sections["vertices"]
+    mesh.face_indices = sections["face_indices"].view(np.int32)
+    if "face_sizes" in sections:
+        mesh.face_sizes = sections["face_sizes"].view(np.int32)
+    else:
+        mesh.face_sizes = np.full(header["face_count"], header["face_size"] or 0, dtype=np.int32)
+    mesh.normals = sections.get("normals")
+    mesh.colors = sections.get("colors")
+    mesh.face_colors = sections.get("face_colors")
+    for name, array in sections.items():
+        if name.startswith("attributes/"):
+            mesh.attributes[name[len("attributes/"):]] = array
+        elif name.startswith("face_attributes/"):
+            mesh.face_attributes[name[len("face_attributes/"):]] = array
+    mesh.stored_topology_hash = header["topology_hash"]
+    return mesh
+
+
+def is_integer_valued(values):
+    return values.size > 0 and bool(np.all(np.rint(values) == values))
+
+
+def align(size):
+    return (size + ALIGNMENT - 1)//ALIGNMENT*ALIGNMENT
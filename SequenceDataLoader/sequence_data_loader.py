@@ -1,6 +1,19 @@
 import bpy
 import os
 import re
+import json
+import math
+import time
+import numpy as np
+
+from .ply_reader import UV_PROPERTIES, interpolate_mesh, read_ply, vertices_only
+from .prefetch import Prefetcher
+from .sequence_index import SequenceIndex, lod_path, remove_manifest
+from .sequence_cache import CACHE_EXTENSION, cache_path, read_cache
+from .sequence_delta import DELTA_EXTENSION, member_path, open_sequence, read_delta
+from .shared_cache import SharedCache
+from .timestep_cache import ARCHIVE_SEPARATOR, TimestepCache, data_file
+from .timing_log import NullTimingLog, TimingLog
 
 USE_YAML = True
 try:
@@ -8,6 +21,152 @@ try:
 except ModuleNotFoundError:
     USE_YAML = False
 
+# Functions decoding each supported file type
+READERS = {".ply": read_ply, CACHE_EXTENSION: read_cache, DELTA_EXTENSION: read_delta}
+
+# Files loaded by volume objects, read by Blender itself
+VOLUME_EXTENSIONS = (".vdb",)
+
+# Decoded timesteps and background reader shared by every scene, created on first use
+cache = None
+prefetcher = None
+
+# SequenceIndex of each template path, None for templates that couldn't be indexed
+indices = {}
+
+# os.stat of the data files looked up during the current load (or found by the indices), cleared at
+# the start of each load so files exported again in place are seen
+stats = {}
+
+# time.monotonic() of the last reduced resolution load, used to wait for the playhead to settle
+last_lod_load = 0.0
+
+# Per-stage timing log, disabled until a log path is set
+timing = NullTimingLog()
+
+# Decoded timesteps shared with the other instances of the node, None until a directory is set
+shared_cache = None
+
+
+def get_cache():
+    global cache
+    if cache is None:
+        cache = TimestepCache()
+    return cache
+
+
+def read_data(path):
+    """Read a data file, going through the timestep cache"""
+    return get_cache().get(path, read_file)
+
+
+def read_file(path):
+    """Decode a data file, through the node shared cache if enabled (compact cache files are mapped directly)"""
+    if shared_cache is not None and get_reader(path) is not read_cache:
+        return shared_cache.get(path, decode_file)
+    return decode_file(path)
+
+
+def decode_file(path):
+    """
+    Decode a data file, adding the bytes read to the timing log of the current frame.
+    The topology hash is computed here, on the reading threads, and kept with the cached mesh.
+    """
+    if ARCHIVE_SEPARATOR not in path:
+        timing.count(bytes_read=os.path.getsize(path))
+    mesh = get_reader(path)(path)
+    mesh.topology_hash()
+    return mesh
+
+
+def get_reader(path):
+    """Function decoding `path`, None if the file type isn't supported"""
+    return READERS.get(os.path.splitext(data_file(path))[1])
+
+
+def get_prefetcher():
+    global prefetcher
+    if prefetcher is None:
+        prefetcher = Prefetcher(read_data)
+    return prefetcher
+
+
+def get_index(template_path, use_manifest=False):
+    """
+    Returns the SequenceIndex of a template path, scanning its directory (or reading its manifest) on first use.
+    The timesteps of a .seqd archive are listed in the archive itself.
+    """
+    if template_path not in indices:
+        index = None
+        try:
+            if template_path.endswith(DELTA_EXTENSION):
+                index = SequenceIndex(template_path, open_sequence(template_path).files())
+            elif use_manifest:
+                index = SequenceIndex.load(template_path)
+            if index is None:
+                index = SequenceIndex(template_path)
+                # A probe finding nothing (e.g. compact cache files not converted yet) isn't worth remembering
+                if use_manifest and index.files:
+                    index.save()
+            stats.update(index.stats)
+        except Exception as error:
+            print("Could not index {}: {}".format(template_path, error))
+        indices[template_path] = index
+    return indices[template_path]
+
+
+def get_stat(path):
+    """os.stat of a file, looked up once per load, None if it doesn't exist"""
+    if path not in stats:
+        try:
+            stats[path] = os.stat(path)
+        except OSError:
+            return None
+    return stats[path]
+
+
+def get_timing(path=""):
+    """
+    Returns the TimingLog writing to `path`, opened on first use, or a log doing nothing if `path` is empty
+    """
+    global timing
+    path = bpy.path.abspath(path) if path else ""
+    if timing.template != path:
+        timing.close()
+        timing = TimingLog(path) if path else NullTimingLog()
+    return timing
+
+
+def get_shared_cache(path="", size=0):
+    """
+    Returns the node shared cache in directory `path`, opened on first use, or None if `path` is empty
+
+    :param size: maximum size of the cache in MB
+    """
+    global shared_cache
+    path = bpy.path.abspath(path) if path else ""
+    if (shared_cache.template if shared_cache is not None else "") != path:
+        if shared_cache is not None:
+            shared_cache.close()
+        shared_cache = SharedCache(path) if path else None
+    if shared_cache is not None:
+        shared_cache.max_bytes = size*1024*1024
+    return shared_cache
+
+
+def shutdown_shared_cache():
+    global shared_cache
+    if shared_cache is not None:
+        shared_cache.close()
+        shared_cache = None
+
+
+def shutdown_prefetcher():
+    global prefetcher
+    if prefetcher is not None:
+        prefetcher.shutdown()
+        prefetcher = None
+
 
 def enable_live_update(self, context):
     if context.scene.sequence_data.live_update:
@@ -17,9 +176,211 @@ def enable_live_update(self, context):
 
 
 def load_object_on_frame_change(scene):
-    """Load objects at current frame if `live_update` is enabled"""
-    if scene.sequence_data.live_update:
-        scene.sequence_data.load_objects(scene.frame_current)
+    """
+    Load objects at current frame if `live_update` is enabled, with the reduced resolution
+    `playback_lod` while the animation plays or the timeline is scrubbed
+    """
+    global last_lod_load
+    sequence_data = scene.sequence_data
+    if sequence_data.live_update:
+        lod = sequence_data.playback_lod if is_playing() else 0
+        sequence_data.load_objects(scene.frame_current, lod, keep_unchanged=True)
+
+        if sequence_data.last_read_lod > 0 and sequence_data.settle_time > 0:
+            last_lod_load = time.monotonic()
+            if not bpy.app.timers.is_registered(upgrade_lod):
+                bpy.app.timers.register(upgrade_lod, first_interval=sequence_data.settle_time)
+
+
+def is_playing():
+    """True while the animation plays or the timeline is scrubbed in any window"""
+    window_manager = bpy.context.window_manager
+    if window_manager is None:
+        return False
+    return any(window.screen.is_animation_playing or getattr(window.screen, "is_scrubbing", False)
+               for window in window_manager.windows)
+
+
+def upgrade_lod():
+    """Timer loading full resolution data once the playhead didn't move for `settle_time` seconds"""
+    scene = bpy.context.scene
+    sequence_data = scene.sequence_data
+    if sequence_data.last_read_lod == 0 or sequence_data.settle_time <= 0:
+        return None
+
+    remaining = sequence_data.settle_time - (time.monotonic() - last_lod_load)
+    if is_playing() or remaining > 0:
+        return max(remaining, 0.1)
+
+    sequence_data.load_objects(scene.frame_current, keep_unchanged=True)
+    return None
+
+
+def file_identity(path):
+    """
+    Identity of the file holding `path`, shared by hard and symbolic links to the same file
+    (e.g. static sources exported once by `export_ply.py --static-sources`), None if it doesn't exist
+    """
+    stat = get_stat(data_file(path))
+    if stat is None:
+        return None
+    identity = "{}:{}:{}:{}".format(stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    return identity + path[len(data_file(path)):]
+
+
+def get_lod_path(path, lod):
+    """Path of the most reduced existing level up to `lod` of a data file, the file itself if it has none"""
+    if ARCHIVE_SEPARATOR in path:
+        return path
+    for level in range(lod, 0, -1):
+        if os.path.isfile(lod_path(path, level)):
+            return lod_path(path, level)
+    return path
+
+
+def fill_mesh(mesh, ply_mesh):
+    """
+    Replace the geometry of `mesh` with the content of a PlyMesh using bulk `foreach_set` calls.
+    Materials of the mesh are left untouched. If the connectivity is the same as the one already
+    loaded, only the vertex attributes are overwritten.
+    """
+    topology = ply_mesh.topology_hash()
+    if has_topology(mesh, ply_mesh, topology):
+        mesh.vertices.foreach_set("co", ply_mesh.vertices.ravel())
+        set_colors(mesh, ply_mesh)
+        set_uvs(mesh, ply_mesh)
+        set_attributes(mesh, ply_mesh)
+        mesh.update()
+        return
+
+    mesh.clear_geometry()
+
+    mesh.vertices.add(ply_mesh.vertex_count)
+    mesh.vertices.foreach_set("co", ply_mesh.vertices.ravel())
+
+    mesh.loops.add(len(ply_mesh.face_indices))
+    mesh.loops.foreach_set("vertex_index", ply_mesh.face_indices)
+
+    mesh.polygons.add(ply_mesh.face_count)
+    mesh.polygons.foreach_set("loop_start", ply_mesh.loop_starts)
+
+    set_colors(mesh, ply_mesh)
+    set_uvs(mesh, ply_mesh)
+    set_attributes(mesh, ply_mesh)
+
+    mesh.update(calc_edges=True)
+    mesh["sequence_topology"] = topology
+
+
+def has_topology(mesh, ply_mesh, topology):
+    """Check if `mesh` was last filled with a PlyMesh of identical connectivity"""
+    return mesh.get("sequence_topology") == topology and \
+        len(mesh.vertices) == ply_mesh.vertex_count and \
+        len(mesh.polygons) == ply_mesh.face_count and \
+        len(mesh.loops) == len(ply_mesh.face_indices)
+
+
+def set_colors(mesh, ply_mesh):
+    """Write the colors of a PlyMesh into the `Col` color attribute, reusing it when possible"""
+    if ply_mesh.colors is not None:
+        colors, domain = ply_mesh.colors, "POINT"
+    elif ply_mesh.face_colors is not None:
+        colors, domain = ply_mesh.face_colors, "FACE"
+    else:
+        return
+
+    attribute = mesh.color_attributes.get("Col")
+    if attribute is None or attribute.domain != domain:
+        if attribute is not None:
+            mesh.color_attributes.remove(attribute)
+        attribute = mesh.color_attributes.new("Col", "BYTE_COLOR", domain)
+    attribute.data.foreach_set("color_srgb", colors.ravel())
+
+
+def set_uvs(mesh, ply_mesh):
+    """Write the texture coordinates of a PlyMesh into the `UVMap` UV layer, as Blender's .ply importer does"""
+    uvs = ply_mesh.get_uvs()
+    if uvs is None or not len(ply_mesh.face_indices):
+        return
+    layer = mesh.uv_layers.get("UVMap") or mesh.uv_layers.new(name="UVMap")
+    layer.data.foreach_set("uv", uvs[ply_mesh.face_indices].ravel())
+
+
+def set_attributes(mesh, ply_mesh):
+    """
+    Write the extra vertex and face properties of a PlyMesh into float attributes of the same name.
+    A `material_index` face property sets the material of each face, texture coordinates go to the UV layer.
+    """
+    uv_names = [name for pair in UV_PROPERTIES if all(name in ply_mesh.attributes for name in pair) for name in pair][:2]
+    for domain, attributes in (("POINT", ply_mesh.attributes), ("FACE", ply_mesh.face_attributes)):
+        for name, values in attributes.items():
+            if domain == "POINT" and name in uv_names and len(ply_mesh.face_indices):
+                continue
+            if domain == "FACE" and name == "material_index":
+                mesh.polygons.foreach_set("material_index", np.rint(values).astype(np.int32))
+                continue
+
+            attribute = mesh.attributes.get(name)
+            if attribute is None or attribute.domain != domain or attribute.data_type != "FLOAT":
+                if attribute is not None:
+                    mesh.attributes.remove(attribute)
+                attribute = mesh.attributes.new(name, "FLOAT", domain)
+            attribute.data.foreach_set("value", values)
+
+
+def set_ranges(object, path):
+    """
+    Store the ranges of the properties of a data file (`surface.ranges.json` next to `surface.ply`,
+    written by `export_ply.py --arrays`) as `<name>_min` and `<name>_max` custom properties of the object,
+    readable by the Attribute node of materials to colormap the attributes. Files without ranges are ignored.
+    """
+    try:
+        with open(os.path.splitext(data_file(path))[0] + ".ranges.json", "r") as ranges_file:
+            ranges = json.load(ranges_file)
+    except (OSError, ValueError):
+        return
+
+    for name, array in ranges.get("arrays", {}).items():
+        if array.get("range") is not None:
+            object[name + "_min"], object[name + "_max"] = array["range"]
+    if "colormap" in ranges:
+        object["colormap_min"], object["colormap_max"] = ranges["colormap"]["range"]
+
+
+def swap_volume(volume, path):
+    """
+    Point a Volume datablock to another file. Blender reads grids on demand, so only the grids
+    that were loaded from the previous file (used by the viewport or the materials) are loaded again.
+    """
+    if bpy.path.abspath(volume.filepath) == path:
+        return
+
+    used_grids = {grid.name for grid in volume.grids if grid.is_loaded}
+    volume.is_sequence = False
+    volume.filepath = path
+    if not volume.grids.load():
+        raise Exception("Could not load {}: {}".format(path, volume.grids.error_message))
+    for grid in volume.grids:
+        if grid.name in used_grids:
+            grid.load()
+
+
+def set_shading(mesh, shade_smooth, auto_smooth=False, auto_smooth_angle=math.radians(30), normals=None):
+    """
+    Set smooth shading of every face at once, and optionally sharp edges by angle
+    and custom split normals (per vertex normals read from the file).
+    """
+    mesh.polygons.foreach_set("use_smooth", np.full(len(mesh.polygons), shade_smooth, dtype=bool))
+
+    # Blender 4.1 replaced the auto smooth mesh settings by sharp edge attributes
+    if hasattr(mesh, "use_auto_smooth"):
+        mesh.use_auto_smooth = auto_smooth or normals is not None
+        mesh.auto_smooth_angle = auto_smooth_angle if auto_smooth else math.pi
+    elif auto_smooth or "sharp_edge" in mesh.attributes:
+        mesh.set_sharp_from_angle(angle=auto_smooth_angle if auto_smooth else math.pi)
+
+    if normals is not None:
+        mesh.normals_split_custom_set_from_vertices(normals)
 
 
 class SequenceDataLoadObjects(bpy.types.Operator):
@@ -28,10 +389,38 @@ class SequenceDataLoadObjects(bpy.types.Operator):
     bl_label = "Load Objects"
 
     def execute(self, context):
+        # Reload every object, even those holding the files of the current frame already
+        bpy.context.scene.sequence_data.last_read_time = -1
         bpy.context.scene.sequence_data.load_objects(bpy.context.scene.frame_current)
         return {"FINISHED"}
 
 
+class SequenceDataRescan(bpy.types.Operator):
+    """Scan the sequence directories again, to pick up new timesteps"""
+    bl_idname = "sequencedata.rescan"
+    bl_label = "Rescan sequences"
+
+    def execute(self, context):
+        sequence_data = context.scene.sequence_data
+        indices.clear()
+        stats.clear()
+        for object in sequence_data.objects:
+            template_path = bpy.path.abspath(object.path)
+            if template_path.endswith(DELTA_EXTENSION):
+                continue
+            # Manifests of the compact cache files probed next to .ply files are replaced too
+            for path in [template_path] + ([cache_path(template_path)] if template_path.endswith(".ply") else []):
+                index = get_index(path)
+                if index is None or not sequence_data.use_manifest:
+                    continue
+                if index.files:
+                    index.save()
+                else:
+                    remove_manifest(path)
+        sequence_data.last_read_time = -1
+        return {"FINISHED"}
+
+
 class SequenceDataAddObject(bpy.types.Operator):
     """Add new object sequence"""
     bl_idname = "sequencedata.add_object"
@@ -81,8 +470,13 @@ class SequenceDataWriteConfig(bpy.types.Operator):
 class ObjectDataSequence(bpy.types.PropertyGroup):
     name: bpy.props.StringProperty(name="Name")
     shade_smooth: bpy.props.BoolProperty(name="Shade Smooth", default=True)
+    auto_smooth: bpy.props.BoolProperty(name="Auto Smooth", description="Mark edges above the angle as sharp.")
+    auto_smooth_angle: bpy.props.FloatProperty(name="Angle", subtype="ANGLE", min=0, max=math.pi, default=math.radians(30))
+    use_file_normals: bpy.props.BoolProperty(name="File Normals", description="Use normals stored in the file as custom split normals.")
     path: bpy.props.StringProperty(name="Path", subtype="FILE_PATH")
     enable: bpy.props.BoolProperty(name="Enable", default=True)
+    point_cloud: bpy.props.BoolProperty(name="Point cloud",
+                                        description="Only load the vertices and their attributes, as a mesh without faces whose points can be instanced with geometry nodes.")
 
 
 class SequenceDataLoader(bpy.types.PropertyGroup):
@@ -91,13 +485,50 @@ class SequenceDataLoader(bpy.types.PropertyGroup):
     """
     config_file: bpy.props.StringProperty(name="Config file", subtype = 'FILE_PATH')
     timing_interpolate: bpy.props.BoolProperty(name="Interpolate time")
+    interpolate_vertices: bpy.props.BoolProperty(name="Interpolate vertices",
+                                                 description="Blend vertex positions and attributes of consecutive timesteps with the same connectivity when a frame falls between them.")
     live_update: bpy.props.BoolProperty(name="Live update", update=enable_live_update)
     timing_time_start: bpy.props.IntProperty(name="Start Time", description="First time index of Sequences.")
     timing_time_end: bpy.props.IntProperty(name="End Time", description="Final time index of Sequences.")
     objects: bpy.props.CollectionProperty(type=ObjectDataSequence)
     export_path: bpy.props.StringProperty(name="Export path", subtype = 'DIR_PATH')
+    image_format: bpy.props.EnumProperty(name="Image format", default="PNG",
+                                         items=[("PNG", "PNG", ""), ("OPEN_EXR", "OpenEXR", ""), ("NPY", "Raw float (.npy)", "")])
+    png_compression: bpy.props.IntProperty(name="PNG compression", min=0, max=9, default=6,
+                                           description="zlib compression level of PNG images.")
+    exr_codec: bpy.props.EnumProperty(name="EXR codec", default="ZIP",
+                                      items=[(codec, codec, "") for codec in ("NONE", "ZIP", "ZIPS", "PIZ", "PXR24", "RLE", "B44", "B44A", "DWAA", "DWAB")])
+    async_write: bpy.props.BoolProperty(name="Write in background",
+                                        description="Encode and write rendered images on a background thread while the next frame renders.")
+    write_queue_size: bpy.props.IntProperty(name="Write queue", min=1, default=2,
+                                            description="Maximum number of rendered images waiting to be written.")
+    parallel_read: bpy.props.BoolProperty(name="Parallel read", default=True,
+                                          description="Read and decode the files of all objects of a frame at the same time on background threads.")
+    prefetch_steps: bpy.props.IntProperty(name="Prefetch steps", min=0, default=0,
+                                          description="Number of upcoming timesteps read in the background, 0 to disable.")
+    cache_size: bpy.props.IntProperty(name="Cache size (MB)", min=0, default=1024,
+                                      description="Memory kept for recently read timesteps, 0 to disable.")
+    missing_steps: bpy.props.EnumProperty(name="Missing steps", default="EXACT",
+                                          description="File to use when a timestep is missing from a sequence.",
+                                          items=[("EXACT", "Error", "Fail to load missing timesteps"),
+                                                 ("PREVIOUS", "Previous", "Use the last available timestep before"),
+                                                 ("NEAREST", "Nearest", "Use the closest available timestep")])
+    shared_cache: bpy.props.StringProperty(name="Shared cache", subtype="DIR_PATH",
+                                           description="Node-local directory (e.g. /dev/shm/sequence_{job}) where decoded timesteps are shared with the other Blender instances of the node, empty to disable. {job} is replaced by the job ID of the scheduler.")
+    shared_cache_size: bpy.props.IntProperty(name="Shared cache size (MB)", min=0, default=8192,
+                                             description="Size of the shared cache above which the least recently used timesteps are removed.")
+    timing_log: bpy.props.StringProperty(name="Timing log", subtype="FILE_PATH",
+                                         description="JSON lines file (or folder) where the time spent in each stage of every frame is written, empty to disable. {host} and {pid} are replaced by the worker's hostname and PID.")
+    use_manifest: bpy.props.BoolProperty(name="Use manifest",
+                                         description="Save the list of files of each sequence in a json manifest next to the data and read it instead of scanning the directory.")
+    playback_lod: bpy.props.IntProperty(name="Playback LOD", min=0, default=0,
+                                        description="Reduced resolution level (.lod1.ply...) loaded during playback and scrubbing, 0 to always load full resolution.")
+    settle_time: bpy.props.FloatProperty(name="Settle time (s)", min=0, default=0.5,
+                                         description="Time without frame change after which full resolution is loaded, 0 to keep the reduced level.")
 
     last_read_time: bpy.props.IntProperty(name="Last read time", default=-1)
+    last_read_lod: bpy.props.IntProperty(name="Last read level of detail", default=0)
+    last_read_fraction: bpy.props.FloatProperty(name="Last read fraction of timestep", default=0)
 
 
     def get_time(self, frame):
@@ -118,6 +549,24 @@ class SequenceDataLoader(bpy.types.PropertyGroup):
         return time
 
 
+    def get_time_fraction(self, frame):
+        """
+        Get how far `frame` is between its timestep (see `get_time`) and the next one, from 0 to 1
+        """
+        scene = bpy.context.scene
+        frame_start = scene.frame_start
+        frame_end = scene.frame_end
+
+        if self.timing_interpolate and (frame_start != frame_end):
+            time = (self.timing_time_end - self.timing_time_start)*(frame - frame_start)/(frame_end - frame_start) + self.timing_time_start
+        else:
+            time = (frame - frame_start) + self.timing_time_start
+
+        if time <= self.timing_time_start or time >= self.timing_time_end:
+            return 0.0
+        return time - self.get_time(frame)
+
+
     def get_path(self, template_path, time):
         """
         Get the path to the data file from a template string. If the template as `##` the sequence will use this pattern. 
@@ -132,6 +581,44 @@ class SequenceDataLoader(bpy.types.PropertyGroup):
         return path
 
 
+    def get_object_path(self, object, time, lod=0):
+        """
+        Get the path to the data file of a sequence object using its SequenceIndex, falls back
+        to `get_path` if the sequence couldn't be indexed or has no file to use for `time`.
+
+        :param lod: reduced resolution level to use if it was exported, 0 for full resolution
+        """
+        path = self.get_full_path(object, time)
+        if lod > 0:
+            path = get_lod_path(path, lod)
+        return path
+
+
+    def get_full_path(self, object, time):
+        """Path to the full resolution data file of a sequence object, see `get_object_path`"""
+        template_path = bpy.path.abspath(object.path)
+
+        index = get_index(template_path, self.use_manifest)
+
+        # Prefer compact cache files written by convert_sequence.py next to the .ply files, unless
+        # the .ply file was exported again after it
+        if template_path.endswith(".ply"):
+            cache_index = get_index(cache_path(template_path), self.use_manifest)
+            if cache_index is not None and time in cache_index.files:
+                cache_stat = get_stat(cache_index.files[time])
+                source_stat = get_stat(index.files[time]) if index is not None and time in index.files else None
+                if cache_stat is not None and (source_stat is None or cache_stat.st_mtime_ns >= source_stat.st_mtime_ns):
+                    return cache_index.files[time]
+
+        if index is not None:
+            path = index.get(time, self.missing_steps)
+            if path is not None:
+                return path
+        if template_path.endswith(DELTA_EXTENSION):
+            return member_path(template_path, time)
+        return self.get_path(template_path, time)
+
+
     def get_export_path(self, frame=None):
         """
         Returns the path where a frame is to be exported to
@@ -140,68 +627,199 @@ class SequenceDataLoader(bpy.types.PropertyGroup):
         """
 
         if frame:
-            return os.path.join(self.export_path, "export_{:08}.png".format(frame))
+            extension = {"PNG": "png", "OPEN_EXR": "exr", "NPY": "npy"}[self.image_format]
+            return os.path.join(self.export_path, "export_{:08}.{}".format(frame, extension))
         else:
             return self.export_path
 
 
-    def load_object(self, name, shade_smooth, path):
+    def load_object(self, name, shade_smooth, path, auto_smooth=False, auto_smooth_angle=math.radians(30), use_file_normals=False,
+                    next_path=None, fraction=0.0, point_cloud=False):
         """
-        Load single .ply file, replaces `name` object and applies `shade_smooth` if required.
+        Load single .ply file into the mesh of the `name` object and applies `shade_smooth` if required.
+        The mesh is filled in place so materials and modifiers of the object are kept.
+
+        :param auto_smooth: mark edges sharper than `auto_smooth_angle` as sharp
+        :param use_file_normals: use the normals stored in the file (nx, ny, nz) as custom split normals
+        :param next_path: file of the next timestep, blended with `path` at `fraction` if both have the same connectivity
+        :param point_cloud: only load the vertices and their attributes, faces of the file are ignored
         """
 
         original_object = bpy.data.objects[name]
+        timing = get_timing(self.timing_log)
+
+        with timing.stage("read"):
+            ply_mesh = self.read_mesh(path)
+        if point_cloud:
+            ply_mesh = vertices_only(ply_mesh)
+        if next_path is not None and next_path != path and fraction > 0 and os.path.isfile(data_file(next_path)):
+            with timing.stage("read"):
+                next_mesh = self.read_mesh(next_path)
+            if point_cloud:
+                next_mesh = vertices_only(next_mesh)
+            if next_mesh.topology_hash() == ply_mesh.topology_hash():
+                with timing.stage("interpolate"):
+                    ply_mesh = interpolate_mesh(ply_mesh, next_mesh, fraction)
+
+        with timing.stage("mesh"):
+            fill_mesh(original_object.data, ply_mesh)
+            set_ranges(original_object, path)
+
+        if not point_cloud:
+            with timing.stage("shading"):
+                normals = ply_mesh.normals if use_file_normals else None
+                set_shading(original_object.data, shade_smooth, auto_smooth, auto_smooth_angle, normals)
+        timing.count(vertices=ply_mesh.vertex_count, faces=ply_mesh.face_count)
+
+
+    def read_mesh(self, path):
+        """Decoded content of a data file, from the prefetcher or the timestep cache"""
+        # Only handles ply files, their compact cache and archives for now
+        if get_reader(path) is None:
+            raise Exception('Only .ply, {} and {} files supported'.format(CACHE_EXTENSION, DELTA_EXTENSION))
+        if self.prefetch_steps > 0 or self.parallel_read:
+            return get_prefetcher().get(path)
+        return read_data(path)
+
+
+    def load_volume(self, name, path):
+        """
+        Load a .vdb file into the volume of the `name` object by changing the file it points to
+        """
+        if not path.endswith(VOLUME_EXTENSIONS):
+            raise Exception('Only .vdb files supported for volume objects')
+        with get_timing(self.timing_log).stage("volume"):
+            swap_volume(bpy.data.objects[name].data, path)
 
-        for material in original_object.data.materials.values():
-            material.use_fake_user = True
-
-        # Only handles ply files for now
-        if path.endswith("ply"):
-            bpy.ops.wm.ply_import(filepath=path)
-        else:
-            raise Exception('Only .ply file supported')
-
-        imported_object = bpy.context.object
 
-        materials_list = original_object.material_slots.keys()
-        original_mesh_name = original_object.data.name
+    def load_objects(self, frame, lod=0, keep_unchanged=False):
+        """
+        Load every object in self.objects for the frame in parameter
 
-        # Replace old mesh with new one
-        original_object.data = imported_object.data
+        :param lod: reduced resolution level to load where available, 0 for full resolution
+        :param keep_unchanged: keep the meshes already holding the file of the frame (e.g. static
+            sources linked in every timestep), only while playing: loading explicitly reloads them
+        """
+        time = self.get_time(frame)
+        fraction = self.get_time_fraction(frame) if self.interpolate_vertices else 0.0
 
-        # Delete old mesh and new object
-        bpy.data.objects.remove(imported_object, do_unlink=True)
-        bpy.data.meshes.remove(bpy.data.meshes[original_mesh_name], do_unlink=True)
+        if time == self.last_read_time and lod == self.last_read_lod and fraction == self.last_read_fraction:
+            return
 
-        # Copy over materials
-        for material_name in materials_list:
-            original_object.data.materials.append(bpy.data.materials[material_name])
+        stats.clear()
+        get_cache().resize(self.cache_size*1024*1024)
+        get_shared_cache(self.shared_cache, self.shared_cache_size)
+        timing = get_timing(self.timing_log)
+        started = timing.begin(source="viewport", frame=frame, time=time, lod=lod)
+
+        objects = []
+        paths = []
+        keys = []
+        with timing.stage("path"):
+            for object in self.get_loadable_objects():
+                path = self.get_object_path(object, time, lod)
+                next_path = self.get_object_path(object, time + 1, lod) if fraction > 0 else None
+                # Meshes already holding the same file (e.g. the same static file linked in every timestep) are kept
+                key = self.get_load_key(object, path, next_path, fraction)
+                if keep_unchanged and key is not None and bpy.data.objects[object.name].data.get("sequence_file") == key:
+                    timing.count(objects_kept=1)
+                    continue
+                objects.append(object)
+                paths.append((path, next_path))
+                keys.append(key)
+
+        # Decode the files of every object at once, only filling the meshes stays on the main thread
+        if self.parallel_read:
+            self.read_ahead([path for pair in paths for path in pair if path is not None])
+
+        for object, (path, next_path), key in zip(objects, paths, keys):
+            if bpy.data.objects[object.name].type == "VOLUME":
+                self.load_volume(object.name, path)
+            else:
+                mesh = bpy.data.objects[object.name].data
+                mesh["sequence_file"] = ""
+                self.load_object(object.name, object.shade_smooth, path,
+                                 object.auto_smooth, object.auto_smooth_angle, object.use_file_normals,
+                                 next_path, fraction, object.point_cloud)
+                mesh["sequence_file"] = key or ""
+
+        if self.prefetch_steps > 0:
+            direction = -1 if time < self.last_read_time else 1
+            with timing.stage("prefetch"):
+                self.prefetch(time, direction, lod)
+
+        if started:
+            timing.end()
 
-        if shade_smooth:
-            for f in original_object.data.polygons:
-                f.use_smooth = True
+        self.last_read_time = time
+        self.last_read_lod = lod
+        self.last_read_fraction = fraction
 
 
-    def load_objects(self, frame):
+    def get_loadable_objects(self):
         """
-        Load every object in self.objects for the frame in parameter
+        Returns the sequence objects that can currently be updated
         """
-        time = self.get_time(frame)
-
-        if time == self.last_read_time:
-            return
-
+        loadable_objects = []
         for object in self.objects:
             if (not object.enable) or \
-                (not bpy.data.objects[object.name].type == "MESH") or \
+                (not bpy.data.objects[object.name].type in ("MESH", "VOLUME")) or \
                 (not bpy.data.objects[object.name].mode == "OBJECT"):
                 continue
+            loadable_objects.append(object)
+        return loadable_objects
 
 
-            path = self.get_path(bpy.path.abspath(object.path), time)
-            self.load_object(object.name, object.shade_smooth, path)
+    def get_load_key(self, object, path, next_path=None, fraction=0.0):
+        """
+        Fingerprint of the mesh loaded for `object` from `path` (and `next_path` when interpolating):
+        identity of the files and loading settings. None for volumes or missing files.
+        """
+        if bpy.data.objects[object.name].type == "VOLUME":
+            return None
+        identities = [file_identity(path)] + ([file_identity(next_path), fraction] if next_path is not None else [])
+        if None in identities:
+            return None
+        return repr((identities, object.shade_smooth, object.auto_smooth, object.auto_smooth_angle,
+                     object.use_file_normals, object.point_cloud))
 
-        self.last_read_time = time
+
+    def read_ahead(self, paths):
+        """
+        Start decoding the files needed for the current frame on the prefetcher threads,
+        `read_mesh` then waits for each of them in turn
+        """
+        paths = [path for path in paths if get_reader(path) is not None and path not in get_cache()]
+        prefetcher = get_prefetcher()
+        prefetcher.capacity = max(prefetcher.capacity, len(paths))
+        prefetcher.prefetch(paths)
+
+
+    def prefetch(self, time, direction=1, lod=0):
+        """
+        Start reading the `prefetch_steps` timesteps following `time` in the background
+
+        :param direction: 1 when playing forward, -1 when playing backward
+        :param lod: reduced resolution level to read
+        """
+        objects = self.get_loadable_objects()
+        paths = []
+        for step in range(1, self.prefetch_steps + 1):
+            next_time = time + direction*step
+            if next_time < self.timing_time_start or next_time > self.timing_time_end:
+                break
+            for object in objects:
+                path = self.get_object_path(object, next_time, lod)
+                # Static files linked in every timestep stay loaded, there's nothing to read
+                identity = file_identity(path)
+                if identity is not None and identity == file_identity(self.get_object_path(object, time, lod)):
+                    continue
+                if get_reader(path) is not None and path not in get_cache():
+                    paths.append(path)
+
+        prefetcher = get_prefetcher()
+        prefetcher.capacity = (self.prefetch_steps + 1)*max(len(objects), 1)
+        prefetcher.prefetch(paths)
 
 
     def read_config(self):
@@ -216,6 +834,15 @@ class SequenceDataLoader(bpy.types.PropertyGroup):
         with open(bpy.path.abspath(self.config_file), 'r') as yaml_file:
             config = yaml.safe_load(yaml_file)
 
+        self.apply_config(config)
+
+        return self.config_file, {"FINISHED"}
+
+
+    def apply_config(self, config):
+        """
+        Populate class data structure from a configuration dictionary, following the yaml config file layout.
+        """
         scene = bpy.context.scene
 
         if 'render' in config:
@@ -228,16 +855,40 @@ class SequenceDataLoader(bpy.types.PropertyGroup):
             if 'export_path' in config['render']:
                 self.export_path = config['render']['export_path']
 
+            for key in ('image_format', 'png_compression', 'exr_codec', 'async_write', 'write_queue_size'):
+                if key in config['render']:
+                    setattr(self, key, config['render'][key])
+
         if 'time' in config:
             if 'interpolate' in config['time']:
                 self.timing_interpolate = config['time']['interpolate']
 
+            if 'interpolate_vertices' in config['time']:
+                self.interpolate_vertices = config['time']['interpolate_vertices']
+
             if 'time_start' in config['time']:
                 self.timing_time_start = config['time']['time_start']
 
             if 'time_end' in config['time']:
                 self.timing_time_end = config['time']['time_end']
 
+            if 'missing_steps' in config['time']:
+                self.missing_steps = config['time']['missing_steps']
+
+            if 'use_manifest' in config['time']:
+                self.use_manifest = config['time']['use_manifest']
+
+        if 'load' in config:
+            if 'prefetch_steps' in config['load']:
+                self.prefetch_steps = config['load']['prefetch_steps']
+
+            if 'cache_size' in config['load']:
+                self.cache_size = config['load']['cache_size']
+
+            for key in ('parallel_read', 'shared_cache', 'shared_cache_size', 'playback_lod', 'settle_time', 'timing_log'):
+                if key in config['load']:
+                    setattr(self, key, config['load'][key])
+
         if 'objects' in config:
             self.objects.clear()
             for idx, object in enumerate(config['objects']):
@@ -246,8 +897,9 @@ class SequenceDataLoader(bpy.types.PropertyGroup):
                 self.objects[idx].path = object['path']
                 self.objects[idx].shade_smooth = object['shade_smooth']
                 self.objects[idx].enable = object['enable']
-
-        return self.config_file, {"FINISHED"}
+                for key in ('auto_smooth', 'auto_smooth_angle', 'use_file_normals', 'point_cloud'):
+                    if key in object:
+                        setattr(self.objects[idx], key, object[key])
 
 
     def write_config(self):
@@ -259,17 +911,48 @@ class SequenceDataLoader(bpy.types.PropertyGroup):
         if not USE_YAML:
             raise Exception('yaml library not available, config writing unavailable')
 
+        config = self.get_config()
+
+        with open(bpy.path.abspath(self.config_file), 'w') as yaml_file:
+            yaml.dump(config, yaml_file)
+
+
+        return self.config_file, {"FINISHED"}
+
+
+    def get_config(self):
+        """
+        Returns the configuration dictionary, following the yaml config file layout.
+        """
         scene = bpy.context.scene
         config = {}
         config['render'] = {}
         config['render']['samples'] = scene.cycles.samples
         config['render']['resolution_percentage'] = scene.render.resolution_percentage
         config['render']['export_path'] = self.export_path
+        config['render']['image_format'] = self.image_format
+        config['render']['png_compression'] = self.png_compression
+        config['render']['exr_codec'] = self.exr_codec
+        config['render']['async_write'] = self.async_write
+        config['render']['write_queue_size'] = self.write_queue_size
 
         config['time'] = {}
         config['time']['interpolate'] = self.timing_interpolate
+        config['time']['interpolate_vertices'] = self.interpolate_vertices
         config['time']['time_start'] = self.timing_time_start
         config['time']['time_end'] = self.timing_time_end
+        config['time']['missing_steps'] = self.missing_steps
+        config['time']['use_manifest'] = self.use_manifest
+
+        config['load'] = {}
+        config['load']['parallel_read'] = self.parallel_read
+        config['load']['prefetch_steps'] = self.prefetch_steps
+        config['load']['cache_size'] = self.cache_size
+        config['load']['shared_cache'] = self.shared_cache
+        config['load']['shared_cache_size'] = self.shared_cache_size
+        config['load']['playback_lod'] = self.playback_lod
+        config['load']['settle_time'] = self.settle_time
+        config['load']['timing_log'] = self.timing_log
 
         config['objects'] = []
         for item in self.objects:
@@ -278,11 +961,10 @@ class SequenceDataLoader(bpy.types.PropertyGroup):
             object["path"] = item.path
             object["shade_smooth"] = item.shade_smooth
             object["enable"] = item.enable
+            object["auto_smooth"] = item.auto_smooth
+            object["auto_smooth_angle"] = item.auto_smooth_angle
+            object["use_file_normals"] = item.use_file_normals
+            object["point_cloud"] = item.point_cloud
             config['objects'].append(object)
 
-
-        with open(bpy.path.abspath(self.config_file), 'w') as yaml_file:
-            yaml.dump(config, yaml_file)
-
-
-        return self.config_file, {"FINISHED"}
+        return config
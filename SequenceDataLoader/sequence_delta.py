@@ -0,0 +1,285 @@
+"""
+Compressed archives (.seqd) of sequences whose connectivity doesn't change: the faces are stored
+once, then the compressed differences of each array with the previous timestep, with a full copy
+every `keyframe_interval` timesteps. A timestep is addressed as `path/to/surface.seqd::<time>`.
+"""
+import bisect
+import json
+import lzma
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+
+import numpy as np
+
+from .ply_reader import PlyMesh
+from .sequence_index import split_template
+from .timestep_cache import ARCHIVE_SEPARATOR, data_file, file_signature
+
+DELTA_EXTENSION = ".seqd"
+MAGIC = b"SEQD"
+VERSION = 1
+INT32_MIN, INT32_MAX = -2**31, 2**31 - 1
+# Quantized values of the first timestep range from 0 to 2**bits - 1 and are stored as int32
+MAX_BITS = 31
+
+COMPRESSORS = {
+    "zlib": (lambda data, level: zlib.compress(data, level), zlib.decompress),
+    "lzma": (lambda data, level: lzma.compress(data, preset=level), lzma.decompress),
+    "none": (lambda data, level: data, bytes),
+}
+
+# Open archives, shared by the threads decoding timesteps
+archives = {}
+archives_lock = threading.Lock()
+
+
+def delta_path(template_path):
+    """
+    Default archive path of a sequence: the directory holding the time index,
+    named after the data files (e.g. `ply_export/t########/surface.ply` -> `ply_export/surface.seqd`)
+    """
+    root = split_template(template_path)[0]
+    name = os.path.splitext(os.path.basename(template_path))[0]
+    name = re.sub("#+|[0-9]{2,}", "", name).strip("_-. ") or "sequence"
+    return os.path.join(root, name + DELTA_EXTENSION)
+
+
+def member_path(path, time):
+    """Path of a single timestep of an archive"""
+    return "{}{}{}".format(path, ARCHIVE_SEPARATOR, time)
+
+
+def mesh_arrays(mesh):
+    """Per-vertex and per-face arrays of a PlyMesh that can change over time"""
+    arrays = {"vertices": mesh.vertices}
+    for name in ("normals", "colors", "face_colors"):
+        if getattr(mesh, name) is not None:
+            arrays[name] = getattr(mesh, name)
+    for name, values in mesh.attributes.items():
+        arrays["attributes/" + name] = values
+    for name, values in mesh.face_attributes.items():
+        arrays["face_attributes/" + name] = values
+    return arrays
+
+
+def to_integers(values, step, lower=0.0):
+    """Float32 bit patterns if `step` is None, number of steps above `lower` otherwise"""
+    if step is None:
+        return np.ascontiguousarray(values, dtype="<f4").view("<i4")
+    integers = np.rint((np.asarray(values, dtype=np.float64) - lower)/step)
+    if integers.size and (integers.min() < INT32_MIN or integers.max() > INT32_MAX):
+        raise Exception("Values from {} to {} can't be stored as 32 bits multiples of {} above {}".format(
+            np.min(values), np.max(values), step, lower))
+    return integers.astype("<i4")
+
+
+def from_integers(integers, step, lower=0.0):
+    if step is None:
+        return integers.view("<f4")
+    return (integers*step + lower).astype(np.float32)
+
+
+def shuffle(integers):
+    """Group the bytes of int32 values by significance"""
+    return np.ascontiguousarray(integers.reshape(-1).view(np.uint8).reshape(-1, 4).T).tobytes()
+
+
+def unshuffle(data, shape):
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(4, -1)
+    return np.ascontiguousarray(planes.T).view("<i4").reshape(shape)
+
+
+class DeltaWriter:
+    """
+    Write the timesteps of a static topology sequence to a .seqd archive, in increasing time order.
+
+    :param compression: 'zlib', 'lzma' or 'none'
+    :param level: compression level (zlib level or lzma preset)
+    :param keyframe_interval: number of timesteps between full copies of the data
+    :param position_bits: quantize positions over their range in the first timestep, 0 keeps them exact
+    :param scalar_bits: same for normals and scalar attributes, colors always use 8 bits
+    """
+
+    def __init__(self, path, compression="zlib", level=6, keyframe_interval=10, position_bits=0, scalar_bits=0):
+        if compression not in COMPRESSORS:
+            raise Exception("Unknown compression {}, use one of {}".format(compression, ", ".join(COMPRESSORS)))
+        if not 0 <= position_bits <= MAX_BITS or not 0 <= scalar_bits <= MAX_BITS:
+            raise Exception("Quantization bits should be between 0 and {}".format(MAX_BITS))
+        self.path = path
+        self.compress = COMPRESSORS[compression][0]
+        self.level = level
+        self.keyframe_interval = max(1, keyframe_interval)
+        self.position_bits = position_bits
+        self.scalar_bits = scalar_bits
+        self.header = {"compression": compression, "keyframe_interval": self.keyframe_interval,
+                       "topology": {}, "arrays": {}, "frames": []}
+        self.previous = None
+        self.file = open(path + ".tmp", "wb")
+        self.file.write(MAGIC + struct.pack("<I", VERSION))
+
+
+    def write_block(self, data):
+        offset = self.file.tell()
+        self.file.write(self.compress(data, self.level))
+        return [offset, self.file.tell() - offset]
+
+
+    def add(self, time, mesh):
+        """Append the timestep `time`, its connectivity must be the one of the first timestep"""
+        arrays = mesh_arrays(mesh)
+        topology = mesh.topology_hash()
+
+        if self.previous is None:
+            self.header.update(vertex_count=mesh.vertex_count, face_count=mesh.face_count, topology_hash=topology)
+            self.header["topology"]["face_sizes"] = self.write_block(mesh.face_sizes.astype("<i4").tobytes())
+            self.header["topology"]["face_indices"] = self.write_block(mesh.face_indices.astype("<i4").tobytes())
+            for name, values in arrays.items():
+                lower, step = self.get_quantization(name, values)
+                self.header["arrays"][name] = {"shape": list(values.shape), "lower": lower, "step": step}
+        elif topology != self.header["topology_hash"]:
+            raise Exception("Connectivity changes at time {}, only static topology sequences can be stored".format(time))
+        elif set(arrays) != set(self.header["arrays"]):
+            raise Exception("Arrays change at time {}: {} instead of {}".format(time, sorted(arrays), sorted(self.header["arrays"])))
+
+        keyframe = len(self.header["frames"]) % self.keyframe_interval == 0
+        current = {}
+        blocks = {}
+        for name, values in arrays.items():
+            array = self.header["arrays"][name]
+            current[name] = to_integers(values, array["step"], array["lower"])
+            delta = current[name] if keyframe else current[name] - self.previous[name]
+            blocks[name] = self.write_block(shuffle(delta))
+
+        self.header["frames"].append({"time": time, "keyframe": keyframe, "blocks": blocks})
+        self.previous = current
+
+
+    def get_quantization(self, name, values):
+        """Lower bound and quantization step of an array, step is None to store exact values"""
+        if name in ("colors", "face_colors"):
+            return 0.0, 1/255
+        bits = self.position_bits if name == "vertices" else self.scalar_bits
+        if not bits or values.size == 0:
+            return 0.0, None
+        if name == "normals":
+            lower, upper = -1.0, 1.0
+        else:
+            lower, upper = float(np.min(values)), float(np.max(values))
+        return lower, (upper - lower or 1.0)/(2**bits - 1)
+
+
+    def close(self):
+        """Write the index and move the archive in place"""
+        index = json.dumps(self.header).encode()
+        index_offset = self.file.tell()
+        self.file.write(index + struct.pack("<Q", index_offset) + MAGIC)
+        self.file.close()
+        os.replace(self.path + ".tmp", self.path)
+
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.path + ".tmp")
+
+
+class DeltaSequence:
+    """
+    Read access to a .seqd archive. The last decoded timestep is kept so reading the
+    following one only applies a single difference.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.signature = file_signature(path)
+        with open(path, "rb") as archive_file:
+            self.data = mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.data[:4] != MAGIC or self.data[-4:] != MAGIC:
+            raise Exception("{} is not a sequence archive".format(path))
+        version = struct.unpack_from("<I", self.data, 4)[0]
+        if version != VERSION:
+            raise Exception("Unsupported sequence archive version {} in {}".format(version, path))
+        index_offset = struct.unpack_from("<Q", self.data, len(self.data) - 12)[0]
+        self.header = json.loads(self.data[index_offset:len(self.data) - 12])
+
+        self.decompress = COMPRESSORS[self.header["compression"]][1]
+        self.frames = self.header["frames"]
+        self.times = [frame["time"] for frame in self.frames]
+        self.face_sizes = np.frombuffer(self.read_block(self.header["topology"]["face_sizes"]), dtype="<i4")
+        self.face_indices = np.frombuffer(self.read_block(self.header["topology"]["face_indices"]), dtype="<i4")
+
+        self.lock = threading.Lock()
+        self.position = None
+        self.state = None
+
+
+    def read_block(self, block):
+        offset, size = block
+        return self.decompress(self.data[offset:offset + size])
+
+
+    def files(self):
+        """Member path of every timestep, as expected by SequenceIndex"""
+        return {time: member_path(self.path, time) for time in self.times}
+
+
+    def read(self, time):
+        """Decode the timestep `time` into a PlyMesh"""
+        position = bisect.bisect_left(self.times, time)
+        if position == len(self.times) or self.times[position] != time:
+            raise Exception("No time {} in {}".format(time, self.path))
+
+        with self.lock:
+            # Continue from the last decoded timestep when it is between the keyframe and `time`
+            start = position
+            while not self.frames[start]["keyframe"]:
+                start -= 1
+            if self.position is not None and start <= self.position <= position:
+                start = self.position + 1
+                state = self.state
+            else:
+                state = None
+
+            for frame in self.frames[start:position + 1]:
+                current = {}
+                for name, array in self.header["arrays"].items():
+                    delta = unshuffle(self.read_block(frame["blocks"][name]), array["shape"])
+                    current[name] = delta if frame["keyframe"] else state[name] + delta
+                state = current
+
+            self.position = position
+            self.state = state
+
+        mesh = PlyMesh()
+        mesh.face_sizes = self.face_sizes
+        mesh.face_indices = self.face_indices
+        mesh.stored_topology_hash = self.header["topology_hash"]
+        for name, integers in state.items():
+            array = self.header["arrays"][name]
+            values = from_integers(integers, array["step"], array.get("lower", 0.0))
+            if name.startswith("attributes/"):
+                mesh.attributes[name[len("attributes/"):]] = values
+            elif name.startswith("face_attributes/"):
+                mesh.face_attributes[name[len("face_attributes/"):]] = values
+            else:
+                setattr(mesh, name, values)
+        return mesh
+
+
+def open_sequence(path):
+    """Returns the DeltaSequence of an archive, opened again if the file changed"""
+    with archives_lock:
+        archive = archives.get(path)
+        if archive is None or archive.signature != file_signature(path):
+            archive = archives[path] = DeltaSequence(path)
+        return archive
+
+
+def read_delta(path):
+    """Read a timestep given as `archive::time` into a PlyMesh"""
+    time = path[len(data_file(path)) + len(ARCHIVE_SEPARATOR):]
+    return open_sequence(data_file(path)).read(int(time))
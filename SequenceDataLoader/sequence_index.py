@@ -0,0 +1,188 @@
+import bisect
+import json
+import os
+import re
+import stat
+
+
+class SequenceIndex:
+    """
+    Map the time indices of a sequence to its files. The directory holding the time index
+    is scanned once, after that looking up a time is a dictionary access.
+
+    :param template_path: path where the time index is replaced by `###`, if `#` aren't present
+        the last group of digits of the path is used
+    :param files: dict of time index to file path, scanned from disk if None
+    """
+
+    def __init__(self, template_path, files=None):
+        self.template_path = template_path
+        # os.stat of the files of the sequence found while scanning, by path
+        self.stats = {}
+        self.files = self.scan() if files is None else files
+        self.times = sorted(self.files)
+
+
+    def scan(self):
+        """List the directory containing the time index and return the files of the sequence"""
+        root, pattern, remainder = split_template(self.template_path)
+        files = {}
+        with os.scandir(root) as entries:
+            for entry in entries:
+                match = pattern.fullmatch(entry.name)
+                if match is None:
+                    continue
+                time = int(match.group(1))
+                if remainder:
+                    # The time index is in a folder name, check the file exists inside it
+                    path = os.path.join(entry.path, *[sub_time(part, time) for part in remainder])
+                    try:
+                        file_stat = os.stat(path)
+                    except OSError:
+                        continue
+                    if not stat.S_ISREG(file_stat.st_mode):
+                        continue
+                    self.stats[path] = file_stat
+                else:
+                    path = entry.path
+                files[time] = path
+        return files
+
+
+    def get(self, time, missing="EXACT"):
+        """
+        Return the file for `time`, or None if there is no file to use.
+
+        :param missing: what to do when there is no file for `time`,
+            'EXACT' returns None, 'PREVIOUS' uses the last available time before it,
+            'NEAREST' uses the closest available time
+        """
+        if time in self.files:
+            return self.files[time]
+        if missing == "EXACT" or not self.times:
+            return None
+
+        position = bisect.bisect_left(self.times, time)
+        candidates = []
+        if position > 0:
+            candidates.append(self.times[position - 1])
+        if missing == "NEAREST" and position < len(self.times):
+            candidates.append(self.times[position])
+        if not candidates:
+            return None
+        return self.files[min(candidates, key=lambda t: abs(t - time))]
+
+
+    @property
+    def time_range(self):
+        if not self.times:
+            return None
+        return self.times[0], self.times[-1]
+
+
+    def gaps(self):
+        """Returns the list of (first, last) missing time ranges inside the time range"""
+        gaps = []
+        for previous, current in zip(self.times, self.times[1:]):
+            if current - previous > 1:
+                gaps.append((previous + 1, current - 1))
+        return gaps
+
+
+    def save(self):
+        """
+        Write the index as a JSON manifest next to the data. The manifest is dated after the
+        directory it lists, a directory modified later (e.g. new timesteps) makes it stale.
+        """
+        root = split_template(self.template_path)[0]
+        manifest = {
+            "template_path": normalize_template(self.template_path),
+            "files": {str(time): os.path.relpath(path, root) for time, path in self.files.items()},
+        }
+        path = manifest_path(self.template_path)
+        with open(path + ".tmp", "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=1)
+        os.replace(path + ".tmp", path)
+        # Renaming it modified the directory
+        os.utime(path)
+
+
+    @classmethod
+    def load(cls, template_path):
+        """
+        Build the index from its manifest, returns None if there is no valid manifest or if
+        the directory was modified since it was written
+        """
+        root = split_template(template_path)[0]
+        path = manifest_path(template_path)
+        try:
+            if os.stat(root).st_mtime_ns > os.stat(path).st_mtime_ns:
+                return None
+            with open(path, "r") as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("template_path") != normalize_template(template_path):
+            return None
+
+        return cls(template_path, {int(time): os.path.join(root, path) for time, path in manifest["files"].items()})
+
+
+def manifest_path(template_path):
+    """JSON manifest stored in the scanned directory, one per template"""
+    root = split_template(template_path)[0]
+    name = os.path.relpath(normalize_template(template_path), root).replace("#", "").replace(os.sep, "_")
+    return os.path.join(root, ".{}.manifest.json".format(name))
+
+
+def remove_manifest(template_path):
+    """Remove the manifest of a template if there is one, the next index is scanned again"""
+    try:
+        os.remove(manifest_path(template_path))
+    except OSError:
+        pass
+
+
+def lod_path(path, level):
+    """Path of the reduced resolution level `level` of a data file (e.g. surface.ply -> surface.lod1.ply)"""
+    stem, extension = os.path.splitext(path)
+    return "{}.lod{}{}".format(stem, level, extension)
+
+
+def normalize_template(template_path):
+    """Returns the template with the time index replaced by `#`, using the last group of digits if needed"""
+    if "#" in template_path:
+        return template_path
+
+    digits = list(re.finditer("[0-9][0-9]+", template_path))
+    if not digits:
+        raise Exception("No time index found in {}".format(template_path))
+    last = digits[-1]
+    return template_path[:last.start()] + "#"*len(last.group()) + template_path[last.end():]
+
+
+def split_template(template_path):
+    """
+    Split a template path into the directory to scan, a regex matching the entry holding
+    the time index in that directory and the remaining path components below it.
+    """
+    parts = normalize_template(template_path).split(os.sep)
+    position = next(i for i, part in enumerate(parts) if "#" in part)
+    # A relative template without directory is relative to the current directory
+    root = (os.sep.join(parts[:position]) or os.sep) if position else os.curdir
+
+    # Placeholders in the same component all hold the same time index
+    regex = ""
+    group = "([0-9]+)"
+    for piece in re.split("(#+)", parts[position]):
+        if piece.startswith("#"):
+            regex += group
+            group = "\\1"
+        else:
+            regex += re.escape(piece)
+    return root, re.compile(regex), parts[position + 1:]
+
+
+def sub_time(part, time):
+    """Replace `#` runs of a path component by the zero padded time index"""
+    return re.sub("#+", lambda match: "{0:0{1}}".format(time, len(match.group())), part)
@@ -0,0 +1,187 @@
+"""
+Decoded timesteps shared as .seqc files in a node-local directory (e.g. `/dev/shm`) by the
+Blender instances of a node, each of them mapping the files instead of decoding them again.
+"""
+import atexit
+import hashlib
+import os
+import shutil
+import time
+
+from .sequence_cache import CACHE_EXTENSION, read_cache, write_cache
+from .timestep_cache import file_signature
+
+# Environment variables holding the job ID for common schedulers
+JOB_VARIABLES = ("SLURM_JOB_ID", "PBS_JOBID", "LSB_JOBID", "JOB_ID")
+
+
+def get_job_id():
+    """ID of the scheduler job this process belongs to, 'local' outside of a job"""
+    for variable in JOB_VARIABLES:
+        if os.environ.get(variable):
+            return os.environ[variable]
+    return "local"
+
+
+class SharedCache:
+    """
+    Node-local, size bounded cache of decoded timesteps, safe to use from several processes and threads.
+
+    An entry is keyed by the path and signature of the original file, a `.lock` file created
+    exclusively makes sure it is decoded only once and it is written under a temporary name then
+    renamed. Once above `max_bytes`, the least recently used entries are removed, instances still
+    mapping them keep their data. Every instance registers itself in the directory, which is removed
+    by the last one to close it.
+
+    :param path: cache directory, `{job}` is replaced by the job ID of the scheduler
+    :param max_bytes: size of the entries above which the oldest ones are removed
+    :param timeout: seconds after which the lock of an entry being decoded is considered abandoned
+    """
+
+    def __init__(self, path, max_bytes=0, timeout=300):
+        self.template = path
+        self.directory = path.format(job=get_job_id())
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        # Size of the entries of every instance, as of the last entry this instance published
+        self.node_bytes = 0
+        self.user_path = os.path.join(self.directory, "users", str(os.getpid()))
+        self.closed = False
+        self.register()
+        atexit.register(self.close)
+
+
+    def register(self):
+        os.makedirs(os.path.dirname(self.user_path), exist_ok=True)
+        with open(self.user_path, "w"):
+            pass
+
+
+    def entry_path(self, path):
+        key = "{}|{}".format(os.path.abspath(path), file_signature(path))
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + CACHE_EXTENSION)
+
+
+    def get(self, path, reader):
+        """
+        Return the decoded content of `path` from the shared directory, calling `reader(path)`
+        and publishing the result if no instance did it yet
+        """
+        entry = self.entry_path(path)
+        while True:
+            mesh = self.open(entry)
+            if mesh is not None:
+                self.hits += 1
+                return mesh
+            if self.lock(entry):
+                break
+            # Another instance is decoding it
+            time.sleep(0.02)
+
+        self.misses += 1
+        try:
+            mesh = reader(path)
+            if self.publish(entry, mesh):
+                mesh = self.open(entry) or mesh
+        finally:
+            remove_file(entry + ".lock")
+        return mesh
+
+
+    def open(self, entry):
+        """Map a published entry, None if it doesn't exist"""
+        try:
+            mesh = read_cache(entry)
+        except FileNotFoundError:
+            return None
+        # Mark it as recently used for the eviction of every instance
+        try:
+            os.utime(entry)
+        except FileNotFoundError:
+            pass
+        return mesh
+
+
+    def lock(self, entry):
+        """Try to become the instance decoding `entry`, taking over locks older than `timeout`"""
+        lock_path = entry + ".lock"
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            pass
+        except FileNotFoundError:
+            # The directory was removed by the last instance closing it
+            self.register()
+            return False
+
+        try:
+            if time.time() - os.path.getmtime(lock_path) > self.timeout:
+                remove_file(lock_path)
+        except FileNotFoundError:
+            pass
+        return False
+
+
+    def publish(self, entry, mesh):
+        """Write an entry then make room for it, returns False if it couldn't be written (e.g. directory full)"""
+        try:
+            write_cache(entry, mesh, scalar_bits=0)
+        except OSError as error:
+            print("Could not write {} to the shared cache: {}".format(entry, error))
+            remove_file(entry + ".tmp")
+            return False
+        self.evict()
+        return True
+
+
+    def evict(self):
+        entries = []
+        used_bytes = 0
+        for item in os.scandir(self.directory):
+            if item.name.endswith(CACHE_EXTENSION):
+                try:
+                    stat = item.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, item.path))
+                used_bytes += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if used_bytes <= self.max_bytes:
+                break
+            remove_file(path)
+            used_bytes -= size
+        self.node_bytes = used_bytes
+
+
+    def close(self):
+        """Unregister this instance, removing the directory if no other instance of the node uses it"""
+        if self.closed:
+            return
+        self.closed = True
+        remove_file(self.user_path)
+        users_path = os.path.dirname(self.user_path)
+        try:
+            users = os.listdir(users_path)
+        except FileNotFoundError:
+            return
+
+        for user in users:
+            try:
+                os.kill(int(user), 0)
+                return
+            except ProcessLookupError:
+                remove_file(os.path.join(users_path, user))
+            except (OSError, ValueError):
+                return
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,105 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Separates the path of an archive from the timestep stored in it (e.g. `surface.seqd::12`)
+ARCHIVE_SEPARATOR = "::"
+
+
+class TimestepCache:
+    """
+    Memory bounded LRU cache of decoded data files. Entries are keyed by path and
+    invalidated when the modification time or the size of the file changes, thread safe.
+
+    :param max_bytes: memory budget, least recently used entries are evicted above it
+    """
+
+    def __init__(self, max_bytes=0):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+
+    def __contains__(self, path):
+        with self.lock:
+            entry = self.entries.get(path)
+        return entry is not None and entry[0] == file_signature(path)
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    def get(self, path, reader):
+        """
+        Return the decoded content of `path`, calling `reader(path)` if it isn't cached
+        or if the file changed since it was cached.
+        """
+        signature = file_signature(path)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == signature:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        data = reader(path)
+        self.put(path, signature, data)
+        return data
+
+
+    def put(self, path, signature, data):
+        """Store decoded data, replacing any previous version of the same file"""
+        nbytes = getattr(data, "nbytes", 0)
+        with self.lock:
+            self.remove(path)
+            if nbytes > self.max_bytes:
+                return
+            self.entries[path] = (signature, data, nbytes)
+            self.used_bytes += nbytes
+            self.evict()
+
+
+    def resize(self, max_bytes):
+        """Change the memory budget, evicting entries if needed"""
+        with self.lock:
+            self.max_bytes = max_bytes
+            self.evict()
+
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.used_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+    def remove(self, path):
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self.used_bytes -= entry[2]
+
+
+    def evict(self):
+        while self.used_bytes > self.max_bytes and self.entries:
+            _, (_, _, nbytes) = self.entries.popitem(last=False)
+            self.used_bytes -= nbytes
+
+
+def data_file(path):
+    """File holding the data of `path`, the archive for timesteps stored in an archive"""
+    return path.split(ARCHIVE_SEPARATOR, 1)[0]
+
+
+def file_signature(path):
+    """Modification time and size of a file (or of the archive holding it), None if it doesn't exist"""
+    try:
+        stat = os.stat(data_file(path))
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,125 @@
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+class TimingLog:
+    """
+    JSON lines log of where the time of each frame goes.
+
+    A record is started for each frame, stages (path resolution, read, mesh update, render...)
+    add their wall time and counters (bytes read, vertices...) to it, and the record is written
+    as one line with the resident memory of the process once the frame is done.
+
+    :param path: log file, `{host}` and `{pid}` are replaced so each worker writes its own file.
+        A directory gets a `timing_{host}_{pid}.jsonl` file.
+    :param source: name of the program writing the log (render, viewport...)
+    """
+
+    def __init__(self, path, source="blender"):
+        self.template = path
+        if os.path.isdir(path) or path.endswith(os.sep):
+            path = os.path.join(path, "timing_{host}_{pid}.jsonl")
+        self.path = path.format(host=socket.gethostname(), pid=os.getpid())
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.source = source
+        self.file = open(self.path, "a")
+        self.record = None
+        self.started = 0.0
+        self.lock = threading.Lock()
+
+
+    def begin(self, **info):
+        """
+        Start the record of a frame, returns False if one is already started (e.g. loading
+        objects within a render), in which case the stages go to the current record.
+        """
+        if self.record is not None:
+            return False
+        self.record = {"source": self.source, "hostname": socket.gethostname(), "pid": os.getpid(),
+                       "start": time.time(), "stages": {}, "counts": {}}
+        self.record.update(info)
+        self.started = time.perf_counter()
+        return True
+
+
+    @contextmanager
+    def stage(self, name):
+        """Add the wall time of the `with` block to stage `name` of the current record"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.record is not None:
+                stages = self.record["stages"]
+                stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+
+    def count(self, **counts):
+        """Add to counters of the current record (bytes_read, vertices, faces...)"""
+        if self.record is None:
+            return
+        with self.lock:
+            for name, value in counts.items():
+                self.record["counts"][name] = self.record["counts"].get(name, 0) + value
+
+
+    def end(self, **info):
+        """Write the record of the current frame"""
+        if self.record is None:
+            return
+        self.record.update(info)
+        self.record["total"] = time.perf_counter() - self.started
+        self.record["rss_mb"] = get_memory()
+        self.file.write(json.dumps(self.record) + "\n")
+        self.file.flush()
+        self.record = None
+
+
+    def close(self):
+        self.file.close()
+
+
+class NullTimingLog:
+    """Stands in for TimingLog when instrumentation is disabled"""
+    template = ""
+
+    def begin(self, **info):
+        return False
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def count(self, **counts):
+        pass
+
+    def end(self, **info):
+        pass
+
+    def close(self):
+        pass
+
+
+def get_memory():
+    """Current resident memory of this process in MB, the peak memory where it can't be read"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1])*os.sysconf("SC_PAGE_SIZE")/1024**2
+    except (OSError, ValueError):
+        return get_peak_memory()
+
+
+def get_peak_memory():
+    """Peak resident memory of this process in MB, None where it can't be read"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return usage/1024**2 if sys.platform == "darwin" else usage/1024
@@ -0,0 +1,120 @@
+import argparse
+import math
+import os
+
+import numpy as np
+
+
+def grid_triangles(side, vertex_count, flip=False):
+    """
+    Triangles of a regular grid of `side` vertices per row, limited to the first `vertex_count`
+    vertices. `flip` changes the diagonal splitting every quad, giving another connectivity.
+    """
+    rows = math.ceil(vertex_count/side)
+    i, j = np.meshgrid(np.arange(rows - 1), np.arange(side - 1), indexing="ij")
+    corner = (i*side + j).ravel()
+    corners = np.stack((corner, corner + 1, corner + side + 1, corner + side), axis=1)
+    corners = corners[corners.max(axis=1) < vertex_count]
+    if flip:
+        triangles = np.concatenate((corners[:, [0, 1, 3]], corners[:, [1, 2, 3]]), axis=1)
+    else:
+        triangles = np.concatenate((corners[:, [0, 1, 2]], corners[:, [0, 2, 3]]), axis=1)
+    return triangles.reshape(-1, 3).astype(np.int32)
+
+
+def write_ply(path, vertices, triangles, columns, binary=True):
+    """
+    Write a triangle mesh with extra vertex properties
+
+    :param columns: list of (property name, ply type, numpy dtype, values) written after x, y, z
+    """
+    header = ["ply", "format {} 1.0".format("binary_little_endian" if binary else "ascii"),
+              "comment synthetic sequence written by generate_sequence.py",
+              "element vertex {}".format(len(vertices)),
+              "property float x", "property float y", "property float z"]
+    header += ["property {} {}".format(ply_type, name) for name, ply_type, _, _ in columns]
+    header += ["element face {}".format(len(triangles)), "property list uchar int vertex_indices", "end_header"]
+
+    vertex = np.zeros(len(vertices), dtype=[("x", "<f4"), ("y", "<f4"), ("z", "<f4")] +
+                      [(name, dtype) for name, _, dtype, _ in columns])
+    vertex["x"], vertex["y"], vertex["z"] = vertices.T
+    for name, _, _, values in columns:
+        vertex[name] = values
+    face = np.zeros(len(triangles), dtype=[("size", "u1"), ("indices", "<i4", (3,))])
+    face["size"] = 3
+    face["indices"] = triangles
+
+    with open(path + ".tmp", "wb") as ply_file:
+        ply_file.write(("\n".join(header) + "\n").encode("ascii"))
+        if binary:
+            ply_file.write(vertex.tobytes())
+            ply_file.write(face.tobytes())
+        else:
+            formats = ["%.7g"]*3 + ["%d" if np.issubdtype(dtype, np.integer) else "%.7g" for _, _, dtype, _ in columns]
+            np.savetxt(ply_file, np.column_stack([vertices] + [values for _, _, _, values in columns]), fmt=formats)
+            np.savetxt(ply_file, np.column_stack((face["size"], triangles)), fmt="%d")
+    os.replace(path + ".tmp", path)
+
+
+def generate_sequence(folder, name="surface", vertex_count=10000, face_count=None, steps=10, binary=True,
+                      static_topology=True, scalars=1, colors=True, seed=0):
+    """
+    Write a synthetic sequence of a wave moving over a triangulated grid, laid out as exported by
+    export_ply.py (`folder/t00000000/surface.ply`...)
+
+    :param vertex_count: number of vertices of every timestep
+    :param face_count: number of triangles, at most about twice the number of vertices, all of them if None
+    :param static_topology: keep the same connectivity, otherwise it changes at every timestep
+    :param scalars: number of float vertex properties
+    :returns: template path of the sequence
+    """
+    random = np.random.default_rng(seed)
+    side = max(2, math.ceil(math.sqrt(vertex_count)))
+    index = np.arange(vertex_count)
+    x, y = (index % side)/(side - 1), (index // side)/(side - 1)
+
+    available = len(grid_triangles(side, vertex_count))
+    if face_count is None:
+        face_count = available
+    elif face_count > available:
+        raise Exception("{} vertices only make {} triangles, {} requested".format(vertex_count, available, face_count))
+
+    color_values = (random.random((vertex_count, 3))*255).astype(np.uint8)
+    phases = random.random(scalars)*2*math.pi
+    for step in range(steps):
+        z = 0.1*np.sin(8*x + 0.2*step)*np.cos(6*y - 0.1*step)
+        vertices = np.column_stack((x, y, z)).astype(np.float32)
+        triangles = grid_triangles(side, vertex_count, flip=not static_topology and step % 2 == 1)[:face_count]
+
+        columns = []
+        if colors:
+            columns += [(channel, "uchar", "u1", color_values[:, i]) for i, channel in enumerate(("red", "green", "blue"))]
+        for i, phase in enumerate(phases):
+            columns.append(("scalar{}".format(i), "float", "<f4", np.sin(10*x + phase + 0.3*step)*y))
+
+        step_folder = os.path.join(folder, "t{:08}".format(step))
+        os.makedirs(step_folder, exist_ok=True)
+        write_ply(os.path.join(step_folder, name + ".ply"), vertices, triangles, columns, binary)
+
+    return os.path.join(folder, "t########", name + ".ply")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="""Write a synthetic sequence of .ply files, a wave over a triangulated grid,
+                                     to test and benchmark the SequenceDataLoader addon without ParaView.""")
+    parser.add_argument("folder", help="Folder where the t######## timestep folders are written")
+    parser.add_argument("--name", default="surface", help="Name of the .ply files")
+    parser.add_argument("--vertices", type=int, default=10000, help="Number of vertices of every timestep")
+    parser.add_argument("--faces", type=int, help="Number of triangles, at most about twice the number of vertices, all of them by default")
+    parser.add_argument("--steps", type=int, default=10, help="Number of timesteps")
+    parser.add_argument("--ascii", action="store_true", help="Write ascii instead of binary files")
+    parser.add_argument("--changing-topology", action="store_true", help="Change the connectivity at every timestep")
+    parser.add_argument("--scalars", type=int, default=1, help="Number of float vertex properties")
+    parser.add_argument("--no-colors", action="store_true", help="Don't write vertex colors")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random colors and scalars")
+    args = parser.parse_args()
+
+    template = generate_sequence(args.folder, args.name, args.vertices, args.faces, args.steps, not args.ascii,
+                                 not args.changing_topology, args.scalars, not args.no_colors, args.seed)
+    print("Written {} timesteps to {}".format(args.steps, template))
@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+BENCHMARK_FOLDER = os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_FOLDER = os.path.dirname(BENCHMARK_FOLDER)
+# The bpy stand-in is imported by the addon instead of Blender's module
+sys.path[:0] = [os.path.join(BENCHMARK_FOLDER, "stub"), REPOSITORY_FOLDER, BENCHMARK_FOLDER]
+
+import bpy
+import numpy as np
+
+from SequenceDataLoader import sequence_data_loader as loader
+from SequenceDataLoader.batch_render import SequenceDataRender
+from generate_sequence import generate_sequence
+from timing_report import percentile, read_logs, stage_statistics
+
+SCENARIOS = ("load", "scrub", "claim")
+
+
+def make_scene(templates, steps, **settings):
+    """
+    Scene with one sequence object per template, frame 1 showing timestep 0, and fresh loader state
+
+    :param settings: SequenceDataLoader properties to set
+    """
+    bpy.data.objects.clear()
+    scene = bpy.types.Scene(frame_start=1, frame_end=steps)
+    scene.sequence_data = loader.SequenceDataLoader()
+    scene.sequence_data_render = SequenceDataRender()
+    bpy.context.scene = scene
+
+    sequence_data = scene.sequence_data
+    sequence_data.timing_time_start = 0
+    sequence_data.timing_time_end = steps - 1
+    for i, template in enumerate(templates):
+        object = sequence_data.objects.add()
+        object.name = "sequence{}".format(i)
+        object.path = template
+        bpy.data.objects.new(object.name, bpy.Mesh(object.name))
+    for key, value in settings.items():
+        setattr(sequence_data, key, value)
+
+    loader.indices.clear()
+    loader.stats.clear()
+    loader.shutdown_prefetcher()
+    loader.get_cache().clear()
+    return scene
+
+
+def load_frames(scene, frames):
+    """Load the objects at each frame as the frame change handler does, returns the time of each frame"""
+    latencies = []
+    for frame in frames:
+        start = time.perf_counter()
+        scene.frame_current = frame
+        scene.sequence_data.load_objects(frame, keep_unchanged=True)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(values):
+    """Count, mean and percentiles of a list of durations"""
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {"count": len(values), "mean": sum(values)/len(values), "p50": percentile(values, 0.5),
+            "p90": percentile(values, 0.9), "p99": percentile(values, 0.99), "max": values[-1]}
+
+
+def read_stages(log_path):
+    """Summary of each stage of the frames written to a timing log, closes the log first"""
+    loader.get_timing("")
+    statistics = stage_statistics(read_logs([log_path]))
+    return {stage: summarize(values) for stage, values in statistics.items()}
+
+
+def run_load(templates, args, work_folder):
+    """
+    Play every frame in order: without cache (objects read one after the other, then in parallel),
+    with prefetching, and a second time from a warm cache
+    """
+    size = sum(os.path.getsize(template.replace("########", "{:08}".format(step)))
+               for template in templates for step in range(args.steps))
+    variants = {
+        "serial": {"cache_size": 0, "prefetch_steps": 0, "parallel_read": False},
+        "cold": {"cache_size": 0, "prefetch_steps": 0},
+        "prefetch": {"cache_size": 0, "prefetch_steps": args.prefetch},
+        "cached": {"cache_size": 1024**2, "prefetch_steps": 0},
+    }
+
+    results = {}
+    for name, settings in variants.items():
+        log_path = os.path.join(work_folder, "load_{}.jsonl".format(name))
+        scene = make_scene(templates, args.steps, **settings)
+        frames = range(scene.frame_start, scene.frame_end + 1)
+        if name == "cached":
+            load_frames(scene, frames)
+            scene.sequence_data.last_read_time = -1
+        scene.sequence_data.timing_log = log_path
+
+        latencies = load_frames(scene, frames)
+        seconds = sum(latencies)
+        results[name] = {"settings": settings, "frames": len(latencies), "seconds": seconds,
+                         "frames_per_second": len(latencies)/seconds, "mb_per_second": size/1024**2/seconds,
+                         "latency": summarize(latencies), "stages": read_stages(log_path)}
+    loader.shutdown_prefetcher()
+    return results
+
+
+def run_scrub(templates, args, work_folder):
+    """Jump to random frames as when dragging the playhead, with the default cache"""
+    log_path = os.path.join(work_folder, "scrub.jsonl")
+    scene = make_scene(templates, args.steps, timing_log=log_path)
+    frames = random.Random(args.seed).choices(range(scene.frame_start, scene.frame_end + 1), k=args.jumps)
+    latencies = load_frames(scene, frames)
+    return {"settings": {"cache_size": scene.sequence_data.cache_size}, "jumps": len(frames),
+            "latency": summarize(latencies), "stages": read_stages(log_path)}
+
+
+def claim_worker(settings):
+    """Render the scene frames not claimed yet by the other workers, returns the frames rendered"""
+    templates, steps, export_path, log_folder, render_time = settings
+    bpy.render_time = render_time
+    scene = make_scene(templates, steps, export_path=export_path, timing_log=log_folder + os.sep)
+    start = time.perf_counter()
+    rendered = scene.sequence_data_render.render_range(scene)
+    seconds = time.perf_counter() - start
+    loader.get_timing("")
+    return {"pid": os.getpid(), "frames": rendered, "seconds": seconds}
+
+
+def run_claim(templates, args, work_folder):
+    """Several processes rendering the same frame range, coordinated by their frame claims"""
+    export_path = os.path.join(work_folder, "renders")
+    log_folder = os.path.join(work_folder, "claim_logs")
+    os.makedirs(log_folder)
+
+    start = time.perf_counter()
+    with Pool(args.workers) as pool:
+        workers = pool.map(claim_worker, [(templates, args.steps, export_path, log_folder, args.render_time)]*args.workers)
+    seconds = time.perf_counter() - start
+
+    rendered = [frame for worker in workers for frame in worker["frames"]]
+    records = read_logs([log_folder])
+    busy = sum(worker["seconds"] for worker in workers)
+    framed = sum(record["total"] for record in records)
+    return {"workers": args.workers, "frames": args.steps, "render_time": args.render_time, "seconds": seconds,
+            "frames_per_second": len(set(rendered))/seconds,
+            "frames_per_worker": sorted(len(worker["frames"]) for worker in workers),
+            "duplicates": len(rendered) - len(set(rendered)), "missing": args.steps - len(set(rendered)),
+            # Time of the workers outside of rendering frames: claiming, skipping claimed frames...
+            "claim_overhead_per_frame": (busy - framed)/max(len(records), 1),
+            "stages": {stage: summarize(values) for stage, values in stage_statistics(records).items()}}
+
+
+def get_environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPOSITORY_FOLDER, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "hostname": socket.gethostname(), "platform": platform.platform(),
+            "python": platform.python_version(), "numpy": np.__version__, "cpus": os.cpu_count(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="""Benchmark the loading and render scheduling code of the SequenceDataLoader addon
+                                     without Blender, using a stand-in for bpy and synthetic .ply sequences. Results are written as JSON.""")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma separated scenarios to run among {}".format(", ".join(SCENARIOS)))
+    parser.add_argument("--vertices", type=int, default=100000, help="Number of vertices of each timestep")
+    parser.add_argument("--faces", type=int, help="Number of triangles of each timestep, about twice the number of vertices by default")
+    parser.add_argument("--steps", type=int, default=20, help="Number of timesteps, also the number of frames")
+    parser.add_argument("--objects", type=int, default=1, help="Number of sequence objects loaded at each frame")
+    parser.add_argument("--ascii", action="store_true", help="Write ascii instead of binary .ply files")
+    parser.add_argument("--changing-topology", action="store_true", help="Change the connectivity at every timestep")
+    parser.add_argument("--scalars", type=int, default=1, help="Number of float vertex properties")
+    parser.add_argument("--prefetch", type=int, default=4, help="Prefetch steps of the load prefetch scenario")
+    parser.add_argument("--jumps", type=int, default=100, help="Number of random frames loaded by the scrub scenario")
+    parser.add_argument("--workers", type=int, default=4, help="Number of processes of the claim scenario")
+    parser.add_argument("--render-time", type=float, default=0.05, help="Seconds spent rendering each frame in the claim scenario")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data and scrub frames")
+    parser.add_argument("--data", help="Folder where the sequences and renders are written, a temporary folder removed at the end by default")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file the results are written to")
+    args = parser.parse_args()
+
+    scenarios = args.scenarios.split(",")
+    for scenario in scenarios:
+        if scenario not in SCENARIOS:
+            parser.error("Unknown scenario {}, use {}".format(scenario, ", ".join(SCENARIOS)))
+
+    work_folder = args.data or tempfile.mkdtemp(prefix="sequence_benchmark_")
+    try:
+        start = time.perf_counter()
+        templates = [generate_sequence(os.path.join(work_folder, "data"), "surface{}".format(i), args.vertices, args.faces,
+                                       args.steps, not args.ascii, not args.changing_topology, args.scalars, seed=args.seed + i)
+                     for i in range(args.objects)]
+        print("Generated {} sequences of {} timesteps in {:.1f} s".format(args.objects, args.steps, time.perf_counter() - start))
+
+        results = {"environment": get_environment(), "parameters": vars(args), "scenarios": {}}
+        for scenario in scenarios:
+            scenario_folder = os.path.join(work_folder, scenario)
+            if os.path.exists(scenario_folder):
+                shutil.rmtree(scenario_folder)
+            os.makedirs(scenario_folder)
+            runner = {"load": run_load, "scrub": run_scrub, "claim": run_claim}[scenario]
+            results["scenarios"][scenario] = runner(templates, args, scenario_folder)
+    finally:
+        if not args.data:
+            shutil.rmtree(work_folder)
+
+    for name, result in results["scenarios"].get("load", {}).items():
+        print("load {:<9} {:7.1f} frames/s {:8.1f} MB/s  p50 {:.3f} s  max {:.3f} s".format(
+            name, result["frames_per_second"], result["mb_per_second"], result["latency"]["p50"], result["latency"]["max"]))
+    if "scrub" in results["scenarios"]:
+        latency = results["scenarios"]["scrub"]["latency"]
+        print("scrub          p50 {:.3f} s  p90 {:.3f} s  max {:.3f} s".format(latency["p50"], latency["p90"], latency["max"]))
+    if "claim" in results["scenarios"]:
+        claim = results["scenarios"]["claim"]
+        print("claim          {:.1f} frames/s with {} workers, {} duplicates, {} missing, {:.3f} s overhead per frame".format(
+            claim["frames_per_second"], claim["workers"], claim["duplicates"], claim["missing"], claim["claim_overhead_per_frame"]))
+
+    with open(args.output, "w") as output_file:
+        json.dump(results, output_file, indent=1)
+    print("Results written to {}".format(args.output))
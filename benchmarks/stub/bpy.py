@@ -0,0 +1,328 @@
+"""
+Stand-in for the parts of the Blender python API used by the SequenceDataLoader addon, so that
+its loading and rendering code can run (and be benchmarked) outside of Blender.
+
+Meshes keep their data in NumPy arrays and `foreach_set` copies and checks the values as Blender
+does, `update(calc_edges=True)` builds the edges. Rendering sleeps `render_time` seconds and saving
+the render writes a small placeholder file. Timings measured with this module leave out Blender's
+own costs (depsgraph evaluation, drawing, undo...), they are only comparable with each other.
+"""
+import os
+import time
+import types as python_types
+
+import numpy as np
+
+# Seconds spent in bpy.ops.render.render()
+render_time = 0.0
+
+
+class Property:
+    """Result of the bpy.props functions, its default value is set on every new PropertyGroup"""
+
+    DEFAULTS = {"Bool": False, "Int": 0, "Float": 0.0, "String": ""}
+
+    def __init__(self, kind, **options):
+        self.kind = kind
+        self.options = options
+
+    def default(self):
+        if "default" in self.options:
+            return self.options["default"]
+        if self.kind == "Collection":
+            return Collection(self.options["type"])
+        if self.kind == "Pointer":
+            return self.options["type"]()
+        if self.kind == "Enum":
+            return self.options["items"][0][0]
+        return self.DEFAULTS[self.kind]
+
+
+props = python_types.SimpleNamespace(**{
+    "{}Property".format(kind): (lambda kind: lambda **options: Property(kind, **options))(kind)
+    for kind in ("Bool", "Int", "Float", "String", "Enum", "Collection", "Pointer")
+})
+
+
+class Collection(list):
+    """bpy_prop_collection of PropertyGroups"""
+
+    def __init__(self, item_type):
+        super().__init__()
+        self.item_type = item_type
+
+    def add(self):
+        self.append(self.item_type())
+        return self[-1]
+
+    def remove(self, index):
+        del self[index]
+
+
+class PropertyGroup:
+    """Sets the default value of the properties annotated on the class and its bases"""
+
+    def __init__(self):
+        for cls in reversed(type(self).__mro__):
+            for name, value in vars(cls).get("__annotations__", {}).items():
+                if isinstance(value, Property):
+                    setattr(self, name, value.default())
+
+
+class Operator:
+    def report(self, level, message):
+        print(message)
+
+
+class Panel:
+    pass
+
+
+class Scene:
+    """Scene with the frame range and render settings read by the addon"""
+
+    def __init__(self, frame_start=1, frame_end=250):
+        self.frame_start = frame_start
+        self.frame_end = frame_end
+        self.frame_current = frame_start
+        self.cycles = python_types.SimpleNamespace(samples=64)
+        self.render = python_types.SimpleNamespace(
+            resolution_percentage=100,
+            image_settings=python_types.SimpleNamespace(file_format="PNG", compression=15, exr_codec="ZIP", color_depth="8"))
+
+
+types = python_types.SimpleNamespace(PropertyGroup=PropertyGroup, Operator=Operator, Panel=Panel, Scene=Scene)
+
+
+class ID:
+    """Datablock with custom properties"""
+
+    def __init__(self, name):
+        self.name = name
+        self.properties = {}
+
+    def get(self, key, default=None):
+        return self.properties.get(key, default)
+
+    def __getitem__(self, key):
+        return self.properties[key]
+
+    def __setitem__(self, key, value):
+        self.properties[key] = value
+
+
+class Elements:
+    """
+    Vertices, loops or polygons of a mesh
+
+    :param layout: {property name: (number of components, dtype)}
+    """
+
+    def __init__(self, layout):
+        self.layout = layout
+        self.arrays = {name: np.zeros(0, dtype) for name, (_, dtype) in layout.items()}
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, count):
+        self.count += count
+        for name, (components, dtype) in self.layout.items():
+            array = np.zeros(self.count*components, dtype)
+            array[:len(self.arrays[name])] = self.arrays[name]
+            self.arrays[name] = array
+
+    def foreach_set(self, name, values):
+        array = self.arrays[name]
+        values = np.asarray(values).ravel()
+        if len(values) != len(array):
+            raise RuntimeError("internal error setting the array: {} values for {} items".format(len(values), len(array)))
+        array[:] = values
+
+    def foreach_get(self, name, values):
+        values[:] = self.arrays[name].reshape(np.shape(values))
+
+
+class AttributeData:
+    COMPONENTS = {"value": 1, "uv": 2, "vector": 3, "color": 4, "color_srgb": 4}
+
+    def __init__(self, attribute):
+        self.attribute = attribute
+        self.arrays = {}
+
+    def foreach_set(self, name, values):
+        size = self.attribute.size()*self.COMPONENTS[name]
+        values = np.asarray(values, dtype=np.float32).ravel()
+        if len(values) != size:
+            raise RuntimeError("internal error setting the array: {} values for {} items".format(len(values), size))
+        self.arrays[name] = values.copy()
+
+
+class Attribute:
+    def __init__(self, mesh, name, data_type, domain):
+        self.mesh = mesh
+        self.name = name
+        self.data_type = data_type
+        self.domain = domain
+        self.data = AttributeData(self)
+
+    def size(self):
+        elements = {"POINT": self.mesh.vertices, "CORNER": self.mesh.loops, "FACE": self.mesh.polygons}[self.domain]
+        return len(elements)
+
+
+class Attributes:
+    """Attributes of a mesh, `color_attributes` is a view on the color ones"""
+
+    COLOR_TYPES = ("BYTE_COLOR", "FLOAT_COLOR")
+
+    def __init__(self, mesh, colors_only=False):
+        self.mesh = mesh
+        self.colors_only = colors_only
+
+    def items(self):
+        return {name: attribute for name, attribute in self.mesh.attribute_store.items()
+                if not self.colors_only or attribute.data_type in self.COLOR_TYPES}
+
+    def __contains__(self, name):
+        return name in self.items()
+
+    def __iter__(self):
+        return iter(self.items().values())
+
+    def get(self, name):
+        return self.items().get(name)
+
+    def new(self, name, type, domain):
+        attribute = Attribute(self.mesh, name, type, domain)
+        self.mesh.attribute_store[name] = attribute
+        return attribute
+
+    def remove(self, attribute):
+        del self.mesh.attribute_store[attribute.name]
+
+
+class UVLayer:
+    def __init__(self, mesh, name):
+        self.name = name
+        self.data = AttributeData(python_types.SimpleNamespace(size=lambda: len(mesh.loops)))
+
+
+class UVLayers(dict):
+    def __init__(self, mesh):
+        super().__init__()
+        self.mesh = mesh
+
+    def new(self, name="UVMap"):
+        self[name] = UVLayer(self.mesh, name)
+        return self[name]
+
+
+class Mesh(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.attribute_store = {}
+        self.attributes = Attributes(self)
+        self.color_attributes = Attributes(self, colors_only=True)
+        self.uv_layers = UVLayers(self)
+        self.custom_normals = None
+        self.edge_count = 0
+        self.clear_geometry()
+
+    def clear_geometry(self):
+        self.vertices = Elements({"co": (3, np.float32)})
+        self.loops = Elements({"vertex_index": (1, np.int32)})
+        self.polygons = Elements({"loop_start": (1, np.int32), "use_smooth": (1, bool), "material_index": (1, np.int32)})
+        self.attribute_store.clear()
+        self.uv_layers.clear()
+        self.custom_normals = None
+        self.edge_count = 0
+
+    def update(self, calc_edges=False):
+        if not calc_edges or not len(self.polygons):
+            return
+        # Each loop and the next one of its polygon form an edge
+        loop_starts = self.polygons.arrays["loop_start"]
+        loop_ends = np.append(loop_starts[1:], len(self.loops))
+        corners = self.loops.arrays["vertex_index"]
+        following = np.roll(corners, -1)
+        following[loop_ends - 1] = corners[loop_starts]
+        edges = np.sort(np.stack((corners, following), axis=1), axis=1)
+        self.edge_count = len(np.unique(edges.view(np.int64)))
+
+    def set_sharp_from_angle(self, angle=np.pi):
+        pass
+
+    def normals_split_custom_set_from_vertices(self, normals):
+        self.custom_normals = np.array(normals, dtype=np.float32)
+
+
+class Volume(ID):
+    def __init__(self, name):
+        super().__init__(name)
+        self.filepath = ""
+        self.is_sequence = False
+        self.grids = python_types.SimpleNamespace(load=lambda: True, error_message="")
+
+
+class Object(ID):
+    def __init__(self, name, data):
+        super().__init__(name)
+        self.data = data
+        self.type = "VOLUME" if isinstance(data, Volume) else "MESH"
+        self.mode = "OBJECT"
+
+
+class Objects(dict):
+    def new(self, name, data):
+        self[name] = Object(name, data)
+        return self[name]
+
+
+class Image:
+    def save_render(self, filepath):
+        with open(filepath, "wb") as image_file:
+            image_file.write(b"render")
+
+
+data = python_types.SimpleNamespace(objects=Objects(), images={"Render Result": Image()})
+
+context = python_types.SimpleNamespace(scene=None, window_manager=None)
+
+
+def render(**options):
+    time.sleep(render_time)
+    return {"FINISHED"}
+
+
+ops = python_types.SimpleNamespace(render=python_types.SimpleNamespace(render=render))
+
+
+class Timers:
+    def __init__(self):
+        self.functions = {}
+
+    def register(self, function, first_interval=0):
+        self.functions[function] = time.monotonic() + first_interval
+
+    def is_registered(self, function):
+        return function in self.functions
+
+    def unregister(self, function):
+        del self.functions[function]
+
+
+app = python_types.SimpleNamespace(handlers=python_types.SimpleNamespace(frame_change_pre=[]), timers=Timers())
+
+
+def abspath(path):
+    """Blender paths starting with // are relative to the .blend file, here to the working directory"""
+    if path.startswith("//"):
+        path = path[2:]
+    return os.path.abspath(path)
+
+
+path = python_types.SimpleNamespace(abspath=abspath)
+
+utils = python_types.SimpleNamespace(register_class=lambda cls: None, unregister_class=lambda cls: None)
@@ -0,0 +1,85 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from SequenceDataLoader.ply_reader import read_ply
+from SequenceDataLoader.sequence_cache import cache_path, write_cache
+from SequenceDataLoader.sequence_delta import DeltaWriter, delta_path
+from SequenceDataLoader.sequence_index import SequenceIndex, remove_manifest
+
+
+def convert_file(path, scalar_bits, force=False):
+    """
+    Write the compact cache of a single .ply file, skipped if the cache is more recent than the file
+    """
+    output_path = cache_path(path)
+    if not force and os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(path):
+        return output_path, False
+
+    write_cache(output_path, read_ply(path), scalar_bits)
+    return output_path, True
+
+
+def convert_delta(index, output_path, args):
+    """Write every timestep of a sequence to a single .seqd archive"""
+    writer = DeltaWriter(output_path, args.compression, args.level, args.keyframe_interval,
+                         args.position_bits, args.scalar_bits)
+    try:
+        for time in index.times:
+            writer.add(time, read_ply(index.files[time]))
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="""Convert sequences of .ply files into compact .seqc cache files,
+                                     written next to each .ply file and loaded instead of it by the SequenceDataLoader addon.
+                                     With --delta, static topology sequences are instead stored in a single compressed .seqd archive.""")
+    parser.add_argument("templates", nargs="+", help="Path to the sequence, with the time index replaced by '###' (e.g. 'ply_export/t########/surface.ply')")
+    parser.add_argument("--scalar-bits", type=int, default=16, choices=[0, 8, 16], help="Bits used to quantize normals and scalar attributes, 0 to keep float32")
+    parser.add_argument("--workers", type=int, default=1, help="Number of files converted in parallel")
+    parser.add_argument("--force", action="store_true", help="Convert files even if their cache is up to date")
+    parser.add_argument("--delta", action="store_true", help="Write one .seqd archive per sequence, storing the connectivity once and the differences between timesteps")
+    parser.add_argument("--output", help="Path of the .seqd archive, defaults to the sequence name in the folder holding the timesteps (single template only)")
+    parser.add_argument("--compression", default="zlib", choices=["zlib", "lzma", "none"], help="Compression of the .seqd archive")
+    parser.add_argument("--level", type=int, default=6, help="Compression level (zlib level or lzma preset)")
+    parser.add_argument("--keyframe-interval", type=int, default=10, help="Number of timesteps between full copies of the data in the .seqd archive")
+    parser.add_argument("--position-bits", type=int, default=0, help="Bits used to quantize positions in the .seqd archive, 0 to keep them exact")
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.delta:
+        if args.output and len(args.templates) > 1:
+            parser.error("--output can only be used with a single template")
+        for template in args.templates:
+            index = SequenceIndex(os.path.abspath(template))
+            output_path = args.output or delta_path(index.template_path)
+            convert_delta(index, output_path, args)
+            size = sum(os.path.getsize(index.files[time]) for time in index.times)
+            print("{}: {} timesteps written to {} ({:.1f} MB -> {:.1f} MB)".format(template, len(index.times), output_path,
+                                                                             size/1024**2, os.path.getsize(output_path)/1024**2))
+        print("Converted {} sequences in {:.1f} s".format(len(args.templates), time.time() - start))
+
+    else:
+        paths = []
+        for template in args.templates:
+            index = SequenceIndex(os.path.abspath(template))
+            print("{}: {} timesteps".format(template, len(index.times)))
+            paths += [index.files[time] for time in index.times]
+
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = [executor.submit(convert_file, path, args.scalar_bits, args.force) for path in paths]
+            for path, future in zip(paths, futures):
+                output_path, converted = future.result()
+                if converted:
+                    print("  - Written {} ({:.1f} MB -> {:.1f} MB)".format(output_path, os.path.getsize(path)/1024**2,
+                                                                          os.path.getsize(output_path)/1024**2))
+
+        # Manifests listing the cache files written before are out of date
+        for template in args.templates:
+            remove_manifest(cache_path(os.path.abspath(template)))
+        print("Converted {} files in {:.1f} s".format(len(paths), time.time() - start))
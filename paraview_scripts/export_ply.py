@@ -1,8 +1,21 @@
 from paraview.simple import *
 import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+from time import sleep
 from pathlib import Path
 import argparse
 
+import numpy as np
+from vtkmodules.util.numpy_support import vtk_to_numpy
+
+from parallel_export import add_arguments, get_lod_filename, get_partial_filename, get_rank, get_timing_log, is_done, launch_workers, mark_done, split_steps
+# Importable once parallel_export added the SequenceDataLoader folder to the path
+from SequenceDataLoader.frame_claim import FrameClaim
+
 
 def get_filename(export_path, step, name="", ext=""):
     folder = "{}/t{:08}".format(export_path, step)
@@ -10,24 +23,214 @@ def get_filename(export_path, step, name="", ext=""):
     return folder, filename
 
 
-def export_ply(filename, source, displayProp):
+def export_ply(filename, source, displayProp, colorArrayName=None):
+
+    if colorArrayName is None:
+        colorArrayName = list(displayProp.ColorArrayName)
 
     export_args = {}
-    if displayProp.ColorArrayName[0] == "POINTS":
-        export_args = {'PointDataArrays': [displayProp.ColorArrayName[1]]}
-    elif displayProp.ColorArrayName[0] == "CELLS":
-        export_args = {'CellDataArrays': [displayProp.ColorArrayName[1]]}
+    if colorArrayName[0] == "POINTS":
+        export_args = {'PointDataArrays': [colorArrayName[1]]}
+    elif colorArrayName[0] == "CELLS":
+        export_args = {'CellDataArrays': [colorArrayName[1]]}
 
-    if displayProp.ColorArrayName[1] == '':
+    if colorArrayName[1] == '':
         print("      Skipping {}".format(filename))
-        return
+        return False
+
+    # Written under a temporary name so an interrupted export never leaves a truncated file in place
+    partial_filename = get_partial_filename(filename)
 
     print("      Writing {}".format(filename))
-    SaveData(filename, proxy=source,
+    SaveData(partial_filename, proxy=source,
              EnableColoring=1,
-             ColorArrayName=list(displayProp.ColorArrayName),
+             ColorArrayName=colorArrayName,
              LookupTable=displayProp.LookupTable, **export_args)
-    return 
+    os.replace(partial_filename, filename)
+    return True
+
+
+def export_arrays_ply(filename, source, displayProp, arrayNames=None, time=None):
+    """
+    Write the surface of `source` with its point and cell arrays as float vertex and face properties
+    instead of colors baked through the lookup table, so that they can be colormapped in Blender.
+    The range of every property and the colormap of the display are written to a `.ranges.json` file.
+
+    :param source: filter whose output is a surface (see `get_surface`)
+    :param arrayNames: names of the arrays to write, None for all of them. The array
+        the display is colored with is always written.
+    """
+    data = servermanager.Fetch(source)
+    colorArrayName = list(displayProp.ColorArrayName)
+    if arrayNames is not None and colorArrayName[1]:
+        arrayNames = arrayNames + [colorArrayName[1]]
+
+    points = vtk_to_numpy(data.GetPoints().GetData()) if data.GetPoints() else np.zeros((0, 3))
+    vertex = [("x", points[:, 0]), ("y", points[:, 1]), ("z", points[:, 2])]
+    normals = data.GetPointData().GetNormals()
+    if normals is not None:
+        normals = vtk_to_numpy(normals)
+        vertex += [("nx", normals[:, 0]), ("ny", normals[:, 1]), ("nz", normals[:, 2])]
+
+    # Faces are the polygons, following the vertices and lines in the cell arrays
+    polys = data.GetPolys()
+    offsets = vtk_to_numpy(polys.GetOffsetsArray()).astype(np.int64)
+    connectivity = vtk_to_numpy(polys.GetConnectivityArray()).astype("<i4")
+    firstPoly = data.GetNumberOfVerts() + data.GetNumberOfLines()
+    faceCount = len(offsets) - 1
+
+    ranges = {}
+    properties = {"POINTS": [], "CELLS": []}
+    for association, fieldData, skip in (("POINTS", data.GetPointData(), normals is not None), ("CELLS", data.GetCellData(), False)):
+        normalsName = fieldData.GetNormals().GetName() if skip else None
+        for i in range(fieldData.GetNumberOfArrays()):
+            name = fieldData.GetArrayName(i)
+            if name is None or name.startswith("vtk") or name == normalsName or (arrayNames is not None and name not in arrayNames):
+                continue
+            values = vtk_to_numpy(fieldData.GetArray(i))
+            if association == "CELLS":
+                values = values[firstPoly:firstPoly + faceCount]
+            for propertyName, column in get_components(name, values):
+                properties[association].append((propertyName, column.astype("<f4")))
+                ranges[propertyName] = {"array": name, "association": association,
+                                        "range": [float(np.nanmin(column)), float(np.nanmax(column))] if column.size else None}
+
+    header = ["ply", "format binary_little_endian 1.0", "element vertex {}".format(len(points))]
+    header += ["property float {}".format(name) for name, _ in vertex + properties["POINTS"]]
+    header += ["element face {}".format(faceCount), "property list int int vertex_indices"]
+    header += ["property float {}".format(name) for name, _ in properties["CELLS"]]
+    header.append("end_header")
+
+    vertexRecords = np.empty(len(points), dtype=[(name, "<f4") for name, _ in vertex + properties["POINTS"]])
+    for name, column in vertex + properties["POINTS"]:
+        vertexRecords[name] = column
+
+    # Each face is its vertex count, its indices then its properties, all 4 bytes values
+    sizes = np.diff(offsets)
+    faceStarts = offsets[:-1] + np.arange(faceCount)*(1 + len(properties["CELLS"]))
+    faceRecords = np.empty(len(connectivity) + faceCount*(1 + len(properties["CELLS"])), dtype="<i4")
+    faceRecords[faceStarts] = sizes
+    faceRecords[np.repeat(faceStarts + 1 - offsets[:-1], sizes) + np.arange(len(connectivity))] = connectivity
+    for i, (_, column) in enumerate(properties["CELLS"]):
+        faceRecords[faceStarts + 1 + sizes + i] = column.view("<i4")
+
+    partial_filename = get_partial_filename(filename)
+    print("      Writing {}".format(filename))
+    with open(partial_filename, "wb") as plyFile:
+        plyFile.write(("\n".join(header) + "\n").encode("ascii"))
+        plyFile.write(vertexRecords.tobytes())
+        plyFile.write(faceRecords.tobytes())
+
+    sidecar = {"time": time, "arrays": ranges}
+    if colorArrayName[1] and displayProp.LookupTable is not None:
+        rgbPoints = list(displayProp.LookupTable.RGBPoints)
+        sidecar["colormap"] = {"array": colorArrayName[1], "association": colorArrayName[0],
+                               "range": [rgbPoints[0], rgbPoints[-4]], "rgb_points": rgbPoints}
+    with open(partial_filename + ".json", "w") as sidecarFile:
+        json.dump(sidecar, sidecarFile, indent=1)
+    os.replace(partial_filename + ".json", get_ranges_filename(filename))
+    os.replace(partial_filename, filename)
+    return True
+
+
+def get_components(name, values):
+    """Property names and values of an array: one per component and the magnitude for vectors"""
+    name = re.sub("[^A-Za-z0-9_]", "_", name)
+    if values.ndim == 1:
+        return [(name, values)]
+    components = [("{}_{}".format(name, i), values[:, i]) for i in range(values.shape[1])]
+    return components + [(name + "_magnitude", np.linalg.norm(values, axis=1))]
+
+
+def get_ranges_filename(filename):
+    """Sidecar file holding the ranges of the properties of a .ply file (surface.ply -> surface.ranges.json)"""
+    return os.path.splitext(filename)[0] + ".ranges.json"
+
+
+def get_surface(source):
+    """Polygonal surface of any source, as written by the PLY writer"""
+    return ExtractSurface(Input=MergeBlocks(Input=source))
+
+
+def create_lod(source, displayProp, level, reduction, pointArrays=False):
+    """
+    Decimated surface of `source` keeping a (1 - reduction)**level fraction of its triangles.
+    Cell colors are converted to point colors as decimation only keeps point data.
+
+    :param pointArrays: convert every cell array to a point array, not only the colored one
+    :returns: the decimation filter and the array to color it with
+    """
+    colorArrayName = list(displayProp.ColorArrayName)
+    if colorArrayName[0] == "CELLS" or pointArrays:
+        source = CellDatatoPointData(Input=source)
+    surface = get_surface(source)
+    triangles = Triangulate(Input=surface)
+    lod = Decimate(Input=triangles)
+    lod.TargetReduction = 1 - (1 - reduction)**level
+    if colorArrayName[0] == "CELLS":
+        colorArrayName[0] = "POINTS"
+    return lod, colorArrayName
+
+
+# Properties connecting a filter to the sources it reads from
+INPUT_PROPERTIES = ("Input", "Source", "DestinationMesh", "SourceDataArrays")
+
+def get_pipeline(proxy):
+    """`proxy` and every proxy upstream of it"""
+    pipeline = [proxy]
+    for name in INPUT_PROPERTIES:
+        if name in proxy.ListProperties():
+            inputs = proxy.GetPropertyValue(name)
+            for input in (inputs if isinstance(inputs, list) else [inputs]):
+                if input is not None:
+                    # Inputs connected to another output port than the first are given as OutputPort objects
+                    pipeline += get_pipeline(getattr(input, "Proxy", input))
+    return pipeline
+
+
+def is_time_dependent(source):
+    """
+    True if the output of `source` can change over time: a proxy of its pipeline has timesteps
+    or animated properties, or the animation runs Python scripts
+    """
+    source.UpdatePipelineInformation()
+    pipeline = get_pipeline(source)
+    for cue in GetAnimationScene().Cues:
+        if cue.GetXMLName() == "PythonAnimationCue":
+            return True
+        if "AnimatedProxy" in cue.ListProperties() and any(cue.AnimatedProxy == proxy for proxy in pipeline):
+            return True
+    for proxy in pipeline:
+        timesteps = proxy.GetProperty("TimestepValues")
+        if timesteps is not None and len(timesteps) > 0:
+            return True
+    return False
+
+
+def get_file_hash(filename):
+    digest = hashlib.sha1()
+    with open(filename, "rb") as dataFile:
+        for block in iter(lambda: dataFile.read(1 << 24), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def link_file(target, filename):
+    """
+    Replace `filename` by a hard link to `target`, a symbolic link where hard links aren't supported
+    and a copy as a last resort
+    """
+    partial_filename = get_partial_filename(filename)
+    if os.path.lexists(partial_filename):
+        os.remove(partial_filename)
+    try:
+        os.link(target, partial_filename)
+    except OSError:
+        try:
+            os.symlink(os.path.relpath(target, os.path.dirname(filename)), partial_filename)
+        except OSError:
+            shutil.copyfile(target, partial_filename)
+    os.replace(partial_filename, filename)
 
 
 parser = argparse.ArgumentParser()
@@ -35,9 +238,24 @@ parser = argparse.ArgumentParser()
 parser.add_argument("statefile", help="ParaView Statefile to process")
 parser.add_argument("--data-path", help="Path to the solution data")
 parser.add_argument("--export-path", default="paraview_export", help="Path to export .ply files")
+parser.add_argument("--lods", type=int, default=0, help="Number of reduced resolution levels written next to each .ply file")
+parser.add_argument("--lod-reduction", type=float, default=0.75, help="Fraction of the triangles removed from one level to the next")
+parser.add_argument("--arrays", help="Comma separated point and cell arrays written as float properties instead of colors baked through the lookup table, "
+                                     "'all' for every array. Their ranges are written to a .ranges.json file next to each .ply file")
+parser.add_argument("--static-sources", choices=["pipeline", "hash"],
+                    help="Write files of sources that don't change over time only once, the other timesteps linking to them. "
+                         "'pipeline' detects sources without time dependency (no timesteps nor animation upstream) and exports them "
+                         "once into the 'static' folder, 'hash' exports every source and replaces files identical to the previous timestep by links")
+add_arguments(parser)
 
 args = parser.parse_args()
 
+if args.workers > 1:
+    sys.exit(launch_workers(args.workers))
+
+rank, nranks = get_rank(args)
+timing = get_timing_log(args.timing_log, "export_ply")
+
 state_file = args.statefile
 export_path = args.export_path
 
@@ -56,22 +274,124 @@ animationScene = GetAnimationScene()
 
 timestep_list = animationScene.TimeKeeper.TimestepValues
 
-for step, time in enumerate(timestep_list):
+# Listed once as the level of detail filters are new sources
+sources = list(GetSources().items())
+lod_sources = {}
+surface_sources = {}
+
+arrayNames = None if args.arrays in (None, "all") else args.arrays.split(",")
+
+static_folder = os.path.join(export_path, "static")
+static_sources = set()
+if args.static_sources == "pipeline":
+    static_sources = {name for name, source in sources if not is_time_dependent(source)}
+    print("Sources without time dependency, exported once: {}".format(", ".join(name[0] for name in sorted(static_sources)) or "none"))
+
+# Name of each file written for a previous timestep and its content hash, to link identical files to it
+previous_files = {}
+
+
+def write_source(filename, name, source, display, time):
+    """Write a source and its levels of detail, returns the paths of the files written"""
+    written = []
+    with timing.stage("write"):
+        if args.arrays:
+            if name not in surface_sources:
+                surface_sources[name] = get_surface(source)
+            export_arrays_ply(filename, surface_sources[name], display, arrayNames, time)
+            written.append(get_ranges_filename(filename))
+        elif not export_ply(filename, source, display):
+            return written
+    written.append(filename)
+
+    for level in range(1, args.lods + 1):
+        if (name, level) not in lod_sources:
+            lod_sources[(name, level)] = create_lod(source, display, level, args.lod_reduction, bool(args.arrays))
+        lod, colorArrayName = lod_sources[(name, level)]
+        lod_filename = get_lod_filename(filename, level)
+        with timing.stage("lod"):
+            if args.arrays:
+                export_arrays_ply(lod_filename, lod, display, arrayNames, time)
+                written += [lod_filename, get_ranges_filename(lod_filename)]
+            elif export_ply(lod_filename, lod, display, colorArrayName):
+                written.append(lod_filename)
+
+    timing.count(bytes_written=sum(os.path.getsize(path) for path in written))
+    return written
+
+
+steps = split_steps(list(range(len(timestep_list))), rank, nranks)
+if nranks > 1:
+    print("Rank {}/{}: {} timesteps".format(rank, nranks, len(steps)))
+
+for step in steps:
+    time = timestep_list[step]
     export_folder, _ = get_filename(export_path, step)
-    if os.path.exists(export_folder):
+
+    # A timestep is done once its marker is written, a folder without marker was interrupted and is exported again
+    marker_path = os.path.join(export_folder, ".done")
+    if is_done(marker_path):
         continue
 
     print("  - Export timestep {}/{} ({})".format(step, len(timestep_list), time))
+    timing.begin(step=step, time=time, rank=rank)
 
     Path(export_folder).mkdir(parents=True, exist_ok=True)
 
-    animationScene.AnimationTime = time
+    with timing.stage("update"):
+        animationScene.AnimationTime = time
 
-    for name, source in GetSources().items():
+    files = []
+    linked = []
+    for name, source in sources:
         display = GetDisplayProperties(source, view=renderView)
         if display.Visibility == 1:
             _, filename = get_filename(export_path, step, name[0], "ply")
-            export_ply(filename, source, display)
+
+            if name in static_sources:
+                # Exported once by the first process to claim it, the others wait for its marker,
+                # then linked in every timestep
+                static_marker = os.path.join(static_folder, ".{}.done".format(name[0]))
+                Path(static_folder).mkdir(parents=True, exist_ok=True)
+                while not is_done(static_marker):
+                    claim = FrameClaim(static_marker)
+                    if not claim.acquire():
+                        with timing.stage("wait"):
+                            sleep(1)
+                        continue
+                    try:
+                        written = write_source(os.path.join(static_folder, name[0] + ".ply"), name, source, display, time)
+                        mark_done(static_marker, time=time, files=[os.path.basename(path) for path in written])
+                    finally:
+                        claim.release()
+                with open(static_marker, "r") as marker_file:
+                    static_files = json.load(marker_file)["files"]
+                for static_file in static_files:
+                    link_file(os.path.join(static_folder, static_file), os.path.join(export_folder, static_file))
+                files += static_files
+                linked += static_files
+                continue
+
+            written = write_source(filename, name, source, display, time)
+            files += [os.path.basename(path) for path in written]
+
+            if args.static_sources:
+                with timing.stage("deduplicate"):
+                    for path in written:
+                        if not path.endswith(".ply"):
+                            continue
+                        fileHash = get_file_hash(path)
+                        previous = previous_files.get(os.path.basename(path))
+                        if previous is not None and previous[0] == fileHash and os.path.isfile(previous[1]):
+                            link_file(previous[1], path)
+                            linked.append(os.path.basename(path))
+                        else:
+                            previous_files[os.path.basename(path)] = (fileHash, path)
+
+    if linked:
+        timing.count(files_linked=len(linked))
+    mark_done(marker_path, time=time, files=files, linked=linked)
+    timing.end()
 
 
 
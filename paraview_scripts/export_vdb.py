@@ -1,10 +1,26 @@
 #### import the simple module from the paraview
 from paraview.simple import *
 import argparse
+import math
 import os
 import sys 
 from pathlib import Path
 
+import numpy as np
+from vtkmodules.util.numpy_support import numpy_to_vtk, vtk_to_numpy
+from vtkmodules.vtkCommonDataModel import vtkImageData
+
+from parallel_export import NullTimingLog, add_arguments, get_lod_filename, get_partial_filename, get_memory, get_peak_memory, get_rank, get_timing_log, launch_workers, split_steps
+
+USE_OPENVDB = True
+try:
+    import openvdb as vdb
+except ModuleNotFoundError:
+    try:
+        import pyopenvdb as vdb
+    except ModuleNotFoundError:
+        USE_OPENVDB = False
+
 def get_filename(export_path, step, format):
     """
     get_filename outputs updated filename based on timestep.
@@ -15,12 +31,54 @@ def get_filename(export_path, step, format):
     """ 
     filename = "{}/t{:08}.{}".format(export_path, step,format)
     return(filename)
-    
 
-def update_file(filename, export_path, samplingBounds, samplingDimensions, cellSize, **kwargs):
+
+def split_bricks(dimensions, bricks):
+    """
+    Split a grid of `dimensions` points into `bricks` (number of bricks in x, y and z).
+    Neighbouring bricks share their boundary points so they sample exactly the points of the full grid.
+
+    :returns: list of ((first, last) point index in x, y and z) for every brick
+    """
+    edges = [np.linspace(0, dimensions[axis] - 1, bricks[axis] + 1).round().astype(int).tolist() for axis in range(3)]
+    return [((edges[0][i], edges[0][i + 1]), (edges[1][j], edges[1][j + 1]), (edges[2][k], edges[2][k + 1]))
+            for k in range(bricks[2]) for j in range(bricks[1]) for i in range(bricks[0])]
+
+
+def choose_bricks(dimensions, point_bytes, max_memory):
+    """
+    Number of bricks in x, y and z so that resampling a brick stays within `max_memory` MB
+    on top of the memory already used. The longest axis is split first.
+    """
+    # Memory can't be read on every platform, the whole budget is then used
+    used = get_memory() or 0.0
+    available = max_memory - used
+    if available <= 0:
+        print("Warning: already using {:.0f} MB, above --max-memory".format(used))
+        available = max_memory/4
+
+    bricks = [1, 1, 1]
+    # The resampled brick is held twice: by the filter and in the copy fetched to numpy
+    while 2*math.prod(dimensions[axis]/bricks[axis] for axis in range(3))*point_bytes/1024**2 > available:
+        axis = max(range(3), key=lambda axis: dimensions[axis]/bricks[axis])
+        if dimensions[axis]/bricks[axis] < 4:
+            break
+        bricks[axis] += 1
+    return bricks
+
+
+def get_point_bytes(source):
+    """Memory used by each point of the resampled grid: every array in 32 bits plus the valid point mask"""
+    components = sum(array.GetNumberOfComponents() for array in source.PointData)
+    components += sum(array.GetNumberOfComponents() for array in source.CellData)
+    return 4*components + 1
+
+
+def update_file(filename, export_path, samplingBounds, samplingDimensions, cellSize, rank=0, nranks=1, bricks=None, maxMemory=None, vdbOptions=None, lods=0, timing=None, **kwargs):
     """
     update_file reads in the xmf input file, implements a sampling filter and then outputs the 
     resultant data in the default openvdb format. It outputs a different file for each timestep.
+    Timesteps (or bricks of timesteps) are split between `nranks` processes, each running its own reader.
 
     :param filename: path for the input xmf file  
     :param export_path: directory for the output files 
@@ -29,6 +87,13 @@ def update_file(filename, export_path, samplingBounds, samplingDimensions, cellS
     :param samplingDimensions: list of image dimensions for paraview in format: [x_dim, y_dim, z_dim]. 
         This can be null but then cellSizes will need to be populated
     :param cellSize: Cell size for all dimensions for paraview
+    :param rank: index of this process, exporting every `nranks`-th timestep (or brick)
+    :param nranks: number of processes sharing the export
+    :param bricks: number of bricks in x, y and z the grid is resampled in, then merged into one grid
+    :param maxMemory: memory budget in MB, used to choose the number of bricks when `bricks` isn't set
+    :param vdbOptions: dict of extra `save_data` arguments (arrays to write, sparse output)
+    :param lods: number of reduced resolution levels written next to each timestep
+    :param timing: TimingLog receiving the time spent in each stage of every timestep (or brick)
     """ 
     print("reading ", filename)
     # create a new 'XDMF Reader'
@@ -56,6 +121,8 @@ def update_file(filename, export_path, samplingBounds, samplingDimensions, cellS
     format = "vdb"
     if kwargs and ("format" in kwargs):
             format = kwargs["format"]
+    vdbOptions = vdbOptions or {}
+    timing = timing or NullTimingLog()
 
     if samplingBounds:
         resampleToImage1.UseInputBounds = 0
@@ -78,43 +145,321 @@ def update_file(filename, export_path, samplingBounds, samplingDimensions, cellS
     # update timeline for the first timestep onwards 
     UpdatePipeline(time=timestep_list[0], proxy=resampleToImage1) 
 
-    # iterate over timesteps and save each one in different directory marked by an index
-    for step, time in enumerate(timestep_list):
+    if not bricks and maxMemory:
+        bricks = choose_bricks(samplingDimensions, get_point_bytes(reader), maxMemory)
+    if bricks and math.prod(bricks) > 1:
+        print("Resampling in {}x{}x{} bricks".format(*bricks))
+        brick_list = split_bricks(samplingDimensions, bricks)
+        bounds = list(resampleToImage1.SamplingBounds) if samplingBounds else list(reader.GetDataInformation().GetBounds())
+        spacing = [(bounds[2*axis + 1] - bounds[2*axis])/max(samplingDimensions[axis] - 1, 1) for axis in range(3)]
+        resampleToImage1.UseInputBounds = 0
+    else:
+        brick_list = [None]
+        bounds = None
+
+    # iterate over timesteps (and bricks) and save each one in different directory marked by an index
+    work = [(step, brick) for step in range(len(timestep_list)) for brick in range(len(brick_list))]
+    for step, brick in split_steps(work, rank, nranks):
+        time = timestep_list[step]
 
         output_filename = get_filename(export_path, step,format)
-        output_filename_tmp = output_filename + "tmp"
-        if os.path.isfile(output_filename) or os.path.isfile(output_filename_tmp):
+        if os.path.isfile(output_filename):
             continue 
 
-        # Create empty temporary file
-        with open(output_filename_tmp, 'w') as fp:
-            pass
-
-        print("  - Export timestep {}/{} ({})".format(step, len(timestep_list), time))
+        timing.begin(step=step, time=time, brick=brick, rank=rank)
 
         # set time for that animation
         animationScene1.AnimationTime = time 
 
+        if brick_list[brick] is None:
+            print("  - Export timestep {}/{} ({})".format(step, len(timestep_list), time))
+            with timing.stage("lod"):
+                export_lods(resampleToImage1, time, output_filename, samplingDimensions, bounds, lods, vdbOptions)
+            with timing.stage("resample"):
+                UpdatePipeline(time=time, proxy=resampleToImage1)
+
+            # Written under a temporary name so an interrupted export is done again
+            partial_filename = get_partial_filename(output_filename)
+            with timing.stage("write"):
+                save_data(partial_filename, resampleToImage1, **vdbOptions)
+            os.replace(partial_filename, output_filename)
+            timing.count(bytes_written=os.path.getsize(output_filename))
+        else:
+            brick_folder = os.path.join(export_path, ".t{:08}.bricks".format(step))
+            with timing.stage("brick"):
+                export_brick(resampleToImage1, time, brick_folder, brick, brick_list[brick], bounds, spacing,
+                             vdbOptions.get("pointArrays"))
+            if all(os.path.isfile(get_brick_filename(brick_folder, index)) for index in range(len(brick_list))):
+                print("  - Merge timestep {}/{} ({})".format(step, len(timestep_list), time))
+                with timing.stage("lod"):
+                    export_lods(resampleToImage1, time, output_filename, samplingDimensions, bounds, lods, vdbOptions)
+                with timing.stage("merge"):
+                    merge_bricks(output_filename, brick_folder, brick_list, samplingDimensions, bounds, spacing, vdbOptions)
+
+        peak_memory = get_peak_memory()
+        if peak_memory is not None:
+            print("    Peak memory {:.0f} MB".format(peak_memory))
+        timing.end(peak_rss_mb=peak_memory)
+
+
+def export_lods(resampleToImage1, time, output_filename, samplingDimensions, bounds, lods, vdbOptions):
+    """
+    Resample a timestep again with half the resolution per level, next to the full resolution file.
+    Written before it so a timestep whose full resolution file exists is complete.
+
+    :param bounds: bounds of the whole grid, None to keep the sampling bounds of the filter
+    """
+    for level in range(1, lods + 1):
+        lod_filename = get_lod_filename(output_filename, level)
+        if os.path.isfile(lod_filename):
+            continue
+        if bounds is not None:
+            resampleToImage1.SamplingBounds = bounds
+        resampleToImage1.SamplingDimensions = [max(2, (dimension - 1)//2**level + 1) for dimension in samplingDimensions]
         UpdatePipeline(time=time, proxy=resampleToImage1)
 
-        save_data(output_filename, resampleToImage1)
-        os.remove(output_filename_tmp)
+        partial_filename = get_partial_filename(lod_filename)
+        save_data(partial_filename, resampleToImage1, **vdbOptions)
+        os.replace(partial_filename, lod_filename)
+
+    resampleToImage1.SamplingDimensions = samplingDimensions
+
+
+def get_brick_filename(brick_folder, index):
+    return os.path.join(brick_folder, "brick_{:04}.npz".format(index))
+
+
+def export_brick(resampleToImage1, time, brick_folder, index, extent, bounds, spacing, pointArrays=None):
+    """
+    Resample one brick of the grid and save its point arrays to a .npz file in `brick_folder`
+
+    :param extent: (first, last) point index of the brick in x, y and z
+    :param bounds: bounds of the whole grid
+    :param spacing: distance between points of the whole grid
+    :param pointArrays: names of the arrays to keep (with the valid point mask), all of them if None
+    """
+    brick_filename = get_brick_filename(brick_folder, index)
+    if os.path.isfile(brick_filename):
+        return
+    print("  - Export brick {} of time {}".format(index, time))
+
+    resampleToImage1.SamplingBounds = [bounds[2*axis] + extent[axis][i]*spacing[axis] for axis in range(3) for i in range(2)]
+    resampleToImage1.SamplingDimensions = [last - first + 1 for first, last in extent]
+    UpdatePipeline(time=time, proxy=resampleToImage1)
+
+    point_data = servermanager.Fetch(resampleToImage1).GetPointData()
+    arrays = {}
+    for i in range(point_data.GetNumberOfArrays()):
+        array = point_data.GetArray(i)
+        if array is None or array.GetName() == "vtkGhostType":
+            continue
+        if pointArrays is None or array.GetName() in pointArrays or array.GetName() == "vtkValidPointMask":
+            arrays[array.GetName()] = vtk_to_numpy(array)
+
+    Path(brick_folder).mkdir(parents=True, exist_ok=True)
+    partial_filename = get_partial_filename(brick_filename)
+    with open(partial_filename, "wb") as brick_file:
+        np.savez(brick_file, **arrays)
+    os.replace(partial_filename, brick_filename)
 
-def save_data(output_name, resampleToImage1):
+
+def merge_bricks(output_filename, brick_folder, brick_list, dimensions, bounds, spacing, vdbOptions):
+    """
+    Assemble the bricks of a timestep into a single grid, save it and remove the bricks.
+    .vdb files are written brick by brick into sparse openvdb grids, other formats (or without the
+    openvdb module) need the whole dense grid in memory.
+    """
+    if output_filename.endswith(".vdb") and USE_OPENVDB:
+        if merge_sparse_bricks(output_filename, brick_folder, brick_list, spacing, bounds, **vdbOptions):
+            remove_bricks(brick_folder, brick_list)
+        return
+
+    grid = vtkImageData()
+    grid.SetDimensions(dimensions)
+    grid.SetOrigin(bounds[0], bounds[2], bounds[4])
+    grid.SetSpacing(spacing)
+
+    arrays = {}
+    for index, extent in enumerate(brick_list):
+        try:
+            brick = np.load(get_brick_filename(brick_folder, index))
+        except FileNotFoundError:
+            # Merged by another process in the meantime
+            if os.path.isfile(output_filename):
+                return
+            raise
+        shape = [last - first + 1 for first, last in reversed(extent)]
+        for name in brick.files:
+            values = brick[name]
+            if name not in arrays:
+                arrays[name] = np.zeros(list(reversed(dimensions)) + list(values.shape[1:]), dtype=values.dtype)
+            (x0, x1), (y0, y1), (z0, z1) = extent
+            arrays[name][z0:z1 + 1, y0:y1 + 1, x0:x1 + 1] = values.reshape(shape + list(values.shape[1:]))
+
+    for name, values in arrays.items():
+        array = numpy_to_vtk(values.reshape(math.prod(dimensions), -1) if values.ndim > 3 else values.ravel())
+        array.SetName(name)
+        grid.GetPointData().AddArray(array)
+
+    producer = PVTrivialProducer()
+    producer.GetClientSideObject().SetOutput(grid)
+    partial_filename = get_partial_filename(output_filename)
+    save_data(partial_filename, producer, **vdbOptions)
+    os.replace(partial_filename, output_filename)
+    Delete(producer)
+    remove_bricks(brick_folder, brick_list)
+
+
+def merge_sparse_bricks(output_filename, brick_folder, brick_list, spacing, bounds, pointArrays=None, cellArrays=None,
+                        background=0.0, tolerance=None, halfArrays=None):
+    """
+    Copy the bricks of a timestep one after the other into sparse openvdb grids and save them, only
+    one brick is in memory at a time. Returns False if the bricks were merged by another process.
+    """
+    tolerance = tolerance or 0.0
+    transform = get_vdb_transform(spacing, bounds[::2])
+    grids = {}
+    for index, extent in enumerate(brick_list):
+        try:
+            brick = np.load(get_brick_filename(brick_folder, index))
+        except FileNotFoundError:
+            # Merged by another process in the meantime
+            if os.path.isfile(output_filename):
+                return False
+            raise
+        dimensions = [last - first + 1 for first, last in extent]
+        valid = brick["vtkValidPointMask"].astype(bool) if "vtkValidPointMask" in brick.files else None
+        for name in brick.files:
+            if name in ("vtkValidPointMask", "vtkGhostType"):
+                continue
+            values = get_vdb_values(brick[name], dimensions, valid, background)
+            if name not in grids:
+                grids[name] = create_vdb_grid(name, values, background, transform, halfArrays or [])
+            if grids[name] is not None:
+                grids[name].copyFromArray(values, ijk=tuple(first for first, _ in extent), tolerance=tolerance)
+        brick.close()
+
+    grids = [grid for grid in grids.values() if grid is not None]
+    for grid in grids:
+        grid.prune(tolerance)
+    partial_filename = get_partial_filename(output_filename)
+    vdb.write(partial_filename, grids=grids)
+    os.replace(partial_filename, output_filename)
+    return True
+
+
+def remove_bricks(brick_folder, brick_list):
+    for index in range(len(brick_list)):
+        try:
+            os.remove(get_brick_filename(brick_folder, index))
+        except FileNotFoundError:
+            pass
+    try:
+        os.rmdir(brick_folder)
+    except OSError:
+        pass
+
+def save_data(output_name, resampleToImage1, pointArrays=None, cellArrays=None, background=0.0, tolerance=None, halfArrays=None):
     """
     save_data saves the output of the resampleToImage1 filter to a file.
 
     :param output_name: path for the output file
     :param resampleToImage1: paraview filter object
+    :param pointArrays: names of the point arrays to write, all of them if None
+    :param cellArrays: names of the cell arrays to write, all of them if None
+    :param background: value of the voxels outside of the data
+    :param tolerance: if set, voxels within `tolerance` of `background` are left inactive and only
+        the active voxels and tiles are written (requires the openvdb python module)
+    :param halfArrays: names of the arrays stored as half floats ('all' for every array, requires openvdb)
     """
-    array_vals = resampleToImage1.PointData.keys()
-    cell_vals = resampleToImage1.CellData.keys() 
+    array_vals = resampleToImage1.PointData.keys() if pointArrays is None else pointArrays
+    cell_vals = resampleToImage1.CellData.keys() if cellArrays is None else cellArrays
+    if output_name.endswith(".vdb") and (tolerance is not None or halfArrays):
+        save_sparse_vdb(output_name, servermanager.Fetch(resampleToImage1), array_vals, background, tolerance or 0.0, halfArrays or [])
+        return
     SaveData(output_name, proxy=resampleToImage1,
              LookupTable=None, 
              PointDataArrays=array_vals,
              CellDataArrays=cell_vals
              ) 
 
+
+def save_sparse_vdb(output_name, image, arrays, background, tolerance, halfArrays):
+    """
+    save_sparse_vdb writes the point arrays of an image as sparse openvdb grids: points outside
+    of the data or within `tolerance` of `background` are inactive, uniform regions are pruned into tiles.
+
+    :param output_name: path for the output .vdb file
+    :param image: vtkImageData to write
+    :param arrays: names of the point arrays to write, scalar arrays become float grids and 3 components arrays vector grids
+    :param halfArrays: names of the arrays stored as half floats, 'all' for every array
+    """
+    if not USE_OPENVDB:
+        raise Exception('openvdb python module not available, sparse vdb output unavailable')
+
+    dimensions = image.GetDimensions()
+    transform = get_vdb_transform(image.GetSpacing(), image.GetOrigin())
+
+    point_data = image.GetPointData()
+    mask = point_data.GetArray("vtkValidPointMask")
+    valid = vtk_to_numpy(mask).astype(bool) if mask is not None else None
+
+    grids = []
+    active_voxels = 0
+    for name in arrays:
+        array = point_data.GetArray(name)
+        if array is None or name in ("vtkValidPointMask", "vtkGhostType"):
+            continue
+
+        values = get_vdb_values(vtk_to_numpy(array), dimensions, valid, background)
+        grid = create_vdb_grid(name, values, background, transform, halfArrays)
+        if grid is None:
+            continue
+
+        grid.copyFromArray(values, tolerance=tolerance)
+        grid.prune(tolerance)
+        active_voxels += grid.activeVoxelCount()
+        grids.append(grid)
+
+    vdb.write(output_name, grids=grids)
+    if grids:
+        print("      {:.1f}% active voxels".format(100*active_voxels/(len(grids)*math.prod(dimensions))))
+
+
+def get_vdb_transform(spacing, origin):
+    return vdb.createLinearTransform([[spacing[0], 0, 0, 0], [0, spacing[1], 0, 0],
+                                      [0, 0, spacing[2], 0], [origin[0], origin[1], origin[2], 1]])
+
+
+def get_vdb_values(values, dimensions, valid, background):
+    """
+    Point values of a grid of `dimensions` points in VTK order (x first), as a contiguous float32
+    array indexed [x, y, z] (with a last axis for vectors) as expected by openvdb
+
+    :param valid: boolean mask of the points inside the data, the others are set to `background`
+    """
+    components = values.shape[1] if values.ndim > 1 else 1
+    values = values.astype(np.float32).reshape(math.prod(dimensions), components)
+    if valid is not None:
+        values[~valid] = background
+    values = values.reshape(list(reversed(dimensions)) + [components]).transpose(2, 1, 0, 3)
+    return np.ascontiguousarray(values[..., 0] if components == 1 else values)
+
+
+def create_vdb_grid(name, values, background, transform, halfArrays):
+    """Empty openvdb grid for the values returned by `get_vdb_values`, None for unsupported arrays"""
+    if values.ndim == 3:
+        grid = vdb.FloatGrid(background)
+    elif values.shape[-1] == 3:
+        grid = vdb.Vec3SGrid((background,)*3)
+    else:
+        print("      Skipping array {} with {} components".format(name, values.shape[-1]))
+        return None
+    grid.name = name
+    grid.transform = transform
+    grid.saveFloatAsHalf = name in halfArrays or "all" in halfArrays
+    return grid
+
 if __name__ == '__main__':
 
     parser = argparse.ArgumentParser()
@@ -123,8 +468,20 @@ if __name__ == '__main__':
     parser.add_argument("--sampling-bounds", help="Bounds of the box to export, comma separated list of values xmin,xmax,ymin...")
     parser.add_argument("--sampling-dims", help="Number of cells in x, y and z")
     parser.add_argument("--cell-size", help="Size of each cell (to use instead of --sampling-dims)")
+    parser.add_argument("--bricks", help="Number of bricks in x, y and z the grid is resampled in (e.g. 2,2,1), merged into one grid")
+    parser.add_argument("--max-memory", type=float, help="Memory budget per process in MB, splits the grid in bricks if needed")
+    parser.add_argument("--lods", type=int, default=0, help="Number of reduced resolution levels (half the resolution each) written next to each file")
+    parser.add_argument("--point-arrays", help="Comma separated list of point arrays to write, all of them by default")
+    parser.add_argument("--cell-arrays", help="Comma separated list of cell arrays to write, all of them by default")
+    parser.add_argument("--background", type=float, default=0.0, help="Value of empty space")
+    parser.add_argument("--threshold", type=float, help="Drop voxels within this distance of --background and write sparse grids (requires openvdb)")
+    parser.add_argument("--half-float", help="Comma separated list of arrays stored as half floats, 'all' for every array (requires openvdb)")
+    add_arguments(parser)
     args = parser.parse_args()
 
+    if args.workers > 1:
+        sys.exit(launch_workers(args.workers))
+
     samplingDimensions = None
     samplingBounds = None
     cellSize = None
@@ -137,7 +494,26 @@ if __name__ == '__main__':
     if args.cell_size:
         cellSize = float(args.cell_size)
 
+    bricks = None
+    if args.bricks:
+        bricks = [ int(x) for x in args.bricks.split(',') ]
+
+    vdbOptions = {"background": args.background, "tolerance": args.threshold}
+    if args.point_arrays is not None:
+        vdbOptions["pointArrays"] = [ x for x in args.point_arrays.split(',') if x ]
+    if args.cell_arrays is not None:
+        vdbOptions["cellArrays"] = [ x for x in args.cell_arrays.split(',') if x ]
+    if args.half_float:
+        vdbOptions["halfArrays"] = args.half_float.split(',')
+
+    rank, nranks = get_rank(args)
+
     # create export directory if it doesn't exist
     Path(args.export_path).mkdir(parents=True, exist_ok=True) 
 
-    update_file(args.data_path, args.export_path, samplingBounds, samplingDimensions, cellSize)
+    update_file(args.data_path, args.export_path, samplingBounds, samplingDimensions, cellSize,
+                rank=rank, nranks=nranks, bricks=bricks, maxMemory=args.max_memory, vdbOptions=vdbOptions, lods=args.lods,
+                timing=get_timing_log(args.timing_log, "export_vdb"))
+    peak_memory = get_peak_memory()
+    if peak_memory is not None:
+        print("Peak memory {:.0f} MB".format(peak_memory))
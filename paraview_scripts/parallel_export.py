@@ -0,0 +1,135 @@
+"""
+Helpers shared by the export scripts, mainly to export timesteps from several processes.
+
+Each process loads the data once and exports its own, disjoint, set of timesteps. Processes
+are either started by an MPI launcher (mpirun/srun, their rank is read from the environment),
+given explicitly with --rank/--nranks or started locally with --workers.
+A timestep is only considered done once its completion marker is written, after all its files.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+# The timing log and memory helpers are shared with the SequenceDataLoader addon, in the folder next to this one
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+try:
+    from SequenceDataLoader.timing_log import NullTimingLog, TimingLog, get_memory, get_peak_memory
+except ModuleNotFoundError:
+    raise Exception('SequenceDataLoader folder not found next to the export scripts')
+
+# Environment variables holding the rank and number of ranks for common MPI launchers
+RANK_VARIABLES = (
+    ("OMPI_COMM_WORLD_RANK", "OMPI_COMM_WORLD_SIZE"),
+    ("PMI_RANK", "PMI_SIZE"),
+    ("PMIX_RANK", "PMIX_SIZE"),
+    ("SLURM_PROCID", "SLURM_NTASKS"),
+)
+
+
+def add_arguments(parser):
+    parser.add_argument("--rank", type=int, help="Index of this process, detected from MPI launchers if not set")
+    parser.add_argument("--nranks", type=int, help="Number of processes sharing the export")
+    parser.add_argument("--workers", type=int, default=1, help="Number of local processes to start, each exporting a part of the timesteps")
+    parser.add_argument("--timing-log", help="JSON lines file (or folder) where the time spent in each stage of every timestep is written, "
+                                             "{host} and {pid} are replaced by the hostname and PID of the process")
+
+
+def get_rank(args):
+    """Returns (rank, number of ranks) from the arguments or the MPI environment, (0, 1) otherwise"""
+    if args.rank is not None or args.nranks is not None:
+        rank, nranks = args.rank or 0, args.nranks or 1
+    elif get_partition_count() > 1:
+        # pvbatch over MPI already distributes the data of each timestep between its ranks,
+        # its readers and writers are collective so ranks can't export different timesteps
+        print("Running in parallel pvbatch on {} ranks, timesteps are exported one at a time".format(get_partition_count()))
+        rank, nranks = 0, 1
+    else:
+        rank, nranks = 0, 1
+        for rank_variable, size_variable in RANK_VARIABLES:
+            if rank_variable in os.environ and size_variable in os.environ:
+                rank, nranks = int(os.environ[rank_variable]), int(os.environ[size_variable])
+                break
+
+    if not 0 <= rank < nranks:
+        raise Exception("Invalid rank {} for {} ranks".format(rank, nranks))
+    return rank, nranks
+
+
+def get_partition_count():
+    """Number of ranks of the ParaView session, 1 unless running under pvbatch with MPI"""
+    try:
+        from paraview import servermanager
+        return servermanager.vtkProcessModule.GetProcessModule().GetNumberOfLocalPartitions()
+    except Exception:
+        return 1
+
+
+def split_steps(steps, rank, nranks):
+    """
+    Timesteps exported by `rank`. Every `nranks`-th timestep is taken so that expensive
+    parts of the simulation (e.g. late timesteps with more cells) are spread over all ranks.
+    """
+    return steps[rank::nranks]
+
+
+def launch_workers(workers):
+    """
+    Run the current script in `workers` local processes, each with its own --rank.
+    Returns the highest exit code of the processes.
+    """
+    argv = []
+    skip = False
+    for argument in sys.argv[1:]:
+        if skip:
+            skip = False
+        elif argument in ("--workers", "--rank", "--nranks"):
+            skip = True
+        elif not argument.startswith(("--workers=", "--rank=", "--nranks=")):
+            argv.append(argument)
+
+    processes = [subprocess.Popen([sys.executable, sys.argv[0]] + argv + ["--rank", str(rank), "--nranks", str(workers)])
+                 for rank in range(workers)]
+    return max(process.wait() for process in processes)
+
+
+def is_done(marker_path):
+    return os.path.isfile(marker_path)
+
+
+def mark_done(marker_path, **info):
+    """Atomically write the completion marker of a timestep, holding `info` and who exported it"""
+    marker = {"hostname": socket.gethostname(), "pid": os.getpid(), "finished": time.time()}
+    marker.update(info)
+    tmp_path = "{}.{}.tmp".format(marker_path, os.getpid())
+    with open(tmp_path, "w") as marker_file:
+        json.dump(marker, marker_file, indent=1)
+    os.replace(tmp_path, marker_path)
+
+
+def get_partial_filename(filename):
+    """
+    Temporary name a file is written under before being renamed, hidden from the sequence scan
+    and unique to the process so that processes writing the same file don't mix their output
+    """
+    folder, name = os.path.split(filename)
+    stem, extension = os.path.splitext(name)
+    return os.path.join(folder, ".{}.{}.part{}".format(stem, os.getpid(), extension))
+
+
+def get_lod_filename(filename, level):
+    """Path of the reduced resolution level `level` of a file (e.g. surface.ply -> surface.lod1.ply)"""
+    stem, extension = os.path.splitext(filename)
+    return "{}.lod{}{}".format(stem, level, extension)
+
+
+def get_timing_log(path, source):
+    """
+    TimingLog of the SequenceDataLoader addon writing to `path`, so exports and renders share the
+    same log format. Returns a log doing nothing if `path` is empty.
+    """
+    if not path:
+        return NullTimingLog()
+    return TimingLog(path, source)
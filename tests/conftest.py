@@ -0,0 +1,32 @@
+"""
+The modules tested here must not depend on bpy: they are used by the addon and by the scripts
+running outside of Blender, and the package imports without it.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SequenceDataLoader.ply_reader import PlyMesh
+
+
+@pytest.fixture
+def make_mesh():
+    """PlyMesh of a triangulated grid with colors and a scalar attribute, `offset` moves the vertices"""
+    def make_mesh(offset=0.0, side=4):
+        index = np.arange(side*side)
+        mesh = PlyMesh()
+        mesh.vertices = np.column_stack((index % side, index // side, np.full(len(index), offset))).astype(np.float32)
+        mesh.normals = np.tile(np.array([0, 0, 1], dtype=np.float32), (len(index), 1))
+        mesh.colors = np.linspace(0, 1, len(index)*4, dtype=np.float32).reshape(-1, 4)
+        corners = np.array([i*side + j for i in range(side - 1) for j in range(side - 1)])
+        mesh.face_indices = np.stack((corners, corners + 1, corners + side + 1, corners, corners + side + 1, corners + side),
+                                     axis=1).reshape(-1).astype(np.int32)
+        mesh.face_sizes = np.full(len(mesh.face_indices)//3, 3, dtype=np.int32)
+        mesh.attributes["pressure"] = (index*0.5 + offset).astype(np.float32)
+        mesh.face_attributes["quality"] = np.arange(mesh.face_count, dtype=np.float32)
+        return mesh
+    return make_mesh
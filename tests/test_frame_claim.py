@@ -0,0 +1,103 @@
+import json
+import os
+import socket
+import threading
+import time
+
+from SequenceDataLoader.frame_claim import FrameClaim
+
+
+def write_lease(claim, token="other", heartbeat=None, hostname="elsewhere", pid=1):
+    with open(claim.lease_path, "w") as lease_file:
+        json.dump({"token": token, "hostname": hostname, "pid": pid,
+                   "heartbeat": time.time() if heartbeat is None else heartbeat}, lease_file)
+
+
+def test_acquire_publish_release(tmp_path):
+    path = str(tmp_path / "frame_0001.png")
+    claim = FrameClaim(path, heartbeat=0.05)
+
+    assert claim.acquire()
+    assert claim.owns_lease()
+    assert not FrameClaim(path).acquire()
+
+    with open(claim.partial_path, "w") as partial_file:
+        partial_file.write("image")
+    claim.publish()
+    claim.release()
+
+    assert os.path.isfile(path)
+    assert not os.path.exists(claim.lease_path)
+    assert not FrameClaim(path).acquire()
+
+
+def test_heartbeat_refreshes_the_lease(tmp_path):
+    claim = FrameClaim(str(tmp_path / "frame.png"), heartbeat=0.02)
+    assert claim.acquire()
+    first = claim.read_lease()["heartbeat"]
+    time.sleep(0.1)
+    assert claim.read_lease()["heartbeat"] > first
+    claim.release()
+
+
+def test_live_lease_is_not_reclaimed(tmp_path):
+    path = str(tmp_path / "frame.png")
+    write_lease(FrameClaim(path))
+    assert not FrameClaim(path, timeout=60).acquire()
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    path = str(tmp_path / "frame.png")
+    write_lease(FrameClaim(path), heartbeat=time.time() - 120)
+
+    claim = FrameClaim(path, timeout=60)
+    assert claim.acquire()
+    assert claim.owns_lease()
+    claim.release()
+
+
+def test_lease_of_a_dead_process_is_reclaimed(tmp_path):
+    path = str(tmp_path / "frame.png")
+    # Highest PID on Linux, not running
+    write_lease(FrameClaim(path), hostname=socket.gethostname(), pid=4194304)
+
+    claim = FrameClaim(path, timeout=60)
+    assert claim.acquire()
+    claim.release()
+
+
+def test_lease_refreshed_by_its_owner_is_put_back(tmp_path):
+    """The owner refreshes its lease between the expiry check and the rename of reclaim()"""
+    path = str(tmp_path / "frame.png")
+    claim = FrameClaim(path, timeout=60)
+    write_lease(claim, token="owner", heartbeat=time.time() - 120)
+    expired = claim.read_lease()
+    write_lease(claim, token="owner")
+
+    assert not claim.reclaim(expired)
+    assert claim.read_lease()["token"] == "owner"
+    assert not [name for name in os.listdir(str(tmp_path)) if ".stale." in name]
+
+
+def test_concurrent_reclaim_has_a_single_winner(tmp_path):
+    path = str(tmp_path / "frame.png")
+    write_lease(FrameClaim(path), heartbeat=time.time() - 120)
+
+    claims = [FrameClaim(path, timeout=60, heartbeat=60) for _ in range(8)]
+    results = [None]*len(claims)
+    start = threading.Barrier(len(claims))
+
+    def acquire(index):
+        start.wait()
+        results[index] = claims[index].acquire()
+
+    threads = [threading.Thread(target=acquire, args=(index,)) for index in range(len(claims))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 1
+    winner = claims[results.index(True)]
+    assert winner.owns_lease()
+    winner.release()
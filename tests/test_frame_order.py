@@ -0,0 +1,64 @@
+import pytest
+
+from SequenceDataLoader.frame_order import ORDERS, frame_blocks, order_frames, parse_shard
+
+FRAMES = range(1, 24)
+
+
+def time_of(frame):
+    return frame//4
+
+
+@pytest.mark.parametrize("order", ["linear", "strided"])
+@pytest.mark.parametrize("shard_count", [1, 2, 3, 5, 30])
+def test_shards_cover_the_frames_once(order, shard_count):
+    rendered = []
+    for shard in range(shard_count):
+        rendered += order_frames(FRAMES, order, shard, shard_count)
+    assert sorted(rendered) == list(FRAMES)
+
+
+def test_linear_shards_are_contiguous():
+    shards = [order_frames(FRAMES, "linear", shard, 3) for shard in range(3)]
+    assert [frame for shard in shards for frame in shard] == list(FRAMES)
+    assert [len(shard) for shard in shards] in ([8, 8, 7], [8, 7, 8], [7, 8, 8])
+
+
+@pytest.mark.parametrize("shard_count", [1, 2, 3, 5, 30])
+def test_blocked_shards_own_whole_timesteps(shard_count):
+    owned = []
+    for shard in range(shard_count):
+        frames = order_frames(FRAMES, "blocked", shard, shard_count, time_of)
+        # Every shard ends up walking all frames, stealing the others' blocks after its own
+        assert sorted(frames) == list(FRAMES)
+        # Blocks of a timestep are never split between shards or reordered
+        blocks = frame_blocks(frames, time_of)
+        assert len(blocks) == len(set(time_of(frame) for frame in FRAMES))
+        assert all(block == sorted(block) for block in blocks)
+        owned.append(blocks)
+
+    # The first blocks of each shard are distinct, the shards start on different timesteps
+    if shard_count <= 6:
+        first_times = [time_of(blocks[0][0]) for blocks in owned]
+        assert len(set(first_times)) == shard_count
+
+
+def test_blocked_steals_from_the_end_of_the_next_shard():
+    frames = order_frames(range(8), "blocked", 0, 2, lambda frame: frame//2)
+    assert frames == [0, 1, 2, 3, 6, 7, 4, 5]
+
+
+def test_invalid_order_and_shard():
+    with pytest.raises(Exception):
+        order_frames(FRAMES, "random")
+    with pytest.raises(Exception):
+        order_frames(FRAMES, "linear", 2, 2)
+    assert ORDERS == ("linear", "strided", "blocked")
+
+
+def test_parse_shard():
+    assert parse_shard("0/1") == (0, 1)
+    assert parse_shard("3/4") == (3, 4)
+    for shard in ("4/4", "-1/2", "1", "a/b"):
+        with pytest.raises(Exception):
+            parse_shard(shard)
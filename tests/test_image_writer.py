@@ -0,0 +1,119 @@
+import struct
+import threading
+import zlib
+
+import numpy as np
+import pytest
+
+from SequenceDataLoader.image_writer import EXR_MAGIC, PNG_SIGNATURE, ImageWriter, read_exr, recompress_png
+
+
+def png_chunk(chunk_type, data):
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def write_png(path, pixels, level=0):
+    """Write an 8-bit RGB png with filter type 0 on every scanline"""
+    height, width, _ = pixels.shape
+    scanlines = b"".join(b"\0" + pixels[y].tobytes() for y in range(height))
+    with open(path, "wb") as png_file:
+        png_file.write(PNG_SIGNATURE)
+        png_file.write(png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        png_file.write(png_chunk(b"tEXt", b"Comment\0test"))
+        png_file.write(png_chunk(b"IDAT", zlib.compress(scanlines, level)))
+        png_file.write(png_chunk(b"IEND", b""))
+    return scanlines
+
+
+def read_png_chunks(path):
+    with open(path, "rb") as png_file:
+        data = png_file.read()
+    assert data.startswith(PNG_SIGNATURE)
+    chunks = []
+    offset = len(PNG_SIGNATURE)
+    while offset < len(data):
+        length, chunk_type = struct.unpack_from(">I4s", data, offset)
+        chunk = data[offset + 8:offset + 8 + length]
+        assert struct.unpack_from(">I", data, offset + 8 + length)[0] == zlib.crc32(chunk_type + chunk)
+        chunks.append((chunk_type, chunk))
+        offset += length + 12
+    return chunks
+
+
+def exr_attribute(name, attribute_type, data):
+    return name.encode() + b"\0" + attribute_type.encode() + b"\0" + struct.pack("<i", len(data)) + data
+
+
+def write_exr(path, channels):
+    """Write an uncompressed scanline OpenEXR file from {name: (height, width) float32 array}"""
+    names = sorted(channels)
+    height, width = channels[names[0]].shape
+    channel_list = b"".join(name.encode() + b"\0" + struct.pack("<iBxxxii", 2, 0, 1, 1) for name in names) + b"\0"
+    window = struct.pack("<iiii", 0, 0, width - 1, height - 1)
+    header = (exr_attribute("channels", "chlist", channel_list) + exr_attribute("compression", "compression", b"\0") +
+              exr_attribute("dataWindow", "box2i", window) + exr_attribute("displayWindow", "box2i", window) +
+              exr_attribute("lineOrder", "lineOrder", b"\0") + b"\0")
+    start = 8 + len(header) + 8*height
+    line_size = 8 + 4*width*len(names)
+    with open(path, "wb") as exr_file:
+        exr_file.write(struct.pack("<ii", EXR_MAGIC, 2) + header)
+        exr_file.write(np.arange(start, start + line_size*height, line_size, dtype="<u8").tobytes())
+        for y in range(height):
+            exr_file.write(struct.pack("<ii", y, line_size - 8))
+            for name in names:
+                exr_file.write(channels[name][y].astype("<f4").tobytes())
+
+
+def test_jobs_run_in_order_on_the_writer_thread():
+    writer = ImageWriter(queue_size=1)
+    done = []
+    threads = set()
+
+    def job(index):
+        def run():
+            threads.add(threading.current_thread().name)
+            done.append(index)
+        return run
+
+    for index in range(5):
+        writer.submit(job(index))
+    writer.submit(lambda: 1/0)
+    writer.submit(job(5))
+    writer.wait()
+
+    assert done == list(range(6))
+    assert threads == {"sequence_image_writer"}
+
+
+def test_recompress_png_keeps_the_pixels(tmp_path):
+    pixels = np.random.default_rng(0).integers(0, 4, (16, 12, 3), dtype=np.uint8)
+    source, destination = str(tmp_path / "source.png"), str(tmp_path / "destination.png")
+    scanlines = write_png(source, pixels)
+
+    recompress_png(source, destination, level=9)
+
+    chunks = read_png_chunks(destination)
+    assert [chunk_type for chunk_type, _ in chunks] == [b"IHDR", b"tEXt", b"IDAT", b"IEND"]
+    assert zlib.decompress(chunks[2][1]) == scanlines
+    assert len(chunks[2][1]) < len(read_png_chunks(source)[2][1])
+
+
+def test_recompress_png_rejects_other_files(tmp_path):
+    path = str(tmp_path / "image.png")
+    with open(path, "wb") as image_file:
+        image_file.write(b"GIF89a")
+    with pytest.raises(Exception):
+        recompress_png(path, str(tmp_path / "out.png"))
+
+
+def test_read_exr(tmp_path):
+    rng = np.random.default_rng(0)
+    channels = {name: rng.random((5, 7), dtype=np.float32) for name in "RGBA"}
+    path = str(tmp_path / "frame.exr")
+    write_exr(path, channels)
+
+    pixels = read_exr(path)
+
+    assert pixels.shape == (5, 7, 4)
+    for index, name in enumerate("RGBA"):
+        np.testing.assert_array_equal(pixels[..., index], channels[name])
@@ -0,0 +1,82 @@
+import json
+import os
+
+from SequenceDataLoader.job_spool import JobSpool, read_job
+
+
+def submit(spool, name, content, age=0):
+    """Write a job the way submitters should: under a temporary name, then renamed"""
+    path = os.path.join(spool.path, name)
+    with open(path + ".tmp", "w") as job_file:
+        job_file.write(content if isinstance(content, str) else json.dumps(content))
+    os.replace(path + ".tmp", path)
+    if age:
+        mtime = os.stat(path).st_mtime - age
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def read_status(spool, name):
+    with open(os.path.join(spool.path, "status", os.path.splitext(name)[0] + ".json")) as status_file:
+        return json.load(status_file)
+
+
+def test_jobs_are_claimed_oldest_first(tmp_path):
+    spool = JobSpool(str(tmp_path))
+    submit(spool, "second.json", {"frames": "2"}, age=10)
+    submit(spool, "first.json", {"frames": "1"}, age=20)
+    submit(spool, "first.json.tmp", "{")
+
+    job = spool.next_job()
+
+    assert job.name == "first.json"
+    assert job.content == {"frames": "1"}
+    assert job.path == os.path.join(str(tmp_path), "running", "first.json")
+    assert read_status(spool, "first.json")["state"] == "running"
+    assert spool.next_job().name == "second.json"
+    assert spool.next_job() is None
+
+
+def test_finish_moves_the_job(tmp_path):
+    spool = JobSpool(str(tmp_path))
+    submit(spool, "job.json", {})
+    job = spool.next_job()
+
+    spool.finish(job, "done", frames=3)
+
+    assert os.path.isfile(os.path.join(str(tmp_path), "done", "job.json"))
+    assert not os.listdir(os.path.join(str(tmp_path), "running"))
+    status = read_status(spool, "job.json")
+    assert status["state"] == "done" and status["frames"] == 3
+
+
+def test_unreadable_job_is_left_during_the_grace_period(tmp_path):
+    spool = JobSpool(str(tmp_path), grace=60)
+    submit(spool, "partial.json", '{"frames": ')
+
+    assert spool.next_job() is None
+    assert os.path.isfile(os.path.join(str(tmp_path), "partial.json"))
+
+
+def test_unreadable_job_fails_after_the_grace_period(tmp_path):
+    spool = JobSpool(str(tmp_path), grace=60)
+    submit(spool, "broken.json", '{"frames": ', age=120)
+    submit(spool, "valid.json", {}, age=10)
+
+    assert spool.next_job().name == "valid.json"
+    assert os.path.isfile(os.path.join(str(tmp_path), "failed", "broken.json"))
+    assert read_status(spool, "broken.json")["state"] == "failed"
+
+
+def test_stop_file(tmp_path):
+    spool = JobSpool(str(tmp_path))
+    assert not spool.stop_requested()
+    open(os.path.join(str(tmp_path), "STOP"), "w").close()
+    assert spool.stop_requested()
+
+
+def test_empty_json_job(tmp_path):
+    path = str(tmp_path / "job.json")
+    with open(path, "w") as job_file:
+        job_file.write("null")
+    assert read_job(path) == {}
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+
+from SequenceDataLoader.ply_reader import interpolate_mesh, read_ply
+
+TRIANGLE_AND_QUAD = [[0, 1, 2], [1, 2, 3, 4]]
+
+
+def write_ply(path, vertex_properties, vertices, faces, format="binary_little_endian", count_type="uchar",
+              face_scalars=None):
+    """
+    Write a .ply file with float vertex properties and faces of any size
+
+    :param face_scalars: float value written after the indices of each face, as a `quality` property
+    """
+    header = ["ply", "format {} 1.0".format(format), "element vertex {}".format(len(vertices))]
+    header += ["property float {}".format(name) for name in vertex_properties]
+    header += ["element face {}".format(len(faces)), "property list {} int vertex_indices".format(count_type)]
+    if face_scalars is not None:
+        header.append("property float quality")
+    header.append("end_header")
+
+    byte_order = ">" if format == "binary_big_endian" else "<"
+    count_dtype = {"uchar": "u1", "ushort": "u2", "int": "i4"}[count_type]
+    with open(path, "wb") as ply_file:
+        ply_file.write(("\n".join(header) + "\n").encode("ascii"))
+        if format == "ascii":
+            for vertex in vertices:
+                ply_file.write((" ".join(str(value) for value in vertex) + "\n").encode("ascii"))
+            for i, face in enumerate(faces):
+                values = [len(face)] + list(face) + ([face_scalars[i]] if face_scalars is not None else [])
+                ply_file.write((" ".join(str(value) for value in values) + "\n").encode("ascii"))
+            return
+        ply_file.write(np.asarray(vertices, dtype=byte_order + "f4").tobytes())
+        for i, face in enumerate(faces):
+            ply_file.write(np.array([len(face)], dtype=byte_order + count_dtype).tobytes())
+            ply_file.write(np.array(face, dtype=byte_order + "i4").tobytes())
+            if face_scalars is not None:
+                ply_file.write(np.array([face_scalars[i]], dtype=byte_order + "f4").tobytes())
+
+
+def grid_vertices(count, columns=3):
+    return np.arange(count*columns, dtype=np.float32).reshape(count, columns)
+
+
+def test_properties_named_like_coordinates_are_kept(tmp_path):
+    path = str(tmp_path / "names.ply")
+    write_ply(path, ["x", "y", "z", "xy", "yz", "xyz"], grid_vertices(5, 6), TRIANGLE_AND_QUAD)
+
+    mesh = read_ply(path)
+
+    assert sorted(mesh.attributes) == ["xy", "xyz", "yz"]
+    np.testing.assert_array_equal(mesh.attributes["yz"], grid_vertices(5, 6)[:, 4])
+    np.testing.assert_array_equal(mesh.vertices, grid_vertices(5, 6)[:, :3])
+
+
+@pytest.mark.parametrize("format", ["binary_little_endian", "binary_big_endian", "ascii"])
+@pytest.mark.parametrize("count_type", ["uchar", "ushort"])
+def test_mixed_face_sizes(tmp_path, format, count_type):
+    path = str(tmp_path / "mixed.ply")
+    faces = TRIANGLE_AND_QUAD*50 + [[0, 1, 2]]*3
+    write_ply(path, "xyz", grid_vertices(5), faces, format, count_type, face_scalars=list(range(len(faces))))
+
+    mesh = read_ply(path)
+
+    np.testing.assert_array_equal(mesh.face_sizes, [len(face) for face in faces])
+    np.testing.assert_array_equal(mesh.face_indices, [index for face in faces for index in face])
+    np.testing.assert_array_equal(mesh.loop_starts, np.cumsum([0] + [len(face) for face in faces[:-1]]))
+    np.testing.assert_array_equal(mesh.face_attributes["quality"], np.arange(len(faces)))
+    assert mesh.face_indices.dtype == np.int32
+
+
+@pytest.mark.parametrize("format", ["binary_little_endian", "binary_big_endian", "ascii"])
+def test_uniform_faces(tmp_path, format):
+    path = str(tmp_path / "quads.ply")
+    write_ply(path, "xyz", grid_vertices(5), [[1, 2, 3, 4]]*4, format)
+
+    mesh = read_ply(path)
+
+    assert mesh.face_count == 4
+    np.testing.assert_array_equal(mesh.face_sizes, [4]*4)
+    np.testing.assert_array_equal(mesh.face_indices, [1, 2, 3, 4]*4)
+    np.testing.assert_array_equal(mesh.vertices, grid_vertices(5))
+
+
+def test_vertices_without_faces(tmp_path):
+    path = str(tmp_path / "points.ply")
+    write_ply(path, "xyz", grid_vertices(3), [])
+
+    mesh = read_ply(path)
+
+    assert mesh.vertex_count == 3
+    assert mesh.face_count == 0
+    assert len(mesh.face_indices) == 0
+
+
+def test_colors_normals_and_uvs(tmp_path):
+    path = str(tmp_path / "colors.ply")
+    header = ["ply", "format binary_little_endian 1.0", "element vertex 2",
+              "property float x", "property float y", "property float z",
+              "property float nx", "property float ny", "property float nz",
+              "property uchar red", "property uchar green", "property uchar blue",
+              "property float s", "property float t", "end_header"]
+    vertex = np.zeros(2, dtype=[("position", "<f4", 3), ("normal", "<f4", 3), ("color", "u1", 3), ("uv", "<f4", 2)])
+    vertex["normal"] = [0, 0, 1]
+    vertex["color"] = [[255, 0, 51], [0, 255, 0]]
+    vertex["uv"] = [[0.25, 0.5], [1, 0]]
+    with open(path, "wb") as ply_file:
+        ply_file.write(("\n".join(header) + "\n").encode("ascii"))
+        ply_file.write(vertex.tobytes())
+
+    mesh = read_ply(path)
+
+    np.testing.assert_allclose(mesh.colors, [[1, 0, 0.2, 1], [0, 1, 0, 1]])
+    np.testing.assert_array_equal(mesh.normals, [[0, 0, 1], [0, 0, 1]])
+    np.testing.assert_array_equal(mesh.get_uvs(), [[0.25, 0.5], [1, 0]])
+    assert sorted(mesh.attributes) == ["s", "t"]
+
+
+def test_topology_hash_is_computed_once(make_mesh):
+    mesh = make_mesh()
+    first = mesh.topology_hash()
+    # Changing the faces afterwards isn't seen, decoded meshes aren't modified
+    mesh.face_indices = mesh.face_indices[::-1].copy()
+    assert mesh.topology_hash() == first
+    assert make_mesh(offset=1.0).topology_hash() == first
+
+
+def test_interpolate_mesh(make_mesh):
+    start, end = make_mesh(0.0), make_mesh(2.0)
+
+    mesh = interpolate_mesh(start, end, 0.25)
+
+    np.testing.assert_allclose(mesh.vertices[:, 2], 0.5)
+    np.testing.assert_allclose(mesh.attributes["pressure"], start.attributes["pressure"] + 0.5)
+    assert mesh.topology_hash() == start.topology_hash()
+    assert mesh.face_indices is start.face_indices
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from SequenceDataLoader.sequence_cache import cache_path, read_cache, write_cache
+
+
+def with_quads(mesh):
+    """Merge the first two triangles of a mesh into a quad so faces have mixed sizes"""
+    mesh.face_indices = np.concatenate(([0, 1, 5, 4], mesh.face_indices[6:])).astype(np.int32)
+    mesh.face_sizes = np.concatenate(([4], mesh.face_sizes[2:])).astype(np.int32)
+    mesh.face_attributes["quality"] = mesh.face_attributes["quality"][1:]
+    return mesh
+
+
+def assert_same_topology(mesh, expected):
+    np.testing.assert_array_equal(mesh.face_sizes, expected.face_sizes)
+    np.testing.assert_array_equal(mesh.face_indices, expected.face_indices)
+    assert mesh.topology_hash() == expected.topology_hash()
+
+
+def test_cache_path():
+    assert cache_path("/data/t0001/surface.ply") == "/data/t0001/surface.seqc"
+
+
+@pytest.mark.parametrize("quads", [False, True])
+def test_exact_cache_round_trip(tmp_path, make_mesh, quads):
+    mesh = make_mesh(offset=0.5)
+    if quads:
+        mesh = with_quads(mesh)
+    path = str(tmp_path / "surface.seqc")
+
+    write_cache(path, mesh, scalar_bits=0)
+    cached = read_cache(path)
+
+    assert_same_topology(cached, mesh)
+    np.testing.assert_array_equal(cached.vertices, mesh.vertices)
+    np.testing.assert_array_equal(cached.normals, mesh.normals)
+    np.testing.assert_array_equal(cached.attributes["pressure"], mesh.attributes["pressure"])
+    np.testing.assert_array_equal(cached.face_attributes["quality"], mesh.face_attributes["quality"])
+    # Colors are always stored with 8 bits
+    np.testing.assert_allclose(cached.colors, mesh.colors, atol=0.5/255)
+    assert cached.face_colors is None
+
+
+def test_quantized_cache_round_trip(tmp_path, make_mesh):
+    mesh = make_mesh(offset=0.5)
+    path = str(tmp_path / "surface.seqc")
+
+    write_cache(path, mesh, scalar_bits=16)
+    cached = read_cache(path)
+
+    np.testing.assert_array_equal(cached.vertices, mesh.vertices)
+    pressure = mesh.attributes["pressure"]
+    np.testing.assert_allclose(cached.attributes["pressure"], pressure, atol=np.ptp(pressure)/65535)
+    np.testing.assert_allclose(cached.normals, mesh.normals, atol=2/65535)
+    assert cached.attributes["pressure"].dtype == np.float32
+
+
+def test_not_a_cache_file(tmp_path):
+    path = str(tmp_path / "surface.seqc")
+    with open(path, "wb") as cache_file:
+        cache_file.write(b"ply\n" + bytes(64))
+    with pytest.raises(Exception):
+        read_cache(path)
+
+
+def test_material_index_is_not_quantized(tmp_path, make_mesh):
+    mesh = make_mesh()
+    materials = np.array([0, 3, 5, 2, 1, 4, 6], dtype=np.float32)
+    mesh.face_attributes["material_index"] = np.resize(materials, mesh.face_count)
+    mesh.attributes["id"] = np.arange(mesh.vertex_count, dtype=np.float32)*1001
+    path = str(tmp_path / "surface.seqc")
+
+    write_cache(path, mesh, scalar_bits=16)
+    cached = read_cache(path)
+
+    np.testing.assert_array_equal(cached.face_attributes["material_index"][:7], materials)
+    np.testing.assert_array_equal(cached.face_attributes["material_index"], mesh.face_attributes["material_index"])
+    np.testing.assert_array_equal(cached.attributes["id"], mesh.attributes["id"])
+    # Other attributes are still quantized, dequantizing copies them out of the mapped file
+    assert cached.attributes["pressure"].base is None
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from SequenceDataLoader.sequence_delta import DeltaWriter, member_path, open_sequence, read_delta
+
+from test_sequence_cache import assert_same_topology, with_quads
+
+
+def write_archive(path, meshes, **options):
+    writer = DeltaWriter(path, **options)
+    for time, mesh in meshes.items():
+        writer.add(time, mesh)
+    writer.close()
+
+
+@pytest.mark.parametrize("compression", ["zlib", "lzma", "none"])
+def test_exact_archive_round_trip(tmp_path, make_mesh, compression):
+    path = str(tmp_path / "surface.seqd")
+    meshes = {time: with_quads(make_mesh(offset=time*0.1)) for time in (2, 3, 4, 7, 8, 9, 10)}
+    write_archive(path, meshes, compression=compression, keyframe_interval=3)
+
+    archive = open_sequence(path)
+    assert archive.files() == {time: member_path(path, time) for time in meshes}
+
+    # Forward, backward and random order, decoded from keyframes or from the last timestep
+    for time in [2, 3, 4, 7, 8, 9, 10, 4, 10, 2, 9, 8]:
+        mesh = read_delta(member_path(path, time))
+        assert_same_topology(mesh, meshes[time])
+        np.testing.assert_array_equal(mesh.vertices, meshes[time].vertices)
+        np.testing.assert_array_equal(mesh.attributes["pressure"], meshes[time].attributes["pressure"])
+        np.testing.assert_array_equal(mesh.face_attributes["quality"], meshes[time].face_attributes["quality"])
+
+    with pytest.raises(Exception):
+        read_delta(member_path(path, 5))
+
+
+def test_quantized_archive_round_trip(tmp_path, make_mesh):
+    path = str(tmp_path / "surface.seqd")
+    meshes = {time: make_mesh(offset=time*0.37) for time in range(5)}
+    write_archive(path, meshes, position_bits=16, scalar_bits=12)
+
+    step = 3/65535
+    for time, expected in meshes.items():
+        mesh = read_delta(member_path(path, time))
+        np.testing.assert_allclose(mesh.vertices, expected.vertices, atol=step)
+
+
+def test_archive_is_reopened_when_rewritten(tmp_path, make_mesh):
+    path = str(tmp_path / "surface.seqd")
+    write_archive(path, {0: make_mesh(offset=1.0)})
+    assert read_delta(member_path(path, 0)).vertices[0, 2] == 1.0
+
+    write_archive(path, {0: make_mesh(offset=2.0), 1: make_mesh(offset=3.0)})
+    assert read_delta(member_path(path, 0)).vertices[0, 2] == 2.0
+    assert sorted(open_sequence(path).files()) == [0, 1]
+
+
+def test_archive_rejects_topology_changes(tmp_path, make_mesh):
+    path = str(tmp_path / "surface.seqd")
+    writer = DeltaWriter(path)
+    writer.add(0, make_mesh())
+    with pytest.raises(Exception):
+        writer.add(1, make_mesh(side=5))
+    with pytest.raises(Exception):
+        writer.add(1, with_quads(make_mesh()))
+    writer.abort()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_quantization_is_relative_to_the_range(tmp_path, make_mesh):
+    """Coordinates far from the origin with a small span keep the precision of the span"""
+    path = str(tmp_path / "surface.seqd")
+    meshes = {}
+    for time in range(3):
+        mesh = make_mesh(offset=time*0.01)
+        mesh.vertices = (mesh.vertices*0.25 + 1e5).astype(np.float32)
+        meshes[time] = mesh
+    write_archive(path, meshes, position_bits=16, keyframe_interval=2)
+
+    for time, expected in meshes.items():
+        mesh = read_delta(member_path(path, time))
+        np.testing.assert_allclose(mesh.vertices, expected.vertices, rtol=0, atol=0.02)
+        assert len(np.unique(mesh.vertices[:, 0])) == 4
+
+
+def test_values_out_of_the_quantization_range_are_rejected(tmp_path, make_mesh):
+    path = str(tmp_path / "surface.seqd")
+    writer = DeltaWriter(path, position_bits=30)
+    writer.add(0, make_mesh())
+    with pytest.raises(Exception):
+        writer.add(1, make_mesh(offset=1e3))
+    writer.abort()
+
+    with pytest.raises(Exception):
+        DeltaWriter(path, position_bits=32)
@@ -0,0 +1,126 @@
+import os
+
+import pytest
+
+from SequenceDataLoader.sequence_index import (SequenceIndex, manifest_path, normalize_template, remove_manifest,
+                                               split_template)
+
+
+def make_sequence(root, times, name="surface.ply"):
+    """Timestep folders `t####` holding one data file, returns the template path"""
+    for time in times:
+        folder = os.path.join(root, "t{:04}".format(time))
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, name), "w") as data_file:
+            data_file.write("ply")
+    return os.path.join(root, "t####", name)
+
+
+def touch_later(path, seconds=10):
+    """Move the modification time of a path forward instead of waiting for the clock"""
+    mtime = os.stat(path).st_mtime + seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_nested_scan(tmp_path):
+    root = str(tmp_path)
+    template = make_sequence(root, [1, 2, 5])
+    os.makedirs(os.path.join(root, "t0003"))
+    os.makedirs(os.path.join(root, "t0004", "surface.ply"))
+
+    index = SequenceIndex(template)
+
+    assert index.times == [1, 2, 5]
+    assert index.get(2) == os.path.join(root, "t0002", "surface.ply")
+    assert index.get(4) is None
+    assert index.get(4, "PREVIOUS") == index.files[2]
+    assert index.get(4, "NEAREST") == index.files[5]
+    assert index.gaps() == [(3, 4)]
+    assert index.time_range == (1, 5)
+    assert sorted(index.stats) == sorted(index.files.values())
+    assert all(stat.st_size == 3 for stat in index.stats.values())
+
+
+def test_flat_scan(tmp_path):
+    for name in ("surface_0010.ply", "surface_0012.ply", "volume_0011.ply", "surface_0011.seqc"):
+        open(str(tmp_path / name), "w").close()
+
+    index = SequenceIndex(str(tmp_path / "surface_0010.ply"))
+
+    assert index.times == [10, 12]
+    assert normalize_template(str(tmp_path / "surface_0010.ply")) == str(tmp_path / "surface_####.ply")
+
+
+def test_split_template():
+    root, pattern, remainder = split_template("/data/t####/surface_####.ply")
+    assert root == "/data"
+    assert pattern.fullmatch("t0012").group(1) == "0012"
+    assert remainder == ["surface_####.ply"]
+    with pytest.raises(Exception):
+        normalize_template("/data/surface.ply")
+
+
+def test_manifest_round_trip(tmp_path):
+    template = make_sequence(str(tmp_path), [1, 2, 3])
+    SequenceIndex(template).save()
+
+    loaded = SequenceIndex.load(template)
+
+    assert loaded is not None
+    assert loaded.files == SequenceIndex(template).files
+    assert os.path.isfile(manifest_path(template))
+    # Manifests are per template
+    assert SequenceIndex.load(template.replace("surface", "volume")) is None
+
+
+def test_manifest_is_stale_after_a_new_timestep(tmp_path):
+    root = str(tmp_path)
+    template = make_sequence(root, [1, 2])
+    SequenceIndex(template).save()
+
+    make_sequence(root, [3])
+    touch_later(root)
+
+    assert SequenceIndex.load(template) is None
+    SequenceIndex(template).save()
+    assert SequenceIndex.load(template).times == [1, 2, 3]
+
+
+def test_manifest_of_another_template_is_ignored(tmp_path):
+    template = make_sequence(str(tmp_path), [1, 2])
+    SequenceIndex(template).save()
+    with open(manifest_path(template)) as manifest_file:
+        content = manifest_file.read()
+    with open(manifest_path(template), "w") as manifest_file:
+        manifest_file.write(content.replace("t####", "x####"))
+    assert SequenceIndex.load(template) is None
+
+    with open(manifest_path(template), "w") as manifest_file:
+        manifest_file.write("{")
+    assert SequenceIndex.load(template) is None
+
+
+def test_remove_manifest(tmp_path):
+    template = make_sequence(str(tmp_path), [1])
+    SequenceIndex(template).save()
+
+    remove_manifest(template)
+    remove_manifest(template)
+
+    assert not os.path.exists(manifest_path(template))
+    assert SequenceIndex.load(template) is None
+
+
+def test_template_without_directory(tmp_path, monkeypatch):
+    for name in ("surface_0001.ply", "surface_0003.ply"):
+        open(str(tmp_path / name), "w").close()
+    monkeypatch.chdir(str(tmp_path))
+
+    assert split_template("surface_###.ply")[0] == os.curdir
+    index = SequenceIndex("surface_###.ply")
+
+    assert index.times == [1, 3]
+    assert os.path.samefile(index.get(2, "PREVIOUS"), str(tmp_path / "surface_0001.ply"))
+    index.save()
+    assert SequenceIndex.load("surface_###.ply").times == [1, 3]
+    assert os.path.dirname(manifest_path("surface_###.ply")) == os.curdir
@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+
+from SequenceDataLoader.ply_reader import PlyMesh
+from SequenceDataLoader.shared_cache import SharedCache, get_job_id
+
+
+def data_files(folder, count):
+    paths = []
+    for index in range(count):
+        path = os.path.join(folder, "surface_{:04}.ply".format(index))
+        with open(path, "w") as data_file:
+            data_file.write(str(index))
+        paths.append(path)
+    return paths
+
+
+def reader_of(make_mesh, calls):
+    def reader(path):
+        calls.append(path)
+        return make_mesh(offset=float(os.path.basename(path)[8:12]), side=8)
+    return reader
+
+
+def test_timestep_is_decoded_once_per_node(tmp_path, make_mesh):
+    path = data_files(str(tmp_path), 1)[0]
+    calls = []
+    first = SharedCache(str(tmp_path / "shared"), max_bytes=10**6)
+    second = SharedCache(str(tmp_path / "shared"), max_bytes=10**6)
+
+    mesh = first.get(path, reader_of(make_mesh, calls))
+    shared = second.get(path, reader_of(make_mesh, calls))
+
+    assert calls == [path]
+    assert (first.misses, second.hits) == (1, 1)
+    assert isinstance(shared, PlyMesh)
+    np.testing.assert_array_equal(shared.vertices, mesh.vertices)
+    np.testing.assert_array_equal(shared.face_indices, mesh.face_indices)
+    assert first.node_bytes > 0
+
+    # A changed file is a new entry
+    with open(path, "w") as data_file:
+        data_file.write("changed")
+    second.get(path, reader_of(make_mesh, calls))
+    assert len(calls) == 2
+
+    first.close()
+    second.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, make_mesh):
+    paths = data_files(str(tmp_path), 3)
+    calls = []
+    cache = SharedCache(str(tmp_path / "shared"), max_bytes=10**6)
+    cache.get(paths[0], reader_of(make_mesh, calls))
+    # Every entry has the same size, keep two of them
+    cache.max_bytes = int(cache.node_bytes*2.5)
+    os.utime(cache.entry_path(paths[0]), (0, 0))
+
+    for path in paths[1:]:
+        cache.get(path, reader_of(make_mesh, calls))
+        os.utime(cache.entry_path(path), (len(calls), len(calls)))
+
+    assert not os.path.exists(cache.entry_path(paths[0]))
+    assert os.path.exists(cache.entry_path(paths[2]))
+    assert cache.node_bytes <= cache.max_bytes
+    cache.close()
+
+
+def test_abandoned_lock_is_taken_over(tmp_path, make_mesh):
+    path = data_files(str(tmp_path), 1)[0]
+    cache = SharedCache(str(tmp_path / "shared"), max_bytes=10**6, timeout=60)
+    lock_path = cache.entry_path(path) + ".lock"
+    open(lock_path, "w").close()
+    os.utime(lock_path, (1, 1))
+
+    mesh = cache.get(path, reader_of(make_mesh, []))
+
+    assert mesh.vertex_count == 64
+    assert not os.path.exists(lock_path)
+    cache.close()
+
+
+def test_last_instance_removes_the_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("SLURM_JOB_ID", "1234")
+    cache = SharedCache(str(tmp_path / "cache_{job}"))
+    assert cache.directory == str(tmp_path / "cache_1234")
+    # Another running instance, and one that died without closing the cache
+    users = os.path.dirname(cache.user_path)
+    open(os.path.join(users, str(os.getppid())), "w").close()
+    open(os.path.join(users, "4194304"), "w").close()
+
+    cache.close()
+    assert str(os.getpid()) not in os.listdir(users)
+    assert os.path.isdir(cache.directory)
+
+    os.remove(os.path.join(users, str(os.getppid())))
+    SharedCache(cache.template).close()
+    assert not os.path.exists(cache.directory)
+
+
+def test_job_id(monkeypatch):
+    for variable in ("SLURM_JOB_ID", "PBS_JOBID", "LSB_JOBID", "JOB_ID"):
+        monkeypatch.delenv(variable, raising=False)
+    assert get_job_id() == "local"
+    monkeypatch.setenv("PBS_JOBID", "42.server")
+    assert get_job_id() == "42.server"
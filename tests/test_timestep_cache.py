@@ -0,0 +1,98 @@
+import os
+
+from SequenceDataLoader.timestep_cache import TimestepCache
+
+
+class Data:
+    def __init__(self, content, nbytes):
+        self.content = content
+        self.nbytes = nbytes
+
+
+def reader_of(sizes):
+    """Reader returning the content of a file with the size given in `sizes`, counting its calls"""
+    calls = []
+
+    def reader(path):
+        calls.append(path)
+        with open(path) as data_file:
+            return Data(data_file.read(), sizes.get(path, 10))
+    return reader, calls
+
+
+def write(path, content, mtime=None):
+    with open(path, "w") as data_file:
+        data_file.write(content)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_hit_until_the_file_changes(tmp_path):
+    path = str(tmp_path / "a.ply")
+    write(path, "first", mtime=1000)
+    cache = TimestepCache(1000)
+    reader, calls = reader_of({})
+
+    assert cache.get(path, reader).content == "first"
+    assert cache.get(path, reader).content == "first"
+    assert (cache.hits, cache.misses, len(calls)) == (1, 1, 1)
+    assert path in cache
+
+    # Same size, newer modification time
+    write(path, "again", mtime=2000)
+    assert path not in cache
+    assert cache.get(path, reader).content == "again"
+    assert len(calls) == 2 and len(cache) == 1
+
+
+def test_size_change_with_same_mtime_invalidates(tmp_path):
+    path = str(tmp_path / "a.ply")
+    write(path, "short", mtime=1000)
+    cache = TimestepCache(1000)
+    reader, calls = reader_of({})
+    cache.get(path, reader)
+
+    write(path, "much longer", mtime=1000)
+    assert cache.get(path, reader).content == "much longer"
+    assert len(calls) == 2
+
+
+def test_removed_file_is_not_served(tmp_path):
+    path = str(tmp_path / "a.ply")
+    write(path, "content")
+    cache = TimestepCache(1000)
+    cache.get(path, reader_of({})[0])
+
+    os.remove(path)
+    assert path not in cache
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    paths = [str(tmp_path / "{}.ply".format(i)) for i in range(3)]
+    for path in paths:
+        write(path, path)
+    cache = TimestepCache(25)
+    reader, calls = reader_of({})
+
+    cache.get(paths[0], reader)
+    cache.get(paths[1], reader)
+    cache.get(paths[0], reader)
+    cache.get(paths[2], reader)
+
+    assert paths[1] not in cache
+    assert paths[0] in cache and paths[2] in cache
+    assert cache.used_bytes == 20
+
+    cache.resize(10)
+    assert len(cache) == 1 and paths[2] in cache
+
+
+def test_entries_larger_than_the_budget_are_not_kept(tmp_path):
+    path = str(tmp_path / "big.ply")
+    write(path, "big")
+    cache = TimestepCache(100)
+    reader, calls = reader_of({path: 200})
+
+    cache.get(path, reader)
+    cache.get(path, reader)
+    assert len(cache) == 0 and len(calls) == 2
@@ -0,0 +1,96 @@
+import json
+import os
+import sys
+
+import pytest
+
+from SequenceDataLoader.timing_log import NullTimingLog, TimingLog, get_memory, get_peak_memory
+from timing_report import percentile, read_logs, stage_statistics
+
+
+def read_records(path):
+    with open(path) as log_file:
+        return [json.loads(line) for line in log_file]
+
+
+def test_records_stages_and_counts(tmp_path):
+    log = TimingLog(str(tmp_path) + os.sep, source="render")
+
+    assert log.begin(frame=1)
+    # Loading objects within a render adds to the frame's record
+    assert not log.begin(frame=1)
+    with log.stage("read"):
+        pass
+    with log.stage("read"):
+        pass
+    log.count(bytes_read=10, vertices=4)
+    log.count(bytes_read=5)
+    log.end(objects=2)
+    log.count(bytes_read=100)
+    log.end()
+    log.close()
+
+    records = read_records(log.path)
+    assert len(records) == 1
+    record = records[0]
+    assert record["source"] == "render" and record["frame"] == 1 and record["objects"] == 2
+    assert record["pid"] == os.getpid()
+    assert record["counts"] == {"bytes_read": 15, "vertices": 4}
+    assert 0 <= record["stages"]["read"] <= record["total"]
+    assert os.path.basename(log.path).startswith("timing_")
+
+
+def test_path_template(tmp_path):
+    log = TimingLog(str(tmp_path / "logs" / "export_{pid}.jsonl"))
+    log.close()
+    assert log.path == str(tmp_path / "logs" / "export_{}.jsonl".format(os.getpid()))
+
+
+def test_null_timing_log():
+    log = NullTimingLog()
+    assert not log.begin(frame=1)
+    with log.stage("read"):
+        log.count(bytes_read=1)
+    log.end()
+    log.close()
+
+
+def test_memory_is_positive():
+    memory = get_memory()
+    assert memory is None or memory > 0
+
+
+def test_peak_memory_without_resource(monkeypatch):
+    """Callers have to handle platforms where the memory can't be read"""
+    assert get_peak_memory() > 0
+    monkeypatch.setitem(sys.modules, "resource", None)
+    assert get_peak_memory() is None
+
+
+def test_report_reads_truncated_logs(tmp_path):
+    log = TimingLog(str(tmp_path / "a.jsonl"))
+    for frame in range(3):
+        log.begin(frame=frame)
+        with log.stage("read"):
+            pass
+        log.end()
+    log.close()
+    with open(str(tmp_path / "b.jsonl"), "w") as log_file:
+        log_file.write(json.dumps({"step": 0, "stages": {"write": 2.0}, "total": 3.0}) + "\n")
+        log_file.write('{"step": 1, "stag')
+
+    records = read_logs([str(tmp_path)])
+
+    assert len(records) == 4
+    statistics = stage_statistics(records)
+    assert len(statistics["read"]) == 3 and statistics["write"] == [2.0]
+    assert len(statistics["total"]) == 4 and statistics["total"][-1] == 3.0
+
+
+def test_percentile():
+    values = [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 0.5) == 3.0
+    assert percentile(values, 1) == 5.0
+    assert percentile(values, 0.9) == pytest.approx(4.6)
+    assert percentile([7.0], 0.99) == 7.0
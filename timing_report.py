@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+
+
+def read_logs(paths):
+    """Read the records of JSON lines timing logs, folders are searched for .jsonl files"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".jsonl"))
+        else:
+            files.append(path)
+
+    records = []
+    for path in files:
+        with open(path, "r") as log_file:
+            for line in log_file:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # Last line of a log whose worker was killed while writing it
+                    continue
+    return records
+
+
+def percentile(values, fraction):
+    """Percentile of sorted `values` with linear interpolation, `fraction` from 0 to 1"""
+    position = (len(values) - 1)*fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower])*(position - lower)
+
+
+def stage_statistics(records):
+    """Returns {stage: sorted durations} including the frame total"""
+    durations = {}
+    for record in records:
+        for stage, duration in record.get("stages", {}).items():
+            durations.setdefault(stage, []).append(duration)
+        durations.setdefault("total", []).append(record.get("total", 0.0))
+    return {stage: sorted(values) for stage, values in durations.items()}
+
+
+def print_report(source, records, slowest):
+    workers = {(record.get("hostname"), record.get("pid")) for record in records}
+    hosts = {hostname for hostname, _ in workers}
+    print("{}: {} frames from {} workers on {} hosts".format(source, len(records), len(workers), len(hosts)))
+
+    statistics = stage_statistics(records)
+    total_time = sum(statistics["total"]) or 1.0
+    print("  {:<12} {:>7} {:>9} {:>9} {:>9} {:>9} {:>9} {:>7}".format("stage", "count", "mean", "p50", "p90", "p99", "max", "share"))
+    for stage in sorted(statistics, key=lambda stage: (stage == "total", -sum(statistics[stage]))):
+        values = statistics[stage]
+        print("  {:<12} {:>7} {:>8.3f}s {:>8.3f}s {:>8.3f}s {:>8.3f}s {:>8.3f}s {:>6.1f}%".format(
+            stage, len(values), sum(values)/len(values), percentile(values, 0.5), percentile(values, 0.9),
+            percentile(values, 0.99), values[-1], 100*sum(values)/total_time))
+
+    counts = {}
+    for record in records:
+        for name, value in record.get("counts", {}).items():
+            counts[name] = counts.get(name, 0) + value
+    if counts:
+        print("  " + ", ".join("{}: {}".format(name, format_count(name, value)) for name, value in sorted(counts.items())))
+    memory = [record["rss_mb"] for record in records if record.get("rss_mb") is not None]
+    if memory:
+        print("  resident memory: max {:.0f} MB, p50 {:.0f} MB".format(max(memory), percentile(sorted(memory), 0.5)))
+
+    print("  slowest frames:")
+    for record in sorted(records, key=lambda record: record.get("total", 0.0), reverse=True)[:slowest]:
+        frame = record.get("frame", record.get("step"))
+        stages = ", ".join("{} {:.2f}s".format(stage, duration) for stage, duration in
+                           sorted(record.get("stages", {}).items(), key=lambda item: -item[1]))
+        print("    {} {:<6} {:>8.2f}s on {}:{} ({})".format("frame" if "frame" in record else "step", frame,
+                                                          record.get("total", 0.0), record.get("hostname"),
+                                                          record.get("pid"), stages))
+    print()
+
+
+def format_count(name, value):
+    if name.startswith("bytes"):
+        return "{:.1f} MB".format(value/1024**2)
+    return str(value)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="""Summarize the timing logs written by the SequenceDataLoader addon (--timing-log
+                                     of render_frames, Timing log setting) and the ParaView export scripts: per-stage
+                                     percentiles and the slowest frames, merging the logs of every worker.""")
+    parser.add_argument("logs", nargs="+", help="Timing log files, or folders containing them")
+    parser.add_argument("--slowest", type=int, default=10, help="Number of slowest frames listed")
+    parser.add_argument("--source", help="Only report records from this source (render, viewport, export_ply, export_vdb)")
+    args = parser.parse_args()
+
+    records = read_logs(args.logs)
+    if not records:
+        raise SystemExit("No timing records found")
+
+    sources = {}
+    for record in records:
+        sources.setdefault(record.get("source", "unknown"), []).append(record)
+
+    for source, source_records in sorted(sources.items()):
+        if args.source is None or source == args.source:
+            print_report(source, source_records, args.slowest)